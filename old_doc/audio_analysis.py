@@ -0,0 +1,98 @@
+"""
+Pitch, loudness and brightness estimates for audio assets, from batched FFTs
+
+Everything here works on float sample arrays of shape (frames, channels);
+reading files is left to the callers (map_audio.py, loop_analysis.py).
+"""
+import numpy as np
+
+def autocorrelation(data):
+    """Normalized autocorrelation of (frames, channels) data summed over channels, for lags 0..frames-1"""
+    frames = len(data)
+    size = 1 << int(np.ceil(np.log2(2 * frames)))
+    spectrum = np.fft.rfft(data - data.mean(axis=0), n=size, axis=0)
+    correlation = np.fft.irfft((spectrum * spectrum.conj()).real.sum(axis=1), n=size)[:frames]
+    # Undo the taper from shorter overlaps at long lags
+    correlation = correlation / (frames - np.arange(frames))
+    return correlation / correlation[0] if correlation[0] > 0 else correlation
+
+def pick_period(correlation, rate, min_frequency, max_frequency, min_correlation):
+    """
+    Fundamental period in samples (fractional) from a normalized autocorrelation
+
+    Returns (period or None if the signal is not periodic, correlation at
+    that period). The shortest lag whose correlation is within 10% of the
+    best one wins, so a period is not mistaken for two of them.
+    """
+    low = max(2, int(rate / max_frequency))
+    high = min(len(correlation) // 2, int(rate / min_frequency))
+    if high <= low + 2:
+        return None, 0.0
+    window = correlation[low:high]
+    # Local maxima only, so the slope down from lag 0 does not count
+    peaks = np.flatnonzero((window[1:-1] > window[:-2]) & (window[1:-1] >= window[2:])) + 1
+    if not len(peaks):
+        return None, 0.0
+    best = window[peaks].max()
+    if best < min_correlation:
+        return None, float(best)
+    lag = low + peaks[np.argmax(window[peaks] >= 0.9 * best)]
+    # Parabolic interpolation around the peak
+    a, b, c = correlation[lag - 1], correlation[lag], correlation[lag + 1]
+    denominator = a - 2 * b + c
+    offset = 0.5 * (a - c) / denominator if denominator else 0.0
+    return float(lag + offset), float(b)
+
+def analysis_frames(data, frame_size, max_frames, silence_db=-60.0):
+    """
+    Up to max_frames frames spread evenly over the file, quiet ones left out
+
+    Returns an array of shape (frames, frame_size, channels); files shorter
+    than one frame give a single zero-padded frame.
+    """
+    if len(data) < frame_size:
+        data = np.pad(data, ((0, frame_size - len(data)), (0, 0)))
+    starts = np.unique(np.linspace(0, len(data) - frame_size, max_frames).astype(np.int64))
+    frames = data[starts[:, None] + np.arange(frame_size)]
+    level = np.sqrt(np.mean(frames ** 2, axis=(1, 2)))
+    # Relative to the loudest frame, so quiet files are still analyzed
+    loud = level > level.max() * 10 ** (silence_db / 20)
+    return frames[loud] if loud.any() else frames
+
+def spectral_features(data, rate, frame_size=8192, max_frames=16, min_frequency=10.0, max_frequency=5000.0,
+                      min_correlation=0.5):
+    """
+    Pitch, loudness and spectral centroid of one file
+
+    All frames are transformed in one rfft call. Their power spectra are
+    averaged and transformed back, which gives the frame-averaged
+    autocorrelation that the pitch is read from; zero padding to twice the
+    frame size keeps it from wrapping around.
+
+    Returns a dict with pitch_hz and midi (None when unpitched), clarity
+    (autocorrelation at the period), rms_db, peak_db and centroid_hz.
+    """
+    frames = analysis_frames(data, frame_size, max_frames)
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    spectra = np.fft.rfft(frames, n=2 * frame_size, axis=1)
+    power = (spectra.real ** 2 + spectra.imag ** 2).sum(axis=2).mean(axis=0)
+
+    correlation = np.fft.irfft(power)[:frame_size]
+    correlation = correlation / (frame_size - np.arange(frame_size))
+    if correlation[0] > 0:
+        correlation = correlation / correlation[0]
+    period, clarity = pick_period(correlation, rate, min_frequency, max_frequency, min_correlation)
+    pitch = rate / period if period else None
+
+    frequencies = np.fft.rfftfreq(2 * frame_size, 1.0 / rate)
+    centroid = float((frequencies * power).sum() / power.sum()) if power.sum() > 0 else 0.0
+    rms = float(np.sqrt(np.mean(data ** 2))) if data.size else 0.0
+    peak = float(np.abs(data).max()) if data.size else 0.0
+    return {
+        'pitch_hz': pitch,
+        'midi': float(69 + 12 * np.log2(pitch / 440.0)) if pitch else None,
+        'clarity': clarity,
+        'rms_db': float(20 * np.log10(rms)) if rms > 0 else None,
+        'peak_db': float(20 * np.log10(peak)) if peak > 0 else None,
+        'centroid_hz': centroid,
+    }
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Persistent index of the audio files used by the keyboard synthesizer
+
+Each directory is listed with a single os.scandir pass and is skipped
+entirely while its own mtime is unchanged. Files are only re-read when
+their mtime or size changes. Metadata comes from file headers (the WAV
+fmt chunk, the first MPEG frame and its Xing/Info or VBRI header, the Ogg
+Vorbis identification header) and memory-mapped
+sample data, so nothing is decoded.
+
+Usage:
+  python audio_library.py                 # index web/audio and audio/
+  python audio_library.py --rebuild DIR   # re-read every file in DIR
+"""
+import os
+import json
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIRECTORIES = (os.path.join(SCRIPT_DIR, 'web', 'audio'), os.path.join(SCRIPT_DIR, 'audio'))
+DEFAULT_INDEX = os.path.join(SCRIPT_DIR, '.audio_index.json')
+
+# Bump when the stored metadata changes shape
+INDEX_VERSION = 2
+
+def file_hash(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def wav_layout(f):
+    """
+    Parse the RIFF chunks of an open WAV file
+
+    Returns a dict with format tag, channels, sample rate, bits per sample
+    and the offset and size of the data chunk, or None if it is not a WAV.
+    """
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+    layout = {}
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        tag, size = struct.unpack('<4sI', chunk)
+        if tag == b'fmt ':
+            fmt = f.read(size)
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+            if format_tag == 0xFFFE and len(fmt) >= 26:
+                # WAVE_FORMAT_EXTENSIBLE: the real tag is the start of the sub-format GUID
+                format_tag = struct.unpack('<H', fmt[24:26])[0]
+            layout.update(format_tag=format_tag, channels=channels, sample_rate=sample_rate, bits=bits)
+            f.seek(size % 2, 1)
+        elif tag == b'data':
+            layout.update(data_offset=f.tell(), data_size=size)
+            break
+        else:
+            f.seek(size + size % 2, 1)
+    if 'format_tag' not in layout or 'data_offset' not in layout:
+        return None
+    return layout
+
+def wav_peak(data, layout):
+    """Peak absolute level (0 to 1) of raw WAV sample bytes"""
+    bits = layout['bits']
+    if not data:
+        return 0.0
+    if layout['format_tag'] == 3:
+        samples = np.frombuffer(data, dtype='<f4' if bits == 32 else '<f8')
+        return float(np.abs(samples).max())
+    if bits == 8:
+        samples = np.frombuffer(data, dtype=np.uint8)
+        return float(np.abs(samples.astype(np.int16) - 128).max() / 128.0)
+    if bits == 24:
+        raw = np.frombuffer(data, dtype=np.uint8)
+        raw = raw[:len(raw) - len(raw) % 3].reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                   | (raw[:, 2].astype(np.int8).astype(np.int32) << 16))
+        return float(np.abs(samples).max() / 8388608.0)
+    dtype = {16: '<i2', 32: '<i4'}.get(bits)
+    if dtype is None:
+        return None
+    samples = np.frombuffer(data, dtype=dtype)
+    return float(np.abs(samples.astype(np.int64)).max() / float(2 ** (bits - 1)))
+
+def wav_info(path):
+    """Header metadata and peak level of a WAV file, reading samples through mmap"""
+    with open(path, 'rb') as f:
+        layout = wav_layout(f)
+        if layout is None:
+            return {}
+        frame_bytes = layout['channels'] * layout['bits'] // 8
+        available = os.fstat(f.fileno()).st_size - layout['data_offset']
+        data_size = min(layout['data_size'], max(0, available))
+        data_size -= data_size % frame_bytes if frame_bytes else 0
+        peak = 0.0
+        if data_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)[layout['data_offset']:layout['data_offset'] + data_size]
+                try:
+                    peak = wav_peak(view, layout)
+                finally:
+                    view.release()
+    frames = data_size // frame_bytes if frame_bytes else 0
+    return {
+        'format': 'wav',
+        'sample_rate': layout['sample_rate'],
+        'channels': layout['channels'],
+        'bits': layout['bits'],
+        'frames': frames,
+        'duration': frames / layout['sample_rate'] if layout['sample_rate'] else None,
+        'peak': peak,
+    }
+
+def ogg_info(path):
+    """Channels, sample rate and duration of an Ogg Vorbis file from its headers"""
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+        start = head.find(b'\x01vorbis')
+        if start < 0:
+            return {'format': 'ogg'}
+        channels, sample_rate = struct.unpack('<BI', head[start + 11:start + 16])
+        # The granule position of the last page is the total number of frames
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    last = tail.rfind(b'OggS')
+    frames = struct.unpack('<q', tail[last + 6:last + 14])[0] if last >= 0 and last + 14 <= len(tail) else None
+    return {
+        'format': 'ogg',
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'frames': frames,
+        'duration': frames / sample_rate if frames is not None and sample_rate else None,
+        'peak': None,
+    }
+
+# MPEG audio header tables, indexed by the header's version bits
+# (3 = MPEG 1, 2 = MPEG 2, 0 = MPEG 2.5) and layer bits (3 = I, 2 = II, 1 = III)
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MPEG_BITRATES = {
+    (3, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (3, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+def mpeg_frame_header(data, offset):
+    """Fields of the MPEG audio frame header at offset, or None if there is none"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 3
+    layer = (data[offset + 1] >> 1) & 3
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 3
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    # MPEG 2.5 shares MPEG 2's bitrates
+    bitrates = MPEG_BITRATES[(3 if version == 3 else 2, layer if version == 3 or layer == 3 else 2)]
+    if layer == 3:
+        frame_samples = 384
+    elif layer == 1 and version != 3:
+        frame_samples = 576
+    else:
+        frame_samples = 1152
+    return {
+        'version': version,
+        'layer': layer,
+        'bitrate': bitrates[bitrate_index] * 1000,
+        'sample_rate': MPEG_SAMPLE_RATES[version][rate_index],
+        'channels': 1 if data[offset + 3] >> 6 == 3 else 2,
+        'frame_samples': frame_samples,
+    }
+
+def mp3_info(path):
+    """Channels, sample rate and duration of an MP3 from its first frame header"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        tag = f.read(10)
+        tag_size = 0
+        if tag[:3] == b'ID3' and len(tag) == 10:
+            # Syncsafe size, plus the 10-byte header and an optional footer
+            tag_size = ((tag[6] << 21) | (tag[7] << 14) | (tag[8] << 7) | tag[9]) + 10 + (10 if tag[5] & 0x10 else 0)
+        f.seek(tag_size)
+        head = f.read(65536)
+        f.seek(max(0, size - 128))
+        has_id3v1 = f.read(3) == b'TAG'
+    start = 0
+    header = None
+    while start + 4 <= len(head):
+        start = head.find(b'\xff', start)
+        if start < 0:
+            break
+        header = mpeg_frame_header(head, start)
+        if header:
+            break
+        start += 1
+    if not header:
+        return {'format': 'mp3'}
+
+    frames = None
+    if header['layer'] == 1:
+        # A Xing/Info header sits after the side information of the first frame
+        if header['version'] == 3:
+            side_info = 17 if header['channels'] == 1 else 32
+        else:
+            side_info = 9 if header['channels'] == 1 else 17
+        xing = start + 4 + side_info
+        if head[xing:xing + 4] in (b'Xing', b'Info') and xing + 12 <= len(head):
+            flags = struct.unpack('>I', head[xing + 4:xing + 8])[0]
+            if flags & 1:
+                frames = struct.unpack('>I', head[xing + 8:xing + 12])[0] * header['frame_samples']
+        vbri = start + 36
+        if frames is None and head[vbri:vbri + 4] == b'VBRI' and vbri + 18 <= len(head):
+            frames = struct.unpack('>I', head[vbri + 14:vbri + 18])[0] * header['frame_samples']
+    if frames is None:
+        # Constant bitrate: the audio bytes give the length
+        audio_bytes = size - tag_size - start - (128 if has_id3v1 else 0)
+        frames = int(round(audio_bytes * 8 / header['bitrate'] * header['sample_rate']))
+    return {
+        'format': 'mp3',
+        'sample_rate': header['sample_rate'],
+        'channels': header['channels'],
+        'frames': frames,
+        'duration': frames / header['sample_rate'],
+        'peak': None,
+    }
+
+def probe(path):
+    """Metadata for one audio file; fields that cannot be read cheaply are None"""
+    extension = os.path.splitext(path)[1].lower()
+    info = {'format': extension.lstrip('.'), 'sample_rate': None, 'channels': None,
+            'frames': None, 'duration': None, 'peak': None}
+    try:
+        if extension == '.wav':
+            info.update(wav_info(path))
+        elif extension == '.mp3':
+            info.update(mp3_info(path))
+        elif extension == '.ogg':
+            info.update(ogg_info(path))
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Could not read {path}: {e}")
+    info['hash'] = file_hash(path)
+    return info
+
+class AudioLibrary:
+    """
+    Index of audio files in a set of directories
+
+    Parameters:
+    directories -- Directories to index (not recursive)
+    index_path -- JSON file the index is kept in between runs
+    """
+
+    def __init__(self, directories=DEFAULT_DIRECTORIES, index_path=DEFAULT_INDEX):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._directories = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get('version') == INDEX_VERSION:
+            self._directories = index.get('directories', {})
+
+    def _save(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'directories': self._directories}, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self, force=False):
+        """
+        Bring the index up to date; returns the number of files (re)read
+
+        Directories whose mtime is unchanged are skipped, since adding,
+        removing or renaming a file updates it. Use force=True to also catch
+        files overwritten in place.
+        """
+        probed = 0
+        changed = False
+        with self._lock:
+            for directory in self.directories:
+                try:
+                    directory_mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    if self._directories.pop(directory, None) is not None:
+                        changed = True
+                    continue
+                known = self._directories.get(directory)
+                if known is not None and known['mtime_ns'] == directory_mtime and not force:
+                    continue
+
+                old_files = known['files'] if known else {}
+                files = {}
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if not entry.name.lower().endswith(AUDIO_EXTENSIONS) or not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        old = old_files.get(entry.name)
+                        if old and old['mtime_ns'] == stat.st_mtime_ns and old['size'] == stat.st_size:
+                            files[entry.name] = old
+                            continue
+                        files[entry.name] = dict(probe(entry.path), mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                        probed += 1
+                self._directories[directory] = {'mtime_ns': directory_mtime, 'files': files}
+                changed = True
+            if changed:
+                self._save()
+        return probed
+
+    def add(self, path):
+        """Index one file right away, e.g. after copying it into a library directory"""
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        stat = os.stat(path)
+        with self._lock:
+            if directory not in self._directories:
+                return
+            self._directories[directory]['files'][name] = dict(probe(path), mtime_ns=stat.st_mtime_ns,
+                                                               size=stat.st_size)
+            self._directories[directory]['mtime_ns'] = os.stat(directory).st_mtime_ns
+            self._save()
+
+    def files(self, directory=None):
+        """Indexed entries as dicts with 'name' and 'path' added, sorted by name"""
+        with self._lock:
+            entries = []
+            for indexed_dir in self.directories:
+                if directory is not None and indexed_dir != os.path.abspath(directory):
+                    continue
+                record = self._directories.get(indexed_dir, {'files': {}})
+                for name, info in record['files'].items():
+                    entries.append(dict(info, name=name, path=os.path.join(indexed_dir, name)))
+        entries.sort(key=lambda e: (e['name'], e['path']))
+        return entries
+
+    def names(self, directory=None):
+        """File names in a directory (or all directories), sorted"""
+        return [entry['name'] for entry in self.files(directory)]
+
+    def find(self, name, directory=None):
+        """Entry for a file name, searching the directories in order, or None"""
+        name = os.path.basename(name)
+        with self._lock:
+            for indexed_dir in self.directories:
+                if directory is not None and indexed_dir != os.path.abspath(directory):
+                    continue
+                info = self._directories.get(indexed_dir, {}).get('files', {}).get(name)
+                if info is not None:
+                    return dict(info, name=name, path=os.path.join(indexed_dir, name))
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and show the audio library index")
+    parser.add_argument("directories", nargs='*', default=list(DEFAULT_DIRECTORIES), help="Directories to index")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Index file")
+    parser.add_argument("--rebuild", action="store_true", help="Re-check every file, not just changed directories")
+    args = parser.parse_args()
+
+    library = AudioLibrary(args.directories, args.index)
+    start_time = time.perf_counter()
+    probed = library.refresh(force=args.rebuild)
+    elapsed = time.perf_counter() - start_time
+    entries = library.files()
+    for entry in entries:
+        duration = f"{entry['duration']:.2f}s" if entry.get('duration') is not None else '?'
+        peak = f"{entry['peak']:.3f}" if entry.get('peak') is not None else '?'
+        print(f"{entry['name']:<32} {entry['format']:<4} {entry.get('sample_rate') or '?':>6} Hz  "
+              f"{entry.get('channels') or '?'} ch  {duration:>8}  peak {peak}  {entry['hash'][:12]}")
+    print(f"{len(entries)} files indexed, {probed} read in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
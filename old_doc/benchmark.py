@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the SVG conversion pipeline and the audio library helpers
+
+Generates synthetic SVG fixtures (10 to 10,000 segments) and audio
+libraries in a temporary directory, times each pipeline stage separately
+and appends the results to a JSON history. With --check, the run fails if
+any benchmark is slower than the recent median by more than --threshold.
+
+Usage:
+  python benchmark.py
+  python benchmark.py --quick --check
+  python benchmark.py --only synthesis,write --repeat 5
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import io
+import numpy as np
+import svgpathtools as svgpath
+from scipy.io import wavfile
+from svg_sampling import sample_paths
+from svg_to_oscilloscope import synthesize_xy, finish_audio_block
+from wav_stream import WavStreamWriter
+from audio_library import AudioLibrary
+from map_audio import auto_map
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(SCRIPT_DIR, 'benchmark_history.json')
+
+SEGMENT_COUNTS = (10, 100, 1000, 10000)
+DURATIONS = (1.0, 10.0, 60.0)
+SAMPLE_RATES = (44100, 96000)
+LIBRARY_SIZES = (100, 1000)
+
+QUICK_SEGMENT_COUNTS = (10, 100, 1000)
+QUICK_DURATIONS = (1.0, 10.0)
+QUICK_SAMPLE_RATES = (44100,)
+QUICK_LIBRARY_SIZES = (100,)
+
+STAGES = ('parse', 'sample', 'synthesis', 'write', 'library', 'automap')
+
+def make_svg(path, segments, seed=0):
+    """
+    Write a synthetic SVG with the given number of segments
+
+    Segments cycle through lines, quadratic and cubic Beziers and arcs, and
+    are grouped into paths of up to 20 segments, like a typical drawing.
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    remaining = segments
+    while remaining > 0:
+        count = min(20, remaining)
+        remaining -= count
+        x, y = rng.uniform(0, 1000, 2)
+        parts = [f"M {x:.2f} {y:.2f}"]
+        for i in range(count):
+            # Reflect off the edges, and never stand still: svgpathtools
+            # rejects zero-length arcs
+            nx, ny = np.round(1000 - np.abs(1000 - np.abs([x, y] + rng.normal(0, 40, 2))), 2)
+            if (nx, ny) == (x, y):
+                nx = nx + 1 if nx < 500 else nx - 1
+            kind = i % 4
+            if kind == 0:
+                parts.append(f"L {nx:.2f} {ny:.2f}")
+            elif kind == 1:
+                cx, cy = rng.uniform(0, 1000, 2)
+                parts.append(f"Q {cx:.2f} {cy:.2f} {nx:.2f} {ny:.2f}")
+            elif kind == 2:
+                c = rng.uniform(0, 1000, 4)
+                parts.append(f"C {c[0]:.2f} {c[1]:.2f} {c[2]:.2f} {c[3]:.2f} {nx:.2f} {ny:.2f}")
+            else:
+                radius = rng.uniform(20, 60)
+                parts.append(f"A {radius:.2f} {radius:.2f} 0 0 1 {nx:.2f} {ny:.2f}")
+            x, y = nx, ny
+        paths.append(f'<path d="{" ".join(parts)}" fill="none" stroke="black"/>')
+    with open(path, 'w') as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="1000" height="1000">\n')
+        f.write('\n'.join(paths))
+        f.write('\n</svg>\n')
+
+def make_library(directory, files, seed=0):
+    """Write a directory of short mono WAV files to stand in for a large asset library"""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(files):
+        samples = (rng.uniform(-0.5, 0.5, 4410) * 32767).astype(np.int16)
+        wavfile.write(os.path.join(directory, f"asset_{i:05d}.wav"), 44100, samples)
+
+def best_time(function, repeat):
+    """Best wall time of several calls, and the last call's result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run_benchmarks(work_dir, quick=False, repeat=3, only=None):
+    """
+    Run the benchmark grid
+
+    Returns a dict of benchmark name -> {'seconds', 'throughput', 'unit'};
+    seconds is the best of repeat runs and throughput is work per second.
+    """
+    segment_counts = QUICK_SEGMENT_COUNTS if quick else SEGMENT_COUNTS
+    durations = QUICK_DURATIONS if quick else DURATIONS
+    sample_rates = QUICK_SAMPLE_RATES if quick else SAMPLE_RATES
+    library_sizes = QUICK_LIBRARY_SIZES if quick else LIBRARY_SIZES
+    stages = set(only or STAGES)
+    results = {}
+
+    def record(name, seconds, work, unit):
+        results[name] = {'seconds': seconds, 'throughput': work / seconds if seconds > 0 else None, 'unit': unit}
+        print(f"{name:<40} {seconds * 1000:>10.2f} ms  {results[name]['throughput'] or 0:>14,.0f} {unit}/s")
+
+    points_by_size = {}
+    for segments in segment_counts:
+        svg_file = os.path.join(work_dir, f"fixture_{segments}.svg")
+        make_svg(svg_file, segments)
+        seconds, (paths, _) = best_time(lambda: svgpath.svg2paths(svg_file), repeat)
+        if 'parse' in stages:
+            record(f"parse/{segments}_segments", seconds, segments, 'segments')
+        seconds, path_points = best_time(lambda: sample_paths(paths), repeat)
+        if 'sample' in stages:
+            record(f"sample/{segments}_segments", seconds, segments, 'segments')
+        points = np.concatenate(path_points)
+        points = 2 * (points - points.min(axis=0)) / np.ptp(points, axis=0) - 1
+        points_by_size[segments] = points
+
+    # Synthesis and writing use the mid-sized drawing; their cost scales
+    # with the number of samples, not the drawing
+    points = points_by_size[segment_counts[len(segment_counts) // 2]]
+    for sample_rate in sample_rates:
+        for duration in durations:
+            num_samples = int(sample_rate * duration)
+            label = f"{duration:g}s_{sample_rate // 1000}k"
+            if 'synthesis' in stages:
+                seconds, _ = best_time(lambda: finish_audio_block(*synthesize_xy(points, num_samples)), repeat)
+                record(f"synthesis/{label}", seconds, num_samples, 'samples')
+            if 'write' in stages:
+                block = np.zeros((65536, 2), dtype=np.float32)
+                output = os.path.join(work_dir, 'output.wav')
+
+                def write():
+                    with WavStreamWriter(output, sample_rate, channels=2) as writer:
+                        for start in range(0, num_samples, len(block)):
+                            writer.write(block[:min(len(block), num_samples - start)])
+                seconds, _ = best_time(write, repeat)
+                record(f"write/{label}", seconds, num_samples, 'samples')
+
+    for files in library_sizes:
+        library_dir = os.path.join(work_dir, f"library_{files}")
+        web_dir = os.path.join(work_dir, f"web_{files}")
+        make_library(library_dir, files)
+        index_path = os.path.join(work_dir, f"index_{files}.json")
+        if 'library' in stages:
+            def cold():
+                if os.path.exists(index_path):
+                    os.remove(index_path)
+                library = AudioLibrary([library_dir], index_path)
+                library.refresh()
+                return library.names()
+            seconds, _ = best_time(cold, repeat)
+            record(f"library_cold/{files}_files", seconds, files, 'files')
+            def warm():
+                # What list_audio_files does on every call after startup
+                library = AudioLibrary([library_dir], index_path)
+                library.refresh()
+                return library.names()
+            seconds, _ = best_time(warm, repeat)
+            record(f"library_warm/{files}_files", seconds, files, 'files')
+        if 'automap' in stages:
+            library = AudioLibrary([web_dir, library_dir], index_path)
+            library.refresh()
+            audio_files = [entry['path'] for entry in library.files(library_dir)]
+
+            def automap():
+                shutil.rmtree(web_dir, ignore_errors=True)
+                os.makedirs(web_dir)
+                library.refresh()
+                mapping = {}
+                # auto_map asks whether to clear existing mappings; answer yes
+                with contextlib.redirect_stdout(io.StringIO()), _answer('y'):
+                    auto_map(audio_files, mapping, web_dir, library)
+                return mapping
+            seconds, mapping = best_time(automap, repeat)
+            record(f"automap/{files}_files", seconds, len(mapping), 'keys')
+    return results
+
+@contextlib.contextmanager
+def _answer(reply):
+    """Feed a fixed reply to input() calls"""
+    import builtins
+    original = builtins.input
+    builtins.input = lambda prompt='': reply
+    try:
+        yield
+    finally:
+        builtins.input = original
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def find_regressions(history, run, threshold=0.2, window=5):
+    """
+    Compare a run against the median of recent comparable runs
+
+    Only earlier runs from the same host and mode are used. Returns a list
+    of (name, seconds, baseline seconds) for benchmarks slower than the
+    baseline by more than threshold (0.2 = 20%).
+    """
+    comparable = [r for r in history if r['host'] == run['host'] and r['quick'] == run['quick']][-window:]
+    regressions = []
+    for name, result in run['results'].items():
+        previous = [r['results'][name]['seconds'] for r in comparable if name in r['results']]
+        if not previous:
+            continue
+        baseline = float(np.median(previous))
+        if result['seconds'] > baseline * (1 + threshold):
+            regressions.append((name, result['seconds'], baseline))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SVG conversion, synthesis and the audio library")
+    parser.add_argument("--quick", action="store_true", help="Smaller grid for a fast check")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the best is kept")
+    parser.add_argument("--only", default=None, help=f"Comma-separated stages: {', '.join(STAGES)}")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file to append to")
+    parser.add_argument("--no-save", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--window", type=int, default=5, help="Recent runs the baseline is taken from")
+    args = parser.parse_args()
+
+    only = [s.strip() for s in args.only.split(',')] if args.only else None
+    unknown = set(only or []) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    work_dir = tempfile.mkdtemp(prefix='osc_bench_')
+    try:
+        results = run_benchmarks(work_dir, args.quick, args.repeat, only)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'quick': args.quick,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    history = load_history(args.history)
+    regressions = find_regressions(history, run, args.threshold, args.window)
+    if not args.no_save:
+        history.append(run)
+        with open(args.history, 'w') as f:
+            json.dump(history, f, indent=2)
+        print(f"Appended results to {args.history}")
+
+    for name, seconds, baseline in regressions:
+        print(f"REGRESSION {name}: {seconds * 1000:.2f} ms vs {baseline * 1000:.2f} ms baseline "
+              f"({seconds / baseline - 1:+.0%})")
+    if not regressions:
+        print("No regressions")
+    if args.check and regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Thread-safe, versioned store for the oscilloscope controls
+
+The console thread and eel callbacks both change controls. Every change
+goes through one lock, bumps a version number and is recorded in a
+bounded change log, so a client that knows the version it last saw can
+ask for just the controls that changed since then. Pushes to the page are
+coalesced: a burst of changes (e.g. a slider drag) produces at most one
+push per push_interval.
+"""
+import time
+import threading
+from collections import deque
+
+class ControlsStore:
+    """
+    Dict-like controls store with a version counter and change log
+
+    Parameters:
+    initial -- Dict of control names and default values; only these names
+               can be set later
+    history -- Number of individual changes kept for get_changes_since
+    """
+
+    def __init__(self, initial, history=1024):
+        self._values = dict(initial)
+        self._version = 0
+        self._log = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._push_thread = None
+
+    # Mapping interface, so existing code can keep using controls[name]
+    def __getitem__(self, name):
+        with self._lock:
+            return self._values[name]
+
+    def __setitem__(self, name, value):
+        if name not in self._values:
+            raise KeyError(name)
+        self.set_controls({name: value})
+
+    def __contains__(self, name):
+        return name in self._values
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, name, default=None):
+        with self._lock:
+            return self._values.get(name, default)
+
+    def keys(self):
+        return self.snapshot().keys()
+
+    def items(self):
+        return self.snapshot().items()
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def snapshot(self):
+        """Copy of every control value"""
+        with self._lock:
+            return dict(self._values)
+
+    def set_controls(self, changes):
+        """
+        Apply several changes atomically
+
+        Values equal to the current one are skipped, and unknown names are
+        ignored. The version is bumped once for the whole batch, and only
+        if something changed.
+
+        Returns a dict with the new 'version', the names 'changed' and the
+        'unknown' names.
+        """
+        changed = []
+        unknown = []
+        with self._lock:
+            for name, value in changes.items():
+                if name not in self._values:
+                    unknown.append(name)
+                elif self._values[name] != value or type(self._values[name]) is not type(value):
+                    changed.append(name)
+            if changed:
+                self._version += 1
+                for name in changed:
+                    self._values[name] = changes[name]
+                    self._log.append((self._version, name))
+                self._changed.notify_all()
+            return {'version': self._version, 'changed': changed, 'unknown': unknown}
+
+    def toggle(self, name):
+        """Flip a boolean control; returns its new value, or None if it is not a boolean"""
+        with self._lock:
+            value = self._values.get(name)
+            if not isinstance(value, bool):
+                return None
+            self._version += 1
+            self._values[name] = not value
+            self._log.append((self._version, name))
+            self._changed.notify_all()
+            return not value
+
+    def get_changes_since(self, version):
+        """
+        Controls changed after a given version
+
+        Returns a dict with the current 'version' and the 'changes' as
+        {name: value}. For version 0 (a client that has nothing yet), or
+        if the log no longer reaches back that far, every control is
+        returned and 'full' is True.
+        """
+        with self._lock:
+            return self._changes_since(version)
+
+    def _changes_since(self, version):
+        # The oldest logged batch may have lost some of its entries to the
+        # deque limit, so only versions from it onwards can be answered
+        oldest = self._log[0][0] if self._log else self._version + 1
+        if version <= 0 or (version < oldest and version < self._version):
+            return {'version': self._version, 'changes': dict(self._values), 'full': True}
+        names = {name for logged, name in self._log if logged > version}
+        return {'version': self._version, 'changes': {n: self._values[n] for n in names}, 'full': False}
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the version moves past the given one; returns the current version"""
+        with self._lock:
+            self._changed.wait_for(lambda: self._version > version, timeout)
+            return self._version
+
+    def start_push(self, callback, interval=1 / 60.0):
+        """
+        Call callback(changes) from a background thread whenever controls change
+
+        Changes arriving within interval seconds of the last push are
+        coalesced into the next one, where changes is the dict returned by
+        get_changes_since.
+        """
+        if self._push_thread is not None:
+            return
+
+        def push_loop():
+            pushed = self.version
+            last_push = 0.0
+            while True:
+                self.wait_for_change(pushed)
+                # Let a burst of updates settle into a single push
+                delay = last_push + interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                changes = self.get_changes_since(pushed)
+                pushed = changes['version']
+                last_push = time.monotonic()
+                try:
+                    callback(changes)
+                except Exception as e:
+                    print(f"Error pushing control changes: {e}")
+
+        self._push_thread = threading.Thread(target=push_loop, daemon=True)
+        self._push_thread.start()
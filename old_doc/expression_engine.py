@@ -0,0 +1,210 @@
+"""
+Safe, vectorized evaluation of the signal generator's X/Y expressions
+
+The expressions in controls['xExpression'] / controls['yExpression'] are
+JavaScript snippets such as "sin(2*PI*a*t)*cos(2*PI*b*t)". They are parsed
+with the ast module, checked against a whitelist of names and operators,
+and compiled into functions of NumPy arrays. One period of the X/Y signal
+is then tabulated so the page can loop it instead of evaluating the
+expression per sample.
+"""
+import ast
+import math
+import base64
+import functools
+from fractions import Fraction
+import numpy as np
+
+def _round(x):
+    """Math.round: halves round up, not to even"""
+    return np.floor(np.asarray(x, dtype=np.float64) + 0.5)
+
+def _minimum(*args):
+    """Math.min of any number of arguments"""
+    return functools.reduce(np.minimum, args)
+
+def _maximum(*args):
+    """Math.max of any number of arguments"""
+    return functools.reduce(np.maximum, args)
+
+# Names an expression may use besides the variables t, a and b
+FUNCTIONS = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan, 'atan2': np.arctan2,
+    'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'abs': np.abs, 'sqrt': np.sqrt, 'cbrt': np.cbrt, 'exp': np.exp, 'log': np.log,
+    'floor': np.floor, 'ceil': np.ceil, 'round': _round, 'sign': np.sign,
+    'pow': np.power, 'min': _minimum, 'max': _maximum,
+}
+# Arguments each function takes; None for any number (at least one), 1 otherwise
+ARITY = {'atan2': 2, 'pow': 2, 'min': None, 'max': None}
+CONSTANTS = {'PI': np.pi, 'E': np.e}
+VARIABLES = ('t', 'a', 'b')
+
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.UAdd, ast.USub)
+
+# Longest table served; expressions whose period is longer (or not a
+# rational multiple of a and b) are tabulated over this span instead
+MAX_TABLE_SECONDS = 2.0
+
+class ExpressionError(ValueError):
+    """Raised for expressions that cannot be parsed or use disallowed syntax"""
+
+def _check(node):
+    """Walk the tree and reject anything outside the whitelist"""
+    for child in ast.walk(node):
+        if isinstance(child, (ast.Expression, ast.Load, ast.BinOp, ast.UnaryOp) + _OPERATORS):
+            continue
+        if isinstance(child, ast.Constant):
+            if not isinstance(child.value, (int, float)) or isinstance(child.value, bool):
+                raise ExpressionError(f"unsupported constant {child.value!r}")
+        elif isinstance(child, ast.Name):
+            if child.id not in FUNCTIONS and child.id not in CONSTANTS and child.id not in VARIABLES:
+                raise ExpressionError(f"unknown name '{child.id}'")
+        elif isinstance(child, ast.Call):
+            if not isinstance(child.func, ast.Name) or child.func.id not in FUNCTIONS:
+                raise ExpressionError("only calls to math functions are allowed")
+            if child.keywords:
+                raise ExpressionError("keyword arguments are not allowed")
+            if any(isinstance(arg, ast.Starred) for arg in child.args):
+                raise ExpressionError("starred arguments are not allowed")
+            name = child.func.id
+            arity = ARITY.get(name, 1)
+            if arity is None and not child.args:
+                raise ExpressionError(f"{name}() needs at least one argument")
+            if arity is not None and len(child.args) != arity:
+                plural = 's' if arity > 1 else ''
+                raise ExpressionError(f"{name}() takes {arity} argument{plural}, got {len(child.args)}")
+        else:
+            raise ExpressionError(f"unsupported syntax: {type(child).__name__}")
+
+class _JavaScriptSemantics(ast.NodeTransformer):
+    """
+    Rewrite a checked tree to behave like the page's JavaScript
+
+    Number literals become floats, ** becomes np.power and % becomes
+    np.fmod (truncated, like JS), so e.g. 9**9**9 overflows to inf
+    instead of building a huge integer.
+    """
+
+    def visit_Constant(self, node):
+        return ast.copy_location(ast.Constant(float(node.value)), node)
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        function = {ast.Pow: '_power', ast.Mod: '_fmod'}.get(type(node.op))
+        if function is None:
+            return node
+        call = ast.Call(func=ast.Name(id=function, ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+        return ast.copy_location(call, node)
+
+@functools.lru_cache(maxsize=128)
+def compile_expression(expression):
+    """
+    Compile a generator expression into a function f(t, a, b) of NumPy arrays
+
+    JavaScript spellings are accepted where they differ from Python:
+    Math.sin(...) is the same as sin(...) and Math.PI the same as PI.
+    """
+    source = expression.replace('Math.', '').strip()
+    try:
+        tree = ast.parse(source, mode='eval')
+    except SyntaxError as e:
+        raise ExpressionError(f"cannot parse '{expression}': {e.msg}") from None
+    _check(tree)
+    tree = ast.fix_missing_locations(_JavaScriptSemantics().visit(tree))
+    code = compile(tree, '<expression>', 'eval')
+    namespace = dict(FUNCTIONS, _power=np.power, _fmod=np.fmod, **CONSTANTS)
+
+    def evaluate(t, a, b):
+        t = np.asarray(t, dtype=np.float64)
+        try:
+            value = eval(code, {'__builtins__': {}}, dict(namespace, t=t, a=a, b=b))
+        except (TypeError, ValueError, ArithmeticError) as e:
+            raise ExpressionError(f"cannot evaluate '{expression}': {e}") from None
+        return np.broadcast_to(np.asarray(value, dtype=np.float64), t.shape)
+    return evaluate
+
+def generator_frequency(value, exponent):
+    """a or b as the page computes it: value * 10**exponent"""
+    return value * 10.0 ** exponent
+
+def _candidate_period(*frequencies):
+    """Common period (1/gcd) of some frequencies, or None if they have none"""
+    gcd = Fraction(0)
+    for frequency in frequencies:
+        if frequency == 0:
+            continue
+        fraction = abs(Fraction(frequency).limit_denominator(1000))
+        if fraction == 0 or abs(float(fraction) - abs(frequency)) > 1e-9 * abs(frequency):
+            return None
+        # gcd(p/q, r/s) = gcd(p*s, r*q) / (q*s)
+        gcd = Fraction(math.gcd(gcd.numerator * fraction.denominator, fraction.numerator * gcd.denominator),
+                       gcd.denominator * fraction.denominator)
+    return 1 / float(gcd) if gcd else None
+
+def _is_period(functions, a, b, period):
+    """Check numerically that every function repeats after period seconds"""
+    probe = np.random.default_rng(0).uniform(0, 1, 64)
+    for function in functions:
+        with np.errstate(all='ignore'):
+            first = function(probe, a, b)
+            second = function(probe + period, a, b)
+        if not np.allclose(first, second, rtol=1e-6, atol=1e-6, equal_nan=True):
+            return False
+    return True
+
+def find_period(functions, a, b, max_seconds=MAX_TABLE_SECONDS):
+    """
+    Find the shortest common period of some expression functions
+
+    Tries 1/gcd(a, b) first, then 1/gcd(a, b, 1) for expressions that also
+    contain fixed frequencies, e.g. sin(2*PI*t). Returns (period, exact);
+    exact is False when no period up to max_seconds was found.
+    """
+    for frequencies in ((a, b), (a, b, 1.0)):
+        candidate = _candidate_period(*frequencies)
+        if candidate and candidate <= max_seconds and _is_period(functions, a, b, candidate):
+            return candidate, True
+    return max_seconds, False
+
+@functools.lru_cache(maxsize=64)
+def wavetable(x_expression, y_expression, a, b, sample_rate=44100, max_seconds=MAX_TABLE_SECONDS):
+    """
+    Tabulate one period of an X/Y expression pair
+
+    Parameters:
+    x_expression, y_expression -- Generator expressions in t, a and b
+    a, b -- Values of a and b (see generator_frequency)
+    sample_rate -- Output sample rate in Hz
+    max_seconds -- Longest table to build
+
+    The table holds length points spread evenly over one period, so length
+    is ceil(period * sample_rate) and playback steps through the table at
+    length / (period * sample_rate) points per sample.
+
+    Returns a dict with float32 arrays 'x' and 'y' (read-only, shared by
+    every caller) plus 'period', 'length' and 'exact'.
+    """
+    functions = (compile_expression(x_expression), compile_expression(y_expression))
+    period, exact = find_period(functions, a, b, max_seconds)
+    length = max(2, int(math.ceil(period * sample_rate - 1e-9)))
+    t = np.arange(length) * (period / length)
+    channels = []
+    for function in functions:
+        with np.errstate(all='ignore'):
+            values = function(t, a, b)
+        values = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0).astype(np.float32)
+        values.setflags(write=False)
+        channels.append(values)
+    return {'x': channels[0], 'y': channels[1], 'period': period, 'length': length, 'exact': exact}
+
+def encode_table(table):
+    """Base64-encode a wavetable's float32 channels for JSON transport"""
+    return {
+        'x': base64.b64encode(table['x'].tobytes()).decode('ascii'),
+        'y': base64.b64encode(table['y'].tobytes()).decode('ascii'),
+        'period': table['period'],
+        'length': table['length'],
+        'exact': table['exact'],
+    }
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Pre-render the oscilloscope's idle trace into looping tables
+
+When nothing is playing, doScriptProcessor in oscilloscope.js draws a flat
+trace with analog-style noise: random noise with occasional bursts, 60 Hz
+hum, drift, spikes, discontinuities and one of ten interference patterns
+shown on about 10% of blocks. This script renders the same signals block
+by block with different seeds, so the page only has to read and crossfade
+tables instead of calling Math.random and Math.sin for every sample.
+
+There are two kinds of table, each a run of whole audio blocks:
+  base      -- the always-present noise; the page plays one and crossfades
+               to another seed when it runs out
+  pattern<N> -- what interference pattern N adds on top, for one block
+
+Tables store the X offset from the sweep (-1 to 1 across a block) and Y,
+as int16 with a per-table scale, in web/idle-noise.bin, described by
+web/idle-noise.json.
+
+Usage:
+  python idle_noise.py
+  python idle_noise.py --block-size 1024 --base-seeds 3 --base-blocks 32
+"""
+import os
+import json
+import argparse
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WEB_DIR = os.path.join(SCRIPT_DIR, '..', 'web')
+
+# AudioSystem.init(1024) in oscilloscope.js
+DEFAULT_BLOCK_SIZE = 1024
+
+# The page advances its noise clock by this much per sample within a block
+TIME_PER_SAMPLE = 0.00002
+
+PATTERN_COUNT = 10
+
+def block_times(rng, blocks, block_size, sample_rate):
+    """Wall-clock time of each block, from a random start like Date.now()"""
+    return rng.uniform(0, 3600) + np.arange(blocks) * block_size / sample_rate
+
+def render_base(rng, blocks, block_size, sample_rate):
+    """
+    Always-present idle noise for consecutive blocks
+
+    Returns (x_offset, y), each of shape (blocks, block_size), where
+    x_offset is added to the sweep position.
+    """
+    shape = (blocks, block_size)
+    times = block_times(rng, blocks, block_size, sample_rate)[:, None]
+    i = np.arange(block_size)
+    time = times + i * TIME_PER_SAMPLE
+    disruption = np.sin(times * 0.7) * np.sin(times * 1.3)
+    should_disrupt = rng.random((blocks, 1)) < 0.02
+    burst_noise = rng.random((blocks, 1)) < 0.005
+
+    x = np.zeros(shape)
+    disrupted = should_disrupt & (i > block_size * 0.3) & (i < block_size * 0.4)
+    x += np.where(disrupted, (rng.random(shape) - 0.5) * 0.1, 0.0)
+
+    multiplier = np.where(burst_noise & (i > block_size * 0.5) & (i < block_size * 0.6), 5.0, 1.0)
+    multiplier = multiplier * (1.0 + disruption * 0.5)
+    y = (rng.random(shape) - 0.5) * 0.008 * multiplier
+    y += np.sin(time * 60 * 2 * np.pi) * 0.002
+    y += np.sin(time * 0.5) * 0.003
+    y += (rng.random(shape) - 0.5) * 0.001
+
+    spikes = rng.random(shape) < 0.0005
+    y += np.where(spikes, (rng.random(shape) - 0.5) * 0.05, 0.0)
+
+    # Discontinuities jump to an absolute position
+    jumps = rng.random(shape) < 0.001
+    sweep = -1.0 + 2.0 * i / block_size
+    x = np.where(jumps, rng.random(shape) * 2.0 - 1.0 - sweep, x)
+    y = np.where(jumps, rng.random(shape) * 0.1 - 0.05, y)
+    return x, y
+
+def render_pattern(pattern, rng, blocks, block_size, sample_rate):
+    """What analog pattern 0-9 adds to X and Y, for independent blocks"""
+    shape = (blocks, block_size)
+    times = block_times(rng, blocks, block_size, sample_rate)[:, None]
+    i = np.arange(block_size)
+    time = times + i * TIME_PER_SAMPLE
+    x = np.zeros(shape)
+    y = np.zeros(shape)
+    if pattern == 0:
+        # Oscillating interference pattern
+        y += np.sin(time * 127) * np.cos(time * 73) * 0.02
+        x += np.sin(time * 89) * 0.01
+    elif pattern == 1:
+        # Sawtooth drift
+        y += ((time * 2.3) % 1.0 - 0.5) * 0.03
+    elif pattern == 2:
+        # Radio frequency interference
+        y += np.sin(times * 15.7 + i * 0.1) * np.sin(time * 1000) * 0.015
+    elif pattern == 3:
+        # Power supply ripple
+        y += np.sin(time * 120 * np.pi) * 0.01 + np.sin(time * 240 * np.pi) * 0.005
+    elif pattern == 4:
+        # Analog crosstalk
+        crosstalk = np.sin(time * 33) * np.sin(time * 77)
+        y += crosstalk * 0.025
+        x += crosstalk * 0.005
+    elif pattern == 5:
+        # Thermal noise burst
+        y += np.where(i % 10 < 3, (rng.random(shape) - 0.5) * 0.04, 0.0)
+    elif pattern == 6:
+        # Oscillation decay
+        decay = np.exp(-((i - block_size / 2) ** 2) / (block_size * block_size * 0.1))
+        y += np.sin(time * 200 + i * 0.5) * decay * 0.03
+    elif pattern == 7:
+        # Ground loop hum with harmonics
+        for h in range(1, 6):
+            y += np.sin(time * 60 * h * 2 * np.pi) * 0.003 / h
+    elif pattern == 8:
+        # Analog switch bounce
+        bounce = rng.random(shape) < 0.01
+        y += np.where(bounce, (rng.random(shape) - 0.5) * 0.1 * np.exp(-i * 0.01), 0.0)
+    elif pattern == 9:
+        # Mixed frequency beating
+        y += (np.sin(time * 97) + np.sin(time * 103)) * 0.01
+    return x, y
+
+def quantize(x, y):
+    """Planar int16 X then Y, and the scale that turns them back into floats"""
+    planar = np.stack([x.ravel(), y.ravel()])
+    peak = float(np.abs(planar).max())
+    scale = peak / 32767.0 if peak > 0 else 1.0
+    return np.round(planar / scale).astype('<i2'), scale
+
+def build_idle_noise(web_dir=None, name='idle-noise', block_size=DEFAULT_BLOCK_SIZE, sample_rate=48000,
+                     base_seeds=3, base_blocks=32, pattern_seeds=2, pattern_blocks=8, seed=0):
+    """
+    Render every idle table and write <name>.bin and <name>.json
+
+    Parameters:
+    web_dir -- Directory the page is served from
+    name -- Base name of the output files
+    block_size -- Audio block length the page uses (AudioSystem.bufferSize)
+    sample_rate -- Rate used to advance the clock between blocks
+    base_seeds -- Number of base tables to crossfade between
+    base_blocks -- Blocks per base table
+    pattern_seeds -- Tables per interference pattern
+    pattern_blocks -- Blocks per pattern table
+    seed -- Seed all tables are derived from
+    """
+    if web_dir is None:
+        web_dir = DEFAULT_WEB_DIR
+    rng = np.random.default_rng(seed)
+    kinds = [('base', lambda r: render_base(r, base_blocks, block_size, sample_rate), base_seeds)]
+    for pattern in range(PATTERN_COUNT):
+        kinds.append((f"pattern{pattern}",
+                      lambda r, p=pattern: render_pattern(p, r, pattern_blocks, block_size, sample_rate),
+                      pattern_seeds))
+
+    tables = {}
+    offset = 0
+    bin_path = os.path.join(web_dir, f"{name}.bin")
+    with open(bin_path + '.tmp', 'wb') as out:
+        for kind, render, seeds in kinds:
+            tables[kind] = []
+            for _ in range(seeds):
+                x, y = render(np.random.default_rng(rng.integers(1 << 63)))
+                data, scale = quantize(x, y)
+                out.write(data.tobytes())
+                tables[kind].append({'offset': offset, 'blocks': x.shape[0], 'scale': scale})
+                offset += data.size
+    os.replace(bin_path + '.tmp', bin_path)
+
+    manifest = {'version': 1, 'blockSize': block_size, 'sampleRate': sample_rate,
+                'pack': f"{name}.bin", 'tables': tables}
+    with open(os.path.join(web_dir, f"{name}.json"), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {sum(len(t) for t in tables.values())} idle tables ({offset * 2 / 1024:.0f} KB) to {bin_path}")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render the oscilloscope's idle noise into tables")
+    parser.add_argument("--web-dir", default=None, help="Directory the page is served from")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Page audio block size")
+    parser.add_argument("--sample-rate", type=int, default=48000, help="Page sample rate")
+    parser.add_argument("--base-seeds", type=int, default=3, help="Base tables to crossfade between")
+    parser.add_argument("--base-blocks", type=int, default=32, help="Blocks per base table")
+    parser.add_argument("--pattern-seeds", type=int, default=2, help="Tables per interference pattern")
+    parser.add_argument("--pattern-blocks", type=int, default=8, help="Blocks per pattern table")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    build_idle_noise(args.web_dir, block_size=args.block_size, sample_rate=args.sample_rate,
+                     base_seeds=args.base_seeds, base_blocks=args.base_blocks,
+                     pattern_seeds=args.pattern_seeds, pattern_blocks=args.pattern_blocks, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
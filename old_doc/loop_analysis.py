@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Find seamless loop regions in the audio library
+
+The page plays every mapped file with source.loop = true, so a file loops
+from its last sample back to its first whether or not that joins up. This
+module estimates each file's fundamental period from an FFT
+autocorrelation (all channels at once, so an X/Y drawing loops on its
+whole figure), then searches whole numbers of periods for the start and
+length whose seam matches best. The result is either stored as loop
+points ("loops": {key: [start, end]} in seconds, which the page and the
+audio pack honour) or written out as a trimmed file holding only the loop.
+
+Files are analyzed in a process pool and results are cached by content
+hash in .loop_cache.json, so re-running over an unchanged library is
+close to free.
+
+Usage:
+  python loop_analysis.py                      # analyze tones/ and audio/, store loop points
+  python loop_analysis.py --trim --output-dir looped
+"""
+import os
+import json
+import time
+import argparse
+import concurrent.futures
+import numpy as np
+from scipy.io import wavfile
+from audio_library import AudioLibrary
+from audio_analysis import autocorrelation, pick_period
+from map_audio import read_audio_float
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(SCRIPT_DIR, '..')
+DEFAULT_CACHE = os.path.join(SCRIPT_DIR, '.loop_cache.json')
+
+# Bump when the analysis changes in a way that alters its results
+ANALYSIS_VERSION = 1
+
+DEFAULT_OPTIONS = {
+    'min_frequency': 2.0,   # X/Y drawings repeat a few times per second
+    'max_frequency': 4000.0,
+    'min_correlation': 0.8,  # Below this the file is treated as not periodic
+    'max_periods': 64,
+    'seam_window': 256,
+    'skip_start': 0.02,     # Seconds kept clear of the attack
+    'skip_end': 0.05,       # and of a fade-out
+}
+
+def estimate_period(data, rate, min_frequency, max_frequency, min_correlation):
+    """Fundamental period in samples (fractional) over the whole file, or None if it is not periodic"""
+    return pick_period(autocorrelation(data), rate, min_frequency, max_frequency, min_correlation)
+
+def seam_error(data, length, window, first, last):
+    """
+    Mismatch of a loop of length samples for every start in first..last
+
+    Compares the window samples after the start with the window samples
+    after the end, relative to their energy, so 0 is a perfect seam.
+    """
+    difference = ((data[:-length] - data[length:]) ** 2).sum(axis=1)
+    energy = (data[:-length] ** 2).sum(axis=1) + (data[length:] ** 2).sum(axis=1)
+    total = np.concatenate(([0.0], np.cumsum(difference)))
+    total_energy = np.concatenate(([0.0], np.cumsum(energy)))
+    starts = np.arange(first, last + 1)
+    error = total[starts + window] - total[starts]
+    scale = total_energy[starts + window] - total_energy[starts]
+    return np.divide(error, scale, out=np.zeros_like(error), where=scale > 0)
+
+def find_loop(data, rate, options=DEFAULT_OPTIONS):
+    """
+    Best seamless loop in (frames, channels) data
+
+    Returns a dict with the period in samples, the autocorrelation at that
+    period, and the loop start, length (in samples) and seam error, or
+    loop None if the signal is not periodic enough to loop.
+    """
+    frames = len(data)
+    period, correlation = estimate_period(data, rate, options['min_frequency'], options['max_frequency'],
+                                          options['min_correlation'])
+    result = {'period': period, 'correlation': correlation, 'loop': None}
+    if period is None:
+        return result
+    window = min(options['seam_window'], int(period))
+    first = min(int(options['skip_start'] * rate), frames // 4)
+    end = frames - min(int(options['skip_end'] * rate), frames // 4)
+
+    candidates = []
+    for periods in range(1, options['max_periods'] + 1):
+        length = int(round(periods * period))
+        last = end - length - window
+        if last < first:
+            break
+        error = seam_error(data, length, window, first, last)
+        best = int(np.argmin(error))
+        candidates.append((float(error[best]), length, first + best))
+    if not candidates:
+        return result
+    # The shortest loop that is nearly as clean as the cleanest one
+    cleanest = min(error for error, _, _ in candidates)
+    error, length, start = next(c for c in candidates if c[0] <= cleanest * 1.25 + 1e-6)
+    result['loop'] = {'start': start, 'length': length, 'seam_error': error}
+    return result
+
+def _analyze_file(job):
+    """Worker for analyze_library: find one file's loop and time it"""
+    path, digest, options = job
+    result = {'file': path, 'hash': digest, 'status': 'ok', 'error': None, 'seconds': 0.0}
+    start_time = time.perf_counter()
+    try:
+        rate, data = read_audio_float(path)
+        result.update(find_loop(data, rate, options), rate=rate, frames=len(data))
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+def analyze_library(input_dirs=None, cache_path=DEFAULT_CACHE, options=DEFAULT_OPTIONS, workers=None):
+    """
+    Find the loop of every WAV in some directories, in parallel
+
+    Parameters:
+    input_dirs -- Directories to analyze (defaults to the repository's tones/ and audio/)
+    cache_path -- JSON file of earlier results, keyed by content hash
+    options -- See DEFAULT_OPTIONS
+    workers -- Number of worker processes (defaults to the CPU count)
+
+    Returns a dict mapping each normalized file path to its result.
+    """
+    if input_dirs is None:
+        input_dirs = [os.path.join(REPO_DIR, 'tones'), os.path.join(REPO_DIR, 'audio')]
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                cache = json.load(f)
+        except Exception as e:
+            print(f"Error loading {cache_path}: {e}")
+    settings = json.dumps({'version': ANALYSIS_VERSION, 'options': options}, sort_keys=True)
+
+    library = AudioLibrary(input_dirs)
+    library.refresh()
+    results = {}
+    jobs = []
+    for input_dir in input_dirs:
+        for entry in library.files(input_dir):
+            if not entry['name'].lower().endswith('.wav'):
+                continue
+            path = os.path.normpath(entry['path'])
+            # The library index already holds each file's content hash
+            digest = entry['hash']
+            cached = cache.get(digest)
+            if cached and cached.get('settings') == settings:
+                results[path] = dict(cached['result'], file=path)
+            else:
+                jobs.append((path, digest, options))
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Analyzing {len(jobs)} files with {workers} worker(s), {len(results)} cached")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, result in enumerate(pool.map(_analyze_file, jobs), 1):
+            name = os.path.basename(result['file'])
+            results[result['file']] = result
+            if result['status'] != 'ok':
+                print(f"[{done}/{len(jobs)}] {name}: FAILED ({result['error']})")
+                continue
+            cache[result['hash']] = {'settings': settings, 'result': result}
+            loop = result['loop']
+            if loop:
+                print(f"[{done}/{len(jobs)}] {name}: loop of {loop['length']} of {result['frames']} samples "
+                      f"(period {result['period']:.1f}, seam error {loop['seam_error']:.2e})")
+            else:
+                print(f"[{done}/{len(jobs)}] {name}: no loop found (correlation {result['correlation']:.2f})")
+
+    if cache_path:
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+    return results
+
+def trim_to_loops(results, output_dir):
+    """
+    Write the loop of each analyzed file as its own WAV, in the source's sample format
+
+    Returns a dict mapping each source path to its trimmed copy; files
+    without a loop are left out.
+    """
+    outputs = {}
+    for path, result in results.items():
+        loop = result.get('loop')
+        if result['status'] != 'ok' or not loop:
+            continue
+        rate, data = wavfile.read(path)
+        output = os.path.join(output_dir, os.path.basename(os.path.dirname(path)), os.path.basename(path))
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        wavfile.write(output, rate, data[loop['start']:loop['start'] + loop['length']])
+        outputs[path] = output
+    saved = sum(os.path.getsize(p) - os.path.getsize(o) for p, o in outputs.items())
+    print(f"Trimmed {len(outputs)} files into {output_dir}, {saved / (1024 * 1024):.1f} MB smaller")
+    return outputs
+
+def update_configs(results, outputs=None, web_dir=None, config_files=('audio-config.json', 'tone-config.json')):
+    """
+    Record loop points in the mapping configs
+
+    Keys mapped to an analyzed file get "loops": {key: [start, end]} in
+    seconds. With outputs (from trim_to_loops) the mappings are pointed at
+    the trimmed copies instead, which loop as a whole and need no loop points.
+    """
+    if web_dir is None:
+        web_dir = os.path.join(REPO_DIR, 'web')
+    for config_file in config_files:
+        config_path = os.path.join(web_dir, config_file)
+        try:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"Error loading {config_file}: {e}")
+            continue
+        loops = config.setdefault('loops', {})
+        count = 0
+        for key, filepath in config.get('mappings', {}).items():
+            source = os.path.normpath(os.path.join(web_dir, filepath))
+            result = results.get(source)
+            if not result or result['status'] != 'ok' or not result['loop']:
+                continue
+            if outputs and source in outputs:
+                config['mappings'][key] = os.path.relpath(outputs[source], web_dir).replace(os.sep, '/')
+                loops.pop(key, None)
+            else:
+                loop = result['loop']
+                loops[key] = [loop['start'] / result['rate'], (loop['start'] + loop['length']) / result['rate']]
+            count += 1
+        if not loops:
+            del config['loops']
+        with open(config_path, 'w') as f:
+            json.dump(config, f, indent=2)
+        print(f"Updated {count} mappings in {config_file}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Find seamless loop regions in the audio library")
+    parser.add_argument("inputs", nargs='*', help="Input directories (default: tones/ and audio/)")
+    parser.add_argument("--trim", action="store_true", help="Write each loop as its own file instead of storing loop points")
+    parser.add_argument("--output-dir", default=os.path.join(REPO_DIR, 'looped'), help="Where trimmed files go")
+    parser.add_argument("--no-configs", action="store_true", help="Leave audio-config.json/tone-config.json alone")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Analysis cache file")
+    parser.add_argument("--min-frequency", type=float, default=DEFAULT_OPTIONS['min_frequency'])
+    parser.add_argument("--max-frequency", type=float, default=DEFAULT_OPTIONS['max_frequency'])
+    parser.add_argument("--max-periods", type=int, default=DEFAULT_OPTIONS['max_periods'],
+                        help="Longest loop considered, in periods")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    args = parser.parse_args()
+
+    options = dict(DEFAULT_OPTIONS, min_frequency=args.min_frequency, max_frequency=args.max_frequency,
+                   max_periods=args.max_periods)
+    results = analyze_library(args.inputs or None, args.cache, options, args.workers)
+    outputs = trim_to_loops(results, args.output_dir) if args.trim else None
+    if not args.no_configs:
+        update_configs(results, outputs)
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,18 @@ Tool to map audio files to keyboard keys for the oscilloscope synthesizer
 """
 import os
 import json
-import glob
+import time
 import shutil
+import argparse
+import contextlib
+import concurrent.futures
+import numpy as np
+from math import gcd
+from scipy.io import wavfile
+from scipy.signal import resample_poly
+from audio_library import AudioLibrary
+from audio_analysis import spectral_features
+from oversample import build_oversampled_pack
 
 # Define keyboard keys (standard QWERTY layout)
 KEYBOARD_KEYS = [
@@ -19,8 +29,21 @@ KEYBOARD_KEYS = [
     'KeyZ', 'KeyX', 'KeyC', 'KeyV', 'KeyB', 'KeyN', 'KeyM'
 ]
 
-def main():
-    """Main function to map audio files to keyboard keys"""
+# Key orders for laying out notes in the page's config files, lowest note first
+KEY_LAYOUTS = {
+    # KEYBOARD_KEYS, row by row from the number row down
+    'rows': ''.join(k[-1].lower() for k in KEYBOARD_KEYS),
+    # Home row first, as the existing tone-config.json does
+    'home': 'asdfghjklqwertyuiopzxcvbnm1234567890',
+}
+
+DEFAULT_ANALYSIS_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pitch_cache.json')
+
+# Bump when spectral_features changes in a way that alters its results
+PITCH_ANALYSIS_VERSION = 1
+
+def interactive_menu():
+    """Interactive menu to map audio files to keyboard keys"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     web_audio_dir = os.path.join(script_dir, 'web', 'audio')
     audio_dir = os.path.join(script_dir, 'audio')
@@ -30,10 +53,10 @@ def main():
     os.makedirs(web_audio_dir, exist_ok=True)
     os.makedirs(audio_dir, exist_ok=True)
     
-    # Find all audio files
-    audio_files = []
-    for ext in ['*.wav', '*.mp3', '*.ogg']:
-        audio_files.extend(glob.glob(os.path.join(audio_dir, ext)))
+    # Find all audio files through the shared library index
+    library = AudioLibrary([web_audio_dir, audio_dir])
+    library.refresh()
+    audio_files = [entry['path'] for entry in library.files(audio_dir)]
     
     # Load existing mapping if available
     keyboard_mapping = {}
@@ -53,14 +76,15 @@ def main():
         print("3. Remove a mapping")
         print("4. Show current mappings")
         print("5. Save mappings")
-        print("6. Exit")
+        print("6. Build audio pack for the browser")
+        print("7. Exit")
         
-        choice = input("\nEnter choice (1-6): ")
+        choice = input("\nEnter choice (1-7): ")
         
         if choice == '1':
-            auto_map(audio_files, keyboard_mapping, web_audio_dir)
+            auto_map(audio_files, keyboard_mapping, web_audio_dir, library)
         elif choice == '2':
-            manual_map(audio_files, keyboard_mapping, web_audio_dir)
+            manual_map(audio_files, keyboard_mapping, web_audio_dir, library)
         elif choice == '3':
             remove_mapping(keyboard_mapping)
         elif choice == '4':
@@ -68,37 +92,48 @@ def main():
         elif choice == '5':
             save_mappings(keyboard_mapping, mapping_file)
         elif choice == '6':
+            build_audio_pack()
+        elif choice == '7':
             print("Exiting...")
             break
         else:
             print("Invalid choice!")
 
-def auto_map(audio_files, keyboard_mapping, web_audio_dir):
+def copy_to_web_audio(audio_file, web_audio_dir, library=None):
+    """Copy an audio file into the web audio directory unless it is already there"""
+    filename = os.path.basename(audio_file)
+    if library is not None:
+        present = library.find(filename, web_audio_dir) is not None
+    else:
+        present = os.path.exists(os.path.join(web_audio_dir, filename))
+    if not present:
+        web_path = os.path.join(web_audio_dir, filename)
+        shutil.copy2(audio_file, web_path)
+        if library is not None:
+            library.add(web_path)
+
+def auto_map(audio_files, keyboard_mapping, web_audio_dir, library=None, clear=None):
     """Automatically map audio files to keyboard keys"""
     # Clear existing mappings if user wants
-    clear = input("Clear existing mappings? (y/n): ").lower() == 'y'
+    if clear is None:
+        clear = input("Clear existing mappings? (y/n): ").lower() == 'y'
     if clear:
         keyboard_mapping.clear()
     
     # Map each audio file to an available key
     count = 0
-    used_keys = set(keyboard_mapping.keys())
+    available_keys = iter([k for k in KEYBOARD_KEYS if k not in keyboard_mapping])
     
     for audio_file in audio_files:
         # Find an available key
-        available_keys = [k for k in KEYBOARD_KEYS if k not in used_keys]
-        if not available_keys:
+        key = next(available_keys, None)
+        if key is None:
             print("No more keys available!")
             break
         
-        key = available_keys[0]
-        used_keys.add(key)
-        
         # Copy the file to web audio directory if needed
         filename = os.path.basename(audio_file)
-        web_path = os.path.join(web_audio_dir, filename)
-        if not os.path.exists(web_path):
-            shutil.copy2(audio_file, web_path)
+        copy_to_web_audio(audio_file, web_audio_dir, library)
         
         # Add mapping
         keyboard_mapping[key] = f"audio/{filename}"
@@ -106,7 +141,356 @@ def auto_map(audio_files, keyboard_mapping, web_audio_dir):
     
     print(f"Auto-mapped {count} audio files to keys")
 
-def manual_map(audio_files, keyboard_mapping, web_audio_dir):
+# Sample formats the normalization pipeline can write
+SAMPLE_FORMATS = {
+    'int16': np.int16,
+    'int32': np.int32,
+    'float32': np.float32,
+}
+
+def read_audio_float(path):
+    """Read a WAV file as (sample rate, float64 array of shape (frames, channels)) in [-1, 1]"""
+    rate, data = wavfile.read(path)
+    if data.dtype.kind == 'i':
+        data = data / float(np.iinfo(data.dtype).max)
+    elif data.dtype.kind == 'u':
+        data = (data.astype(np.float64) - 128.0) / 128.0
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data[:, None]
+    return rate, data
+
+def normalize_samples(data, rate, target_rate=48000, mode='peak', level_db=-1.0, ceiling_db=-0.3,
+                      remove_dc=True):
+    """
+    Resample and level one file's samples
+    
+    Parameters:
+    data -- Float array of shape (frames, channels)
+    rate -- Sample rate of data
+    target_rate -- Output sample rate
+    mode -- 'peak' scales the peak to level_db, 'rms' scales the RMS level
+            to level_db (limited so the peak stays below ceiling_db), and
+            'none' leaves the level alone
+    level_db -- Target level in dBFS
+    ceiling_db -- Highest peak allowed in 'rms' mode, in dBFS
+    remove_dc -- Subtract each channel's mean first
+    
+    Returns (samples, gain applied).
+    """
+    if remove_dc:
+        data = data - data.mean(axis=0)
+    if rate != target_rate:
+        common = gcd(rate, target_rate)
+        data = resample_poly(data, target_rate // common, rate // common, axis=0, padtype='line')
+    
+    peak = np.abs(data).max() if data.size else 0.0
+    gain = 1.0
+    if mode == 'peak' and peak > 0:
+        gain = 10 ** (level_db / 20) / peak
+    elif mode == 'rms' and peak > 0:
+        rms = np.sqrt(np.mean(data * data))
+        gain = min(10 ** (level_db / 20) / rms, 10 ** (ceiling_db / 20) / peak)
+    return data * gain, gain
+
+def to_sample_format(data, sample_format):
+    """Convert float samples in [-1, 1] to one of SAMPLE_FORMATS"""
+    dtype = SAMPLE_FORMATS[sample_format]
+    if np.issubdtype(dtype, np.floating):
+        return data.astype(dtype)
+    scale = np.iinfo(dtype).max
+    return np.round(np.clip(data, -1.0, 1.0) * scale).astype(dtype)
+
+def _normalize_file(job):
+    """Worker for normalize_assets: process one file and time it"""
+    source, output, options = job
+    result = {'file': source, 'output': output, 'status': 'ok', 'error': None, 'gain_db': None, 'seconds': 0.0}
+    start_time = time.perf_counter()
+    try:
+        rate, data = read_audio_float(source)
+        samples, gain = normalize_samples(data, rate, options['target_rate'], options['mode'],
+                                          options['level_db'], options['ceiling_db'], options['remove_dc'])
+        if samples.shape[1] == 1:
+            samples = samples[:, 0]
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        wavfile.write(output, options['target_rate'], to_sample_format(samples, options['sample_format']))
+        result['gain_db'] = 20 * np.log10(gain) if gain > 0 else None
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+def normalize_assets(input_dirs=None, output_dir=None, target_rate=48000, sample_format='int16', mode='peak',
+                     level_db=-1.0, ceiling_db=-0.3, remove_dc=True, workers=None, force=False):
+    """
+    Resample, level and re-encode every WAV in some directories, in parallel
+    
+    Parameters:
+    input_dirs -- Directories to process (defaults to the repository's tones/ and audio/)
+    output_dir -- Where the processed copies go; each input directory gets
+                  a subdirectory of the same name (defaults to normalized/)
+    target_rate -- Output sample rate, e.g. the AudioContext rate
+    sample_format -- One of SAMPLE_FORMATS
+    mode, level_db, ceiling_db, remove_dc -- See normalize_samples
+    workers -- Number of worker processes (defaults to the CPU count)
+    force -- Reprocess files even if they are unchanged
+    
+    Files whose size, mtime and options match the last run (recorded in
+    normalize_manifest.json in output_dir) are skipped. Files that cannot be
+    read, such as mp3/ogg, are reported and do not abort the batch.
+    
+    Returns a dict mapping each source path to its output path.
+    """
+    repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    if input_dirs is None:
+        input_dirs = [os.path.join(repo_dir, 'tones'), os.path.join(repo_dir, 'audio')]
+    if output_dir is None:
+        output_dir = os.path.join(repo_dir, 'normalized')
+    os.makedirs(output_dir, exist_ok=True)
+    options = {
+        'target_rate': target_rate,
+        'sample_format': sample_format,
+        'mode': mode,
+        'level_db': level_db,
+        'ceiling_db': ceiling_db,
+        'remove_dc': remove_dc,
+    }
+    
+    manifest_path = os.path.join(output_dir, 'normalize_manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            print(f"Error loading {manifest_path}: {e}")
+    
+    outputs = {}
+    jobs = []
+    skipped = 0
+    library = AudioLibrary(input_dirs, os.path.join(output_dir, '.audio_index.json'))
+    # Stat every file, so files overwritten in place are picked up too
+    library.refresh(force=True)
+    for input_dir in input_dirs:
+        for entry in library.files(input_dir):
+            source = os.path.normpath(entry['path'])
+            output = os.path.join(output_dir, os.path.basename(os.path.normpath(input_dir)),
+                                  os.path.splitext(entry['name'])[0] + '.wav')
+            outputs[source] = output
+            previous = manifest.get(source)
+            if (previous and previous['mtime_ns'] == entry['mtime_ns'] and previous['size'] == entry['size']
+                    and previous['options'] == options and os.path.exists(output)):
+                skipped += 1
+                continue
+            manifest[source] = {'mtime_ns': entry['mtime_ns'], 'size': entry['size'], 'options': options,
+                                'output': output}
+            jobs.append((source, output, options))
+    
+    workers = workers or os.cpu_count() or 1
+    print(f"Normalizing {len(jobs)} files with {workers} worker(s), {skipped} unchanged")
+    done = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_normalize_file, jobs):
+            done += 1
+            name = os.path.basename(result['file'])
+            if result['status'] == 'ok':
+                print(f"[{done}/{len(jobs)}] {name}: {result['gain_db']:+.1f} dB in {result['seconds']:.2f}s")
+            else:
+                print(f"[{done}/{len(jobs)}] {name}: FAILED ({result['error']})")
+                manifest.pop(result['file'], None)
+                outputs.pop(result['file'], None)
+    
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return outputs
+
+def retarget_configs(outputs, web_dir=None, config_files=('audio-config.json', 'tone-config.json')):
+    """Point config mappings at the normalized copies of their files"""
+    if web_dir is None:
+        web_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web')
+    for config_file in config_files:
+        config_path = os.path.join(web_dir, config_file)
+        try:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"Error loading {config_file}: {e}")
+            continue
+        count = 0
+        for key, filepath in config.get('mappings', {}).items():
+            output = outputs.get(os.path.normpath(os.path.join(web_dir, filepath)))
+            if output:
+                config['mappings'][key] = os.path.relpath(output, web_dir).replace(os.sep, '/')
+                count += 1
+        with open(config_path, 'w') as f:
+            json.dump(config, f, indent=2)
+        print(f"Updated {count} mappings in {config_file}")
+
+def _analyze_pitch(job):
+    """Worker for analyze_pitches: estimate one file's pitch and loudness"""
+    path, digest = job
+    result = {'file': path, 'hash': digest, 'status': 'ok', 'error': None}
+    try:
+        rate, data = read_audio_float(path)
+        result.update(spectral_features(data, rate), duration=len(data) / rate)
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+def analyze_pitches(entries, cache_path=DEFAULT_ANALYSIS_CACHE, workers=None, mp_context=None):
+    """
+    Pitch, loudness and duration of library entries, in parallel
+    
+    Parameters:
+    entries -- AudioLibrary entries (dicts with 'path' and 'hash')
+    cache_path -- JSON file of earlier results keyed by content hash, or
+                  None to analyze everything again
+    workers -- Number of worker processes (defaults to the CPU count);
+               1 analyzes in the calling process
+    mp_context -- multiprocessing context for the pool (default: the
+                  platform's start method)
+    
+    Returns a dict mapping each path to its result (see
+    audio_analysis.spectral_features). Files that cannot be analyzed
+    (e.g. MP3 or Ogg, which scipy cannot read) are reported and kept with
+    status 'error' and no features, so callers can still place them.
+    Failures are cached by content hash too, so a broken file is not
+    decoded again until it changes.
+    """
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                cache = json.load(f)
+        except Exception as e:
+            print(f"Error loading {cache_path}: {e}")
+        if cache.get('version') != PITCH_ANALYSIS_VERSION:
+            cache = {}
+    files = cache.setdefault('files', {})
+    cache['version'] = PITCH_ANALYSIS_VERSION
+    
+    results = {}
+    jobs = []
+    for entry in entries:
+        path = os.path.normpath(entry['path'])
+        if entry['hash'] in files:
+            results[path] = dict(files[entry['hash']], file=path)
+        else:
+            jobs.append((path, entry['hash']))
+    
+    workers = workers or os.cpu_count() or 1
+    print(f"Analyzing {len(jobs)} files with {workers} worker(s), {len(results)} cached")
+    start_time = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if workers > 1 and len(jobs) > 1:
+            pool = stack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                                              mp_context=mp_context))
+            # Many small files: hand them out in chunks to cut scheduling overhead
+            analyzed = pool.map(_analyze_pitch, jobs, chunksize=max(1, len(jobs) // (workers * 8)))
+        else:
+            # One worker, or a single job: not worth starting a pool
+            analyzed = map(_analyze_pitch, jobs)
+        for result in analyzed:
+            results[result['file']] = result
+            files[result['hash']] = result
+            if result['status'] != 'ok':
+                print(f"{os.path.basename(result['file'])}: not analyzed ({result['error']})")
+    print(f"Analyzed {len(jobs)} files in {time.perf_counter() - start_time:.2f}s")
+    
+    if cache_path:
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f, indent=1)
+    return results
+
+def chromatic_layout(results, keys):
+    """
+    Assign analyzed files to keys, lowest pitch on the first key
+    
+    Pitched files are spaced a semitone per key, so gaps in the scale show
+    as unused keys; where the range is wider than the keyboard, or two
+    files share a semitone, they are squeezed onto the next free keys.
+    Unpitched files follow on the remaining keys, darkest sound first,
+    then files that could not be analyzed, by name. Files beyond the last
+    key are left out.
+    
+    Returns a list of (key, path) pairs.
+    """
+    analyzed = [r for r in results.values() if r['status'] == 'ok']
+    pitched = sorted((r for r in analyzed if r['midi'] is not None), key=lambda r: (r['midi'], r['file']))
+    unpitched = sorted((r for r in analyzed if r['midi'] is None), key=lambda r: (r['centroid_hz'], r['file']))
+    unanalyzed = sorted((r for r in results.values() if r['status'] != 'ok'), key=lambda r: r['file'])
+    ordered = (pitched + unpitched + unanalyzed)[:len(keys)]
+    
+    slots = []
+    if pitched:
+        lowest = round(pitched[0]['midi'])
+    for i, result in enumerate(ordered):
+        # Semitone position for pitched files, next key otherwise
+        wanted = round(result['midi']) - lowest if result.get('midi') is not None else 0
+        slot = max(wanted, slots[-1] + 1 if slots else 0)
+        # Leave room for the files still to come
+        slots.append(min(slot, len(keys) - (len(ordered) - i)))
+    return [(keys[slot], result['file']) for slot, result in zip(slots, ordered)]
+
+def pitch_map(input_dirs=None, config_file='audio-config.json', layout='rows', web_dir=None,
+              cache_path=DEFAULT_ANALYSIS_CACHE, workers=None):
+    """
+    Map a library to the keyboard by pitch and write the page's config file
+    
+    Parameters:
+    input_dirs -- Directories to map (defaults to the repository's audio/
+                  for audio-config.json and tones/ for tone-config.json)
+    config_file -- Config file in web_dir to (re)write
+    layout -- Name in KEY_LAYOUTS, or a string of keys in order
+    web_dir -- Directory holding the config files
+    cache_path, workers -- See analyze_pitches
+    
+    The config's settings are kept; its mappings are replaced, and loop
+    points are kept only for keys still mapped to the same file.
+    Returns the new mappings.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if web_dir is None:
+        web_dir = os.path.join(script_dir, '..', 'web')
+    if input_dirs is None:
+        name = 'tones' if config_file == 'tone-config.json' else 'audio'
+        input_dirs = [os.path.join(script_dir, '..', name)]
+    keys = KEY_LAYOUTS.get(layout, layout)
+    
+    library = AudioLibrary(input_dirs)
+    library.refresh()
+    entries = [entry for d in input_dirs for entry in library.files(d)]
+    results = analyze_pitches(entries, cache_path, workers)
+    assignments = chromatic_layout(results, keys)
+    
+    config_path = os.path.join(web_dir, config_file)
+    config = {'mappings': {}, 'settings': {'fadeInTime': 0.01, 'fadeOutTime': 0.05, 'defaultVolume': 0.8}}
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"Error loading {config_file}: {e}")
+    old_mappings = config.get('mappings', {})
+    mappings = {key: os.path.relpath(path, web_dir).replace(os.sep, '/') for key, path in assignments}
+    config['mappings'] = mappings
+    if 'loops' in config:
+        config['loops'] = {key: loop for key, loop in config['loops'].items()
+                           if old_mappings.get(key) == mappings.get(key)}
+    with open(config_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    
+    for key, path in assignments:
+        result = results[path]
+        pitch = f"{result['pitch_hz']:.1f} Hz" if result['pitch_hz'] else "unpitched"
+        print(f"{key} -> {os.path.basename(path)} ({pitch})")
+    skipped = len(results) - len(assignments)
+    print(f"Mapped {len(assignments)} files in {config_file}" + (f", {skipped} did not fit" if skipped else ""))
+    return mappings
+
+def manual_map(audio_files, keyboard_mapping, web_audio_dir, library=None):
     """Manually map an audio file to a key"""
     # Show available audio files
     print("\nAvailable audio files:")
@@ -133,9 +517,7 @@ def manual_map(audio_files, keyboard_mapping, web_audio_dir):
             return
         
         # Copy the file to web audio directory if needed
-        web_path = os.path.join(web_audio_dir, filename)
-        if not os.path.exists(web_path):
-            shutil.copy2(audio_file, web_path)
+        copy_to_web_audio(audio_file, web_audio_dir, library)
         
         # Add mapping
         keyboard_mapping[key] = f"audio/{filename}"
@@ -183,5 +565,127 @@ def save_mappings(keyboard_mapping, mapping_file):
     except Exception as e:
         print(f"Error saving mapping file: {e}")
 
+def load_pack_source(path, sample_rate):
+    """Read a WAV as planar float32 (channels, frames) at the pack sample rate"""
+    rate, data = read_audio_float(path)
+    if rate != sample_rate:
+        common = gcd(rate, sample_rate)
+        data = resample_poly(data, sample_rate // common, rate // common, axis=0)
+    return np.ascontiguousarray(data.T, dtype=np.float32)
+
+def build_audio_pack(web_dir=None, config_files=('audio-config.json', 'tone-config.json'),
+                     pack_name='audio-pack', sample_rate=44100):
+    """
+    Concatenate every mapped asset into one binary pack for the browser
+    
+    Parameters:
+    web_dir -- Directory holding index.html and the config files
+    config_files -- Mapping configs to pack, relative to web_dir
+    pack_name -- Base name of the <name>.bin pack and <name>.json manifest
+    sample_rate -- Sample rate every asset is converted to
+    
+    The pack is raw little-endian float32, one asset after another, each
+    stored planar (all of channel 0, then channel 1). The manifest maps
+    each config file and key to the asset's offset (in float32 values from
+    the start of the pack), length in frames, channel count and loop points
+    (seconds, from an optional "loops": {key: [start, end]} section of the
+    config), so the page can view the samples in place instead of fetching
+    and decoding each file. Assets used by several keys are stored once.
+    Files that cannot be read (e.g. mp3/ogg) are left out and the page
+    loads them individually.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if web_dir is None:
+        web_dir = os.path.join(script_dir, '..', 'web')
+    pack_path = os.path.join(web_dir, f"{pack_name}.bin")
+    manifest_path = os.path.join(web_dir, f"{pack_name}.json")
+    
+    assets = {}
+    manifest = {'version': 1, 'sampleRate': sample_rate, 'pack': f"{pack_name}.bin", 'configs': {}}
+    offset = 0
+    with open(pack_path + '.tmp', 'wb') as pack:
+        for config_file in config_files:
+            try:
+                with open(os.path.join(web_dir, config_file), 'r') as f:
+                    config = json.load(f)
+            except Exception as e:
+                print(f"Error loading {config_file}: {e}")
+                continue
+            
+            entries = {}
+            for key, filepath in config.get('mappings', {}).items():
+                source = os.path.normpath(os.path.join(web_dir, filepath))
+                if source not in assets:
+                    try:
+                        planar = load_pack_source(source, sample_rate)
+                    except Exception as e:
+                        print(f"Skipping {filepath}: {e}")
+                        continue
+                    pack.write(planar.astype('<f4').tobytes())
+                    assets[source] = {'offset': offset, 'length': planar.shape[1], 'channels': planar.shape[0]}
+                    offset += planar.size
+                entry = dict(assets[source], file=filepath)
+                # Loop points in seconds, if the mapping config carries them
+                loop = config.get('loops', {}).get(key)
+                entry['loopStart'] = loop[0] if loop else None
+                entry['loopEnd'] = loop[1] if loop else None
+                entries[key] = entry
+            manifest['configs'][config_file] = entries
+    
+    os.replace(pack_path + '.tmp', pack_path)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Packed {len(assets)} assets ({offset * 4 / (1024 * 1024):.1f} MB) into {pack_path}")
+    return manifest
+
+def main():
+    """Run a subcommand, or the interactive menu when none is given"""
+    parser = argparse.ArgumentParser(description="Map, normalize and pack audio for the oscilloscope synthesizer")
+    commands = parser.add_subparsers(dest="command")
+    
+    normalize = commands.add_parser("normalize", help="Resample, level and re-encode audio assets")
+    normalize.add_argument("inputs", nargs='*', help="Input directories (default: tones/ and audio/)")
+    normalize.add_argument("--output-dir", default=None, help="Output directory (default: normalized/)")
+    normalize.add_argument("--rate", type=int, default=48000, help="Target sample rate")
+    normalize.add_argument("--format", choices=sorted(SAMPLE_FORMATS), default='int16', help="Output sample format")
+    normalize.add_argument("--mode", choices=['peak', 'rms', 'none'], default='peak', help="Level normalization")
+    normalize.add_argument("--level", type=float, default=-1.0, help="Target peak or RMS level in dBFS")
+    normalize.add_argument("--ceiling", type=float, default=-0.3, help="Peak ceiling in rms mode, dBFS")
+    normalize.add_argument("--keep-dc", action="store_true", help="Do not remove DC offset")
+    normalize.add_argument("--workers", type=int, default=None, help="Worker processes")
+    normalize.add_argument("--force", action="store_true", help="Reprocess unchanged files")
+    normalize.add_argument("--update-configs", action="store_true",
+                           help="Point audio-config.json/tone-config.json at the normalized files")
+    
+    automap = commands.add_parser("automap", help="Map a library to the keyboard by pitch")
+    automap.add_argument("inputs", nargs='*', help="Input directories (default: audio/ or tones/)")
+    automap.add_argument("--config", choices=['audio-config.json', 'tone-config.json'], default='audio-config.json',
+                         help="Config file to write")
+    automap.add_argument("--layout", default='rows',
+                         help=f"Key order, lowest note first: {' or '.join(KEY_LAYOUTS)}, or the keys themselves")
+    automap.add_argument("--no-cache", action="store_true", help="Analyze every file again")
+    automap.add_argument("--workers", type=int, default=None, help="Worker processes")
+    
+    pack = commands.add_parser("pack", help="Build web/audio-pack.bin and its manifest")
+    pack.add_argument("--rate", type=int, default=44100, help="Pack sample rate")
+    pack.add_argument("--oversample", action="store_true",
+                      help="Also pre-oversample the scope notes (the page must run at --rate)")
+    args = parser.parse_args()
+    
+    if args.command == 'normalize':
+        outputs = normalize_assets(args.inputs or None, args.output_dir, args.rate, args.format, args.mode,
+                                   args.level, args.ceiling, not args.keep_dc, args.workers, args.force)
+        if args.update_configs:
+            retarget_configs(outputs)
+    elif args.command == 'automap':
+        pitch_map(args.inputs or None, args.config, args.layout,
+                  cache_path=None if args.no_cache else DEFAULT_ANALYSIS_CACHE, workers=args.workers)
+    elif args.command == 'pack':
+        build_audio_pack(sample_rate=args.rate)
+        if args.oversample:
+            build_oversampled_pack()
+    else:
+        interactive_menu()
+
 if __name__ == "__main__":
     main()
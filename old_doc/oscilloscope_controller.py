@@ -3,8 +3,18 @@ import os
 import time
 import webbrowser
 import json
+import shlex
+import multiprocessing
 import threading
 import numpy as np
+from expression_engine import wavetable, encode_table, ExpressionError
+from controls_store import ControlsStore
+from audio_library import AudioLibrary
+from telemetry import TelemetryCollector, LatencyTracker
+from xy_stream import XYStream, PointSource, ExpressionSource, svg_source, load_points
+from text_render import GlyphCache, TextSource
+from map_audio import analyze_pitches, chromatic_layout
+from recorder import XYRecorder
 
 # Initialize eel with the web folder
 eel.init('/home/kavinda/Desktop/2025/yogeshwari/keyboard_ps/xy osci/web')
@@ -13,13 +23,31 @@ eel.init('/home/kavinda/Desktop/2025/yogeshwari/keyboard_ps/xy osci/web')
 is_playing = False
 audio_loaded = False
 
+# Index of web/audio and audio/, kept in .audio_index.json between runs
+audio_library = AudioLibrary()
+
+# Rolling frame/audio timing stats reported by the page
+telemetry = TelemetryCollector()
+
+# Key-to-sound latency traces, sent by the page while latencyTrace is on
+key_latency = LatencyTracker()
+
+# Live X/Y blocks rendered here and played by the page's scope node
+xy_stream = XYStream(lambda block: eel.receive_stream_block(block))
+
+# Writes what the page displayed while the recording control is on
+xy_recorder = XYRecorder()
+
+# Glyphs for streamed text, sampled once
+glyph_cache = None
+
 # Keyboard mapping (key -> audio file)
 keyboard_mapping = {
     # Default mappings - will be populated later
 }
 
 # Control variables (previously in the UI)
-controls = {
+controls = ControlsStore({
     'swapXY': False,
     'sweepOn': False,
     'sweepMsDiv': 1,
@@ -40,32 +68,135 @@ controls = {
     'persistence': 0.2,  # Adjusted for clearer phosphor effect
     'xExpression': "sin(2*PI*a*t)*cos(2*PI*b*t)",
     'yExpression': "cos(2*PI*a*t)*cos(2*PI*b*t)",
-}
+    'preOversampled': True,  # Draw notes from audio-pack-oversampled.bin instead of filtering
+    'latencyTrace': False,  # Time each key press from keydown to the first drawn frame
+    'recording': False,  # Page sends the displayed X/Y samples to xy_recorder
+    'recordTake': 0,  # Take id the page tags recorded chunks with
+})
 
 # Control commands
 @eel.expose
 def get_all_controls():
     """Get all control values"""
-    return controls
+    return controls.snapshot()
 
 @eel.expose
 def set_control(name, value):
     """Set a specific control value"""
     if name in controls:
-        old_value = controls[name]
         controls[name] = value
-        print(f"Control {name} changed: {old_value} -> {value}")
         return True
     return False
 
+@eel.expose
+def set_controls(changes):
+    """Set several control values at once; returns the new version and what changed"""
+    return controls.set_controls(changes)
+
+@eel.expose
+def get_changes_since(version):
+    """Get the controls changed after a version, for clients catching up"""
+    return controls.get_changes_since(version)
+
 @eel.expose
 def toggle_control(name):
     """Toggle a boolean control value"""
-    if name in controls and isinstance(controls[name], bool):
-        controls[name] = not controls[name]
-        print(f"Control {name} toggled to {controls[name]}")
-        return controls[name]
-    return None
+    value = controls.toggle(name)
+    if value is not None:
+        print(f"Control {name} toggled to {value}")
+    return value
+
+def push_control_changes(changes):
+    """Send coalesced control changes to the page"""
+    eel.apply_control_changes(changes)
+
+@eel.expose
+def get_wavetable(x_expression, y_expression, a, b, sample_rate):
+    """Return one period of the X/Y signal generator output as base64 float32 tables"""
+    try:
+        return encode_table(wavetable(x_expression, y_expression, float(a), float(b), int(sample_rate)))
+    except ExpressionError as e:
+        print(f"Expression error: {e}")
+        return {'error': str(e)}
+
+@eel.expose
+def report_telemetry(batch):
+    """Receive a batch of render-loop and audio-callback measurements from the page"""
+    telemetry.add_batch(batch)
+    return True
+
+@eel.expose
+def report_key_latency(trace):
+    """Receive the stage timings of one traced key press"""
+    if key_latency.add_trace(trace):
+        print(f"Slow key {trace.get('key')}: {trace['first_frame_ms']:.1f} ms to first frame "
+              f"(audio after {trace.get('first_audio_ms') or 0:.1f} ms)")
+    return True
+
+@eel.expose
+def stream_ready(sample_rate):
+    """Called by the page once its audio context runs, with the context's sample rate"""
+    xy_stream.set_sample_rate(sample_rate)
+    return xy_stream.status()
+
+@eel.expose
+def stream_ack(stream_id, seq, page_stats=None):
+    """The page consumed a stream block; frees one block of the send window"""
+    xy_stream.ack(stream_id, seq, page_stats)
+    return True
+
+@eel.expose
+def start_stream(kind, source, drawing_rate=50.0, scroll_speed=0.0):
+    """
+    Start streaming from an SVG ('svg'), a point file ('points'), text
+    ('text', scrolling left at scroll_speed font units per second if set)
+    or an expression pair ('expression', source = [x_expression,
+    y_expression], using the current a and b controls)
+    """
+    global glyph_cache
+    try:
+        if kind == 'svg':
+            stream_source = svg_source(source, xy_stream.sample_rate or 44100, float(drawing_rate))
+        elif kind == 'points':
+            stream_source = PointSource(load_points(source), float(drawing_rate))
+        elif kind == 'text':
+            if glyph_cache is None:
+                glyph_cache = GlyphCache()
+            scroll_speed = float(scroll_speed)
+            stream_source = TextSource(source, scroll_speed=scroll_speed, window=40.0 if scroll_speed else None,
+                                       cache=glyph_cache)
+        elif kind == 'expression':
+            x_expression, y_expression = source
+            stream_source = ExpressionSource(x_expression, y_expression,
+                                             controls['aValue'] * 10 ** controls['aExponent'],
+                                             controls['bValue'] * 10 ** controls['bExponent'])
+        else:
+            return {'error': f"unknown stream source: {kind}"}
+        return {'stream': xy_stream.start(stream_source)}
+    except (OSError, ValueError, RuntimeError, ExpressionError) as e:
+        print(f"Error starting stream: {e}")
+        return {'error': str(e)}
+
+@eel.expose
+def stop_stream():
+    """Stop the live stream; the page plays out its buffer"""
+    return xy_stream.stop()
+
+@eel.expose
+def record_chunk(chunk):
+    """Receive a chunk of displayed X/Y samples and key markers; queued for the writer thread"""
+    return xy_recorder.add_chunk(chunk)
+
+def start_recording(path, file_format=None):
+    """Open a recording and tell the page to start sending what it displays"""
+    take = xy_recorder.start(path, file_format)
+    controls.set_controls({'recordTake': take, 'recording': True})
+    return take
+
+def stop_recording():
+    """Tell the page to stop and close the file once its last chunk is written"""
+    controls['recording'] = False
+    return xy_recorder.stop()
 
 @eel.expose
 def get_keyboard_mapping():
@@ -113,41 +244,35 @@ def list_audio_files():
         os.makedirs(audio_dir)
         return []
     
-    # Get all audio files (wav, mp3, ogg)
-    audio_files = []
-    for ext in ['.wav', '.mp3', '.ogg']:
-        audio_files.extend([f for f in os.listdir(audio_dir) if f.lower().endswith(ext)])
-    return audio_files
+    # Only directories that changed since the last call are rescanned
+    audio_library.refresh()
+    return audio_library.names(audio_dir)
 
 def ensure_audio_file_accessible(filename):
     """Make sure an audio file is accessible from the web directory"""
     try:
-        # First check if the file includes the web/audio path
-        if filename.startswith('audio/'):
-            web_path = os.path.join('web', filename)
-            full_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), web_path)
-            if os.path.exists(full_path):
-                return filename
+        audio_library.refresh()
         
         # Check in web/audio directory
         audio_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web', 'audio')
-        full_path = os.path.join(audio_dir, os.path.basename(filename))
+        if audio_library.find(filename, audio_dir):
+            return f"audio/{os.path.basename(filename)}"
         
         # If not found in web/audio, check in regular audio directory and copy if needed
-        if not os.path.exists(full_path):
-            alt_audio_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audio')
-            alt_path = os.path.join(alt_audio_dir, os.path.basename(filename))
-            
-            if os.path.exists(alt_path):
-                # Copy to web/audio
-                os.makedirs(audio_dir, exist_ok=True)
-                import shutil
-                shutil.copy2(alt_path, full_path)
-                print(f"Copied audio file {filename} to web directory")
-            else:
-                # Not found
-                print(f"Audio file {filename} not found")
-                return None
+        alt_audio_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audio')
+        alt_entry = audio_library.find(filename, alt_audio_dir)
+        if alt_entry is None:
+            # Not found
+            print(f"Audio file {filename} not found")
+            return None
+        
+        # Copy to web/audio
+        os.makedirs(audio_dir, exist_ok=True)
+        import shutil
+        full_path = os.path.join(audio_dir, os.path.basename(filename))
+        shutil.copy2(alt_entry['path'], full_path)
+        audio_library.add(full_path)
+        print(f"Copied audio file {filename} to web directory")
         
         # Return the web-accessible path
         return f"audio/{os.path.basename(filename)}"
@@ -158,8 +283,26 @@ def ensure_audio_file_accessible(filename):
         traceback.print_exc()
         return None
 
+# Startup and the console may both remap the keyboard
+automap_lock = threading.Lock()
+
+# Processes the automap's pitch analysis uses (None = one per CPU). Workers
+# are forked: a spawned worker would re-run this module, eel.start included,
+# so where fork is unavailable the analysis runs in this process
+AUTOMAP_WORKERS = None
+
+def automap_pool_options():
+    """analyze_pitches workers and mp_context for this platform"""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return {'workers': 1}
+    return {'workers': AUTOMAP_WORKERS, 'mp_context': multiprocessing.get_context('fork')}
+
 def auto_map_keyboard():
     """Automatically map keyboard keys to available audio files"""
+    with automap_lock:
+        return _auto_map_keyboard()
+
+def _auto_map_keyboard():
     # Standard keyboard key order (QWERTY layout)
     key_rows = [
         ['KeyQ', 'KeyW', 'KeyE', 'KeyR', 'KeyT', 'KeyY', 'KeyU', 'KeyI', 'KeyO', 'KeyP'],
@@ -174,18 +317,22 @@ def auto_map_keyboard():
     # Flatten the array
     keys = [key for row in key_rows for key in row]
     
-    # Get available audio files
+    # Get available audio files, lowest pitch on the first key; the
+    # analysis is cached by content hash, so only new files are decoded
     audio_files = list_audio_files()
+    audio_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web', 'audio')
+    results = analyze_pitches(audio_library.files(audio_dir), **automap_pool_options())
     
     # Create mappings
-    for i, audio_file in enumerate(audio_files):
-        if i < len(keys):
-            filepath = ensure_audio_file_accessible(audio_file)
-            if filepath:
-                keyboard_mapping[keys[i]] = filepath
-                print(f"Auto-mapped {keys[i]} to {filepath}")
+    mapped = 0
+    for key, path in chromatic_layout(results, keys):
+        filepath = ensure_audio_file_accessible(os.path.basename(path))
+        if filepath:
+            keyboard_mapping[key] = filepath
+            mapped += 1
+            print(f"Auto-mapped {key} to {filepath}")
     
-    print(f"Auto-mapped {min(len(audio_files), len(keys))} keys to audio files")
+    print(f"Auto-mapped {mapped} of {len(audio_files)} audio files to keys")
     return True
 
 # JavaScript function to be exposed to Python
@@ -193,11 +340,15 @@ def auto_map_keyboard():
 def js_ready():
     """Called when JavaScript is ready"""
     print("JavaScript is ready. Setting up keyboard synthesizer...")
-    try:
-        # Auto-map keyboard to available audio files
-        auto_map_keyboard()
-    except Exception as e:
-        print(f"Error setting up keyboard synthesizer: {e}")
+
+    def setup():
+        try:
+            # Auto-map keyboard to available audio files
+            auto_map_keyboard()
+        except Exception as e:
+            print(f"Error setting up keyboard synthesizer: {e}")
+    # Analyzing a large library takes a while; do not hold up the page
+    threading.Thread(target=setup, daemon=True).start()
 
 # Interactive console interface
 def console_interface():
@@ -223,6 +374,22 @@ def console_interface():
                 print("  map <key> <file>       - Map a key to an audio file")
                 print("  unmap <key>            - Remove a key mapping")
                 print("  automap                - Automatically map keys to files")
+                print("  stats                  - Show frame and audio timing percentiles")
+                print("  stats export <file>    - Save timing data as .csv or .json")
+                print("  stats reset            - Clear timing data")
+                print("  latency                - Show key-to-sound latency (set latencyTrace true)")
+                print("  latency export <file>  - Save latency traces as .json")
+                print("  latency reset          - Clear latency traces")
+                print("  stream svg <file> [rate]    - Stream an SVG, drawn rate times per second")
+                print("  stream points <file> [rate] - Stream a .npy/.csv/.txt point array")
+                print("  stream expr <x> ; <y>       - Stream an expression pair")
+                print("  stream text <text>          - Stream text (\\n for a new line)")
+                print("  stream scroll <speed> <text> - Stream text scrolling at speed units/s")
+                print("  stream stop            - Stop the live stream")
+                print("  stream status          - Show stream flow and page buffer")
+                print("  record start <file> [wav|raw] - Record the displayed X/Y samples and key markers (quote paths with spaces)")
+                print("  record stop            - Finish the recording")
+                print("  record status          - Show recording progress and dropped chunks")
                 print("  quit/exit              - Exit program")
             elif command == 'set':
                 if len(cmd) < 2:
@@ -306,11 +473,84 @@ def console_interface():
             elif command == 'automap':
                 auto_map_keyboard()
                 print("Automatically mapped keys to audio files")
+            elif command == 'stats':
+                args = cmd[1].split(' ', 1) if len(cmd) > 1 else []
+                if not args:
+                    for line in telemetry.format_summary():
+                        print(line)
+                elif args[0] == 'export' and len(args) > 1:
+                    count = telemetry.export(args[1])
+                    print(f"Exported {count} values to {args[1]}")
+                elif args[0] == 'reset':
+                    telemetry.reset()
+                    print("Telemetry cleared")
+                else:
+                    print("Usage: stats [export <file>|reset]")
+            elif command == 'latency':
+                args = cmd[1].split(' ', 1) if len(cmd) > 1 else []
+                if not args:
+                    if not controls['latencyTrace']:
+                        print("Latency tracing is off; use 'set latencyTrace true'")
+                    for line in key_latency.format_summary():
+                        print(line)
+                elif args[0] == 'export' and len(args) > 1:
+                    count = key_latency.export(args[1])
+                    print(f"Exported {count} traces to {args[1]}")
+                elif args[0] == 'reset':
+                    key_latency.reset()
+                    print("Latency traces cleared")
+                else:
+                    print("Usage: latency [export <file>|reset]")
+            elif command == 'stream':
+                args = cmd[1].split(' ', 1) if len(cmd) > 1 else []
+                if args and args[0] in ('svg', 'points') and len(args) > 1:
+                    path, _, rate = args[1].partition(' ')
+                    result = start_stream(args[0], path, float(rate) if rate else 50.0)
+                elif args and args[0] == 'expr' and len(args) > 1 and ';' in args[1]:
+                    result = start_stream('expression', [part.strip() for part in args[1].split(';', 1)])
+                elif args and args[0] == 'text' and len(args) > 1:
+                    result = start_stream('text', args[1].replace('\\n', '\n'))
+                elif args and args[0] == 'scroll' and len(args) > 1 and ' ' in args[1]:
+                    speed, text = args[1].split(' ', 1)
+                    result = start_stream('text', text, scroll_speed=float(speed))
+                elif args and args[0] == 'stop':
+                    result = None
+                    print("Stream stopped" if stop_stream() else "No stream running")
+                elif args and args[0] == 'status':
+                    result = None
+                    for name, value in xy_stream.status().items():
+                        print(f"{name} = {value}")
+                else:
+                    result = None
+                    print("Usage: stream [svg|points <file> [rate]|expr <x> ; <y>|text <text>|scroll <speed> <text>|stop|status]")
+                if result:
+                    print(f"Stream error: {result['error']}" if 'error' in result else f"Streaming (stream {result['stream']})")
+            elif command == 'record':
+                args = shlex.split(cmd[1]) if len(cmd) > 1 else []
+                if args and args[0] == 'start' and len(args) in (2, 3):
+                    take = start_recording(args[1], args[2] if len(args) == 3 else None)
+                    print(f"Recording take {take} to {args[1]}")
+                elif args and args[0] == 'stop':
+                    info = stop_recording()
+                    if info is None:
+                        print("Not recording")
+                    else:
+                        rate = info['sample_rate'] or 1
+                        print(f"Saved {info['frames'] / rate:.1f}s to {info['path']} "
+                              f"({info['markers']} markers, {info['dropped_chunks']} chunks dropped)")
+                elif args and args[0] == 'status':
+                    for name, value in xy_recorder.status().items():
+                        print(f"{name} = {value}")
+                else:
+                    print("Usage: record [start <file> [wav|raw]|stop|status]")
             else:
                 print(f"Unknown command: {command}")
         except Exception as e:
             print(f"Error: {str(e)}")
 
+# Push control changes to the page at most once per animation frame
+controls.start_push(push_control_changes, interval=1 / 60.0)
+
 # Start the console interface in a separate thread
 console_thread = threading.Thread(target=console_interface, daemon=True)
 console_thread.start()
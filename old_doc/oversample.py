@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Offline version of the page's Lanczos oversampling filter
+
+Filter.generateSmoothedSamples in oscilloscope.js inserts steps-1 points
+between every pair of samples, using a Lanczos kernel (a lobes, window
+raised to lanczosTweak) evaluated sample by sample on every audio block.
+This module computes the same points for a whole asset at once as a
+polyphase filter: one (2a-1)-tap filter per inserted point, applied with
+a single matrix product.
+
+The scope notes of the audio pack (audio-config.json) are oversampled
+into web/audio-pack-oversampled.bin so that the page, with the
+preOversampled control on, can draw them directly instead of filtering
+each block. The pack must be built at the page's sample rate for this to
+be used (python map_audio.py pack --rate 48000 --oversample).
+
+Usage:
+  python oversample.py                    # oversample web/audio-pack.bin
+  python oversample.py --steps 6 --a 8
+"""
+import os
+import json
+import argparse
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WEB_DIR = os.path.join(SCRIPT_DIR, '..', 'web')
+
+# Filter.init(1024, 8, 6) and Filter.lanczosTweak in oscilloscope.js
+DEFAULT_A = 8
+DEFAULT_STEPS = 6
+DEFAULT_TWEAK = 1.5
+
+def lanczos_kernel(a=DEFAULT_A, steps=DEFAULT_STEPS, tweak=DEFAULT_TWEAK):
+    """
+    Kernel values K[0..a*steps-1], as createLanczosKernel computes them
+
+    K[i] is the weight of a sample i/steps input samples away. Values are
+    rounded to float32 like the page's Float32Array.
+    """
+    K = np.ones(a * steps)
+    piX = np.pi * np.arange(1, a * steps) / steps
+    sinc = np.sin(piX) / piX
+    window = a * np.sin(piX / a) / piX
+    K[1:] = sinc * np.power(window, tweak)
+    return K.astype(np.float32).astype(np.float64)
+
+def polyphase_taps(a=DEFAULT_A, steps=DEFAULT_STEPS, tweak=DEFAULT_TWEAK):
+    """
+    Filter taps per output phase, shape (steps, 2a-1)
+
+    Row r weights samples -a+1..a-1 around an input position to give the
+    point r/steps of the way to the next sample. Row 0 copies the sample
+    itself, as the page does.
+    """
+    K = lanczos_kernel(a, steps, tweak)
+    s = np.arange(-a + 1, a)
+    r = np.arange(steps)[:, None]
+    taps = K[np.abs(s * steps - r)]
+    taps[0] = (s == 0)
+    return taps
+
+def oversample(samples, a=DEFAULT_A, steps=DEFAULT_STEPS, tweak=DEFAULT_TWEAK, loop=True):
+    """
+    Oversample a signal by steps with the page's Lanczos filter
+
+    Parameters:
+    samples -- 1-D array of samples
+    a -- Kernel lobes
+    steps -- Output points per input sample
+    tweak -- Exponent of the Lanczos window (Filter.lanczosTweak)
+    loop -- Treat the signal as periodic (notes loop); otherwise pad with zeros
+
+    Returns float32 of length len(samples) * steps, where point
+    p * steps + r lies r/steps of the way from sample p to sample p+1.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    taps = polyphase_taps(a, steps, tweak)
+    mode = 'wrap' if loop else 'constant'
+    padded = np.pad(samples, a - 1, mode=mode)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * a - 1)
+    return (windows @ taps.T).astype(np.float32).ravel()
+
+def build_oversampled_pack(web_dir=None, pack_name='audio-pack', config_file='audio-config.json',
+                           a=DEFAULT_A, steps=DEFAULT_STEPS, tweak=DEFAULT_TWEAK):
+    """
+    Oversample the scope notes of an audio pack
+
+    Writes <pack_name>-oversampled.bin, planar float32 like the pack, and
+    <pack_name>-oversampled.json with each key's offset, frame count and
+    channels plus the filter settings. Only config_file is processed:
+    tones are routed straight to the speakers and never reach the scope.
+    """
+    if web_dir is None:
+        web_dir = DEFAULT_WEB_DIR
+    with open(os.path.join(web_dir, f"{pack_name}.json"), 'r') as f:
+        manifest = json.load(f)
+    pack = np.fromfile(os.path.join(web_dir, manifest['pack']), dtype='<f4')
+    out_name = f"{pack_name}-oversampled"
+    out_path = os.path.join(web_dir, f"{out_name}.bin")
+
+    entries = {}
+    streams = {}
+    offset = 0
+    with open(out_path + '.tmp', 'wb') as out:
+        for key, entry in manifest['configs'].get(config_file, {}).items():
+            source = (entry['offset'], entry['length'], entry['channels'])
+            if source not in streams:
+                planar = pack[entry['offset']:entry['offset'] + entry['length'] * entry['channels']]
+                for channel in planar.reshape(entry['channels'], entry['length']):
+                    out.write(oversample(channel, a, steps, tweak).astype('<f4').tobytes())
+                streams[source] = offset
+                offset += entry['length'] * entry['channels'] * steps
+            entries[key] = {'offset': streams[source], 'length': entry['length'],
+                            'channels': entry['channels'], 'file': entry['file']}
+    os.replace(out_path + '.tmp', out_path)
+
+    oversampled = {'version': 1, 'sampleRate': manifest['sampleRate'], 'pack': f"{out_name}.bin",
+                   'config': config_file, 'a': a, 'steps': steps, 'tweak': tweak, 'entries': entries}
+    with open(os.path.join(web_dir, f"{out_name}.json"), 'w') as f:
+        json.dump(oversampled, f, indent=2)
+    print(f"Oversampled {len(streams)} assets x{steps} ({offset * 4 / (1024 * 1024):.1f} MB) into {out_path}")
+    return oversampled
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-oversample the audio pack with the page's Lanczos filter")
+    parser.add_argument("--web-dir", default=None, help="Directory holding the audio pack")
+    parser.add_argument("--pack", default='audio-pack', help="Base name of the pack")
+    parser.add_argument("--a", type=int, default=DEFAULT_A, help="Kernel lobes")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="Output points per sample")
+    parser.add_argument("--tweak", type=float, default=DEFAULT_TWEAK, help="Lanczos window exponent")
+    args = parser.parse_args()
+    build_oversampled_pack(args.web_dir, args.pack, a=args.a, steps=args.steps, tweak=args.tweak)
+
+if __name__ == "__main__":
+    main()
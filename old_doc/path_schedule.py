@@ -0,0 +1,149 @@
+"""
+Path ordering for XY drawings: minimize beam travel between subpaths
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+def travel_length(path_points, closed=True):
+    """
+    Total jump distance between consecutive paths
+
+    With closed=True the jump from the last path back to the first is
+    included, since the drawing is traced over and over.
+    """
+    if len(path_points) < 2:
+        return 0.0
+    exits = np.array([p[-1] for p in path_points])
+    entries = np.array([p[0] for p in path_points])
+    if closed:
+        entries = np.roll(entries, -1, axis=0)
+    else:
+        exits, entries = exits[:-1], entries[1:]
+    return float(np.hypot(*(entries - exits).T).sum())
+
+def _endpoint_tree(path_points):
+    """KD-tree over path endpoints: entry 2*i is the start of path i, 2*i+1 its end"""
+    endpoints = np.empty((2 * len(path_points), 2))
+    endpoints[0::2] = [p[0] for p in path_points]
+    endpoints[1::2] = [p[-1] for p in path_points]
+    return cKDTree(endpoints)
+
+def _nearest_neighbour_order(path_points, tree):
+    """Greedy tour over path endpoints; returns (order, reversed flags)"""
+    count = len(path_points)
+    visited = np.zeros(count, dtype=bool)
+    order = [0]
+    flipped = [False]
+    visited[0] = True
+    position = path_points[0][-1]
+    while len(order) < count:
+        # Widen the query until it reaches an endpoint of an unvisited path
+        k = 8
+        while True:
+            _, hits = tree.query(position, k=min(k, 2 * count))
+            hits = np.atleast_1d(hits)
+            candidates = hits[~visited[hits // 2]]
+            if len(candidates) or k >= 2 * count:
+                break
+            k *= 4
+        hit = candidates[0]
+        index = hit // 2
+        reverse = bool(hit % 2)
+        visited[index] = True
+        order.append(index)
+        flipped.append(reverse)
+        position = path_points[index][0] if reverse else path_points[index][-1]
+    return np.array(order), np.array(flipped)
+
+def _two_opt(path_points, tree, order, flipped, max_passes, neighbours):
+    """
+    Improve a closed tour by reversing runs of paths while that shortens it
+
+    Only moves whose new edge lands on one of the nearest endpoints are
+    tried, which keeps each pass close to linear in the number of paths.
+    """
+    count = len(order)
+    # Endpoint coordinates never move, so the neighbour lists are computed once
+    _, nearest = tree.query(tree.data, k=min(neighbours, 2 * count))
+    nearest = nearest.reshape(2 * count, -1) // 2
+    entries = np.array([path_points[i][-1] if f else path_points[i][0] for i, f in zip(order, flipped)])
+    exits = np.array([path_points[i][0] if f else path_points[i][-1] for i, f in zip(order, flipped)])
+    position = np.empty(count, dtype=np.int64)
+    position[order] = np.arange(count)
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, count):
+            # Reversing i..j replaces edges (i-1 -> i) and (j -> j+1) with
+            # (i-1 -> j) and (i -> j+1); try the j whose path ends near exit i-1
+            previous = order[i - 1]
+            exit_id = 2 * previous + (0 if flipped[i - 1] else 1)
+            j = np.unique(position[nearest[exit_id]])
+            j = j[j >= i]
+            if not len(j):
+                continue
+            after = (j + 1) % count
+            before_cost = (np.hypot(*(entries[i] - exits[i - 1]))
+                           + np.hypot(*(entries[after] - exits[j]).T))
+            after_cost = (np.hypot(*(exits[j] - exits[i - 1]).T)
+                          + np.hypot(*(entries[after] - entries[i]).T))
+            gain = before_cost - after_cost
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                # Reverse the run i..j: each path in it is also traced backwards
+                end = j[best] + 1
+                order[i:end] = order[i:end][::-1]
+                flipped[i:end] = ~flipped[i:end][::-1]
+                entries[i:end], exits[i:end] = exits[i:end][::-1].copy(), entries[i:end][::-1].copy()
+                position[order[i:end]] = np.arange(i, end)
+                improved = True
+        if not improved:
+            break
+    return order, flipped
+
+def schedule_paths(path_points, two_opt=True, max_passes=10, neighbours=16):
+    """
+    Reorder, and where useful reverse, paths to minimize total beam travel
+
+    Parameters:
+    path_points -- List of (N, 2) point arrays, one per path
+    two_opt -- Refine the nearest-neighbour tour with 2-opt moves
+    max_passes -- Upper bound on 2-opt passes over the tour
+    neighbours -- Nearest endpoints considered for each 2-opt move
+
+    Returns the reordered list of point arrays.
+    """
+    if len(path_points) < 3:
+        return list(path_points)
+    tree = _endpoint_tree(path_points)
+    order, flipped = _nearest_neighbour_order(path_points, tree)
+    if two_opt:
+        order, flipped = _two_opt(path_points, tree, order, flipped, max_passes, neighbours)
+    return [path_points[i][::-1] if f else path_points[i] for i, f in zip(order, flipped)]
+
+def join_paths(path_points, join_tolerance=1e-3, settle_points=1):
+    """
+    Concatenate ordered paths into a single point array
+
+    Paths whose ends meet (within join_tolerance times the drawing's bounding
+    box diagonal) are joined directly and the duplicated point is dropped.
+    Anywhere else the beam jumps in a single step and then holds the landing
+    point for settle_points extra samples.
+
+    Returns (points, number of jumps).
+    """
+    all_points = np.concatenate(path_points)
+    diagonal = np.hypot(*(all_points.max(axis=0) - all_points.min(axis=0)))
+    tolerance = join_tolerance * diagonal
+
+    pieces = [path_points[0]]
+    jumps = 0
+    for previous, path in zip(path_points, path_points[1:]):
+        if np.hypot(*(path[0] - previous[-1])) <= tolerance:
+            pieces.append(path[1:])
+        else:
+            jumps += 1
+            if settle_points:
+                pieces.append(np.repeat(path[:1], settle_points, axis=0))
+            pieces.append(path)
+    return np.concatenate(pieces), jumps
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Headless phosphor renderer: turn XY audio into PNG frames without a browser
+
+Mirrors the WebGL pipeline in web/oscilloscope.js closely enough for previews
+and regression checks: each block of samples fades the line buffer
+(Render.fade), deposits its line segments with brightness inversely
+proportional to their length (Render.drawLine), and frames are tone mapped
+with the glow, exposure and hue terms of the output shader.
+
+Usage:
+  python phosphor_render.py drawing.wav --frames-dir frames --fps 10
+  python phosphor_render.py audio/ --contact-sheet-dir sheets --columns 6
+"""
+import os
+import glob
+import time
+import zlib
+import struct
+import argparse
+import numpy as np
+from scipy.io import wavfile
+from scipy.ndimage import gaussian_filter
+from wav_stream import open_raw
+
+# Same display defaults as the controls dict in oscilloscope_controller.py
+DEFAULT_CONTROLS = {
+    'swapXY': False,
+    'mainGain': 0.0,
+    'exposureStops': 1.5,
+    'hue': 120,
+    'invertXY': False,
+    'persistence': 0.2,
+}
+
+# Samples per scope callback, as in AudioSystem.init(1024)
+BUFFER_SIZE = 1024
+# Line shader constants (uSize and uIntensity in Render.drawLine)
+LINE_SIZE = 0.015
+LINE_INTENSITY = 0.005
+
+# zlib level for per-frame PNGs: level 6 took longer than rendering the
+# frame, level 1 is several times faster for files about 40% larger
+FRAME_COMPRESSION = 1
+
+def colour_from_hue(hue):
+    """Port of Render.getColourFromHue"""
+    alpha = (hue / 120.0) % 1.0
+    start = np.sqrt(1.0 - alpha)
+    end = np.sqrt(alpha)
+    if hue < 120:
+        return np.array([start, end, 0.0])
+    elif hue < 240:
+        return np.array([0.0, start, end])
+    return np.array([end, 0.0, start])
+
+def load_xy_samples(path):
+    """
+    Read a stereo WAV, or a raw recording with a .json sidecar (see
+    wav_stream.RawStreamWriter), as float (x, y) arrays in [-1, 1] and its sample rate
+    """
+    if os.path.exists(path + '.json') and not path.lower().endswith('.wav'):
+        sample_rate, data = open_raw(path)
+    else:
+        sample_rate, data = wavfile.read(path, mmap=True)
+    if data.dtype.kind == 'i':
+        data = data / float(np.iinfo(data.dtype).max)
+    elif data.dtype.kind == 'u':
+        data = (data - 128.0) / 128.0
+    if data.ndim == 1:
+        data = np.column_stack((data, np.zeros_like(data)))
+    return np.asarray(data[:, 0], dtype=np.float64), np.asarray(data[:, 1], dtype=np.float64), sample_rate
+
+class PhosphorRenderer:
+    """
+    Line-accumulation buffer with exponential persistence decay
+
+    Parameters:
+    size -- Width and height of the square line buffer in pixels
+    controls -- Display controls (see DEFAULT_CONTROLS); missing keys use defaults
+    buffer_size -- Samples per block; the buffer fades once per block
+    """
+
+    def __init__(self, size=512, controls=None, buffer_size=BUFFER_SIZE):
+        self.size = size
+        self.controls = dict(DEFAULT_CONTROLS, **(controls or {}))
+        self.buffer_size = buffer_size
+        self.line = np.zeros((size, size))
+        # Render.drawLineTexture: the fade quad is drawn with this alpha
+        self.fade_amount = 0.5 ** self.controls['persistence'] * 0.2 * buffer_size / 512
+        # Gaussian beam width (sigma = uSize / 5 in clip units) in pixels
+        self.beam_sigma = LINE_SIZE / 5 * size / 2
+        self.last_point = None
+        # The fade is applied lazily: the buffer holds line / scale, and new
+        # deposits are divided by the current scale, so a block costs nothing
+        # beyond its own segments
+        self.scale = 1.0
+        self.pending = []
+
+    def _to_pixels(self, x, y):
+        gain = 2.0 ** self.controls['mainGain'] * 450 / 512
+        if self.controls['swapXY']:
+            x, y = y, x
+        if self.controls['invertXY']:
+            x, y = -x, -y
+        column = (x * gain + 1) * self.size / 2
+        row = (1 - y * gain) * self.size / 2
+        return column, row
+
+    def process_block(self, x, y):
+        """Fade the buffer and draw one block of samples as connected segments"""
+        self.scale *= 1.0 - self.fade_amount
+        if self.scale < 1e-150:
+            self._flush()
+        column, row = self._to_pixels(x, y)
+        if self.last_point is not None:
+            column = np.concatenate(([self.last_point[0]], column))
+            row = np.concatenate(([self.last_point[1]], row))
+        self.last_point = (column[-1], row[-1])
+        if len(column) < 2:
+            return
+
+        # Split each segment into pixel-sized steps. As in the Gaussian line
+        # shader, brightness along a segment is inversely proportional to its
+        # length, so every segment carries the same total energy and fast
+        # (long) segments come out dim, as on a real CRT
+        d_col = np.diff(column)
+        d_row = np.diff(row)
+        length = np.hypot(d_col, d_row)
+        steps = np.ceil(np.maximum(length, 1.0)).astype(np.int64)
+        energy = LINE_INTENSITY * self.size / 2 * self.beam_sigma * np.sqrt(2 * np.pi)
+        segment = np.repeat(np.arange(len(steps)), steps)
+        offset = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+        fraction = (offset + 0.5) / steps[segment]
+        px = column[:-1][segment] + d_col[segment] * fraction
+        py = row[:-1][segment] + d_row[segment] * fraction
+        self.pending.append((px, py, energy / self.scale / steps[segment]))
+
+    def _flush(self):
+        """Accumulate pending deposits and fold the lazy fade into the buffer"""
+        if self.pending:
+            px, py, weight = (np.concatenate(parts) for parts in zip(*self.pending))
+            self.pending = []
+            self._splat(px, py, weight)
+        self.line *= self.scale
+        self.scale = 1.0
+
+    def _splat(self, px, py, weight):
+        """Accumulate weighted points into the line buffer at their nearest pixel"""
+        size = self.size
+        cx = px.astype(np.int64)
+        cy = py.astype(np.int64)
+        inside = (px >= 0) & (cx < size) & (py >= 0) & (cy < size)
+        self.line += np.bincount(cy[inside] * size + cx[inside], weights=weight[inside],
+                                 minlength=size * size).reshape(size, size)
+
+    def _blur_small(self, line, resolution, sigma):
+        """Blur at a reduced resolution, like the blur textures; returns the small image"""
+        factor = max(1, self.size // resolution)
+        if factor == 1:
+            return gaussian_filter(line, sigma)
+        small_size = self.size // factor
+        small = line[:small_size * factor, :small_size * factor]
+        small = small.reshape(small_size, factor, small_size, factor).mean(axis=(1, 3), dtype=np.float32)
+        return gaussian_filter(small, sigma)
+
+    @staticmethod
+    def _upsample(image, size):
+        """
+        Bilinear upsampling to size x size, as zoom(order=1) does it (corner
+        pixels aligned) but as two separable gathers, which is several
+        times faster on these smooth glow images
+        """
+        if len(image) == size:
+            return image
+        position = np.arange(size, dtype=np.float32) * np.float32((len(image) - 1) / (size - 1))
+        low = np.minimum(position.astype(np.int64), len(image) - 2)
+        weight = (position - low).astype(np.float32)
+        rows = image[low] * (1 - weight)[:, None] + image[low + 1] * weight[:, None]
+        return rows[:, low] * (1 - weight) + rows[:, low + 1] * weight
+
+    def image(self):
+        """Tone map the current buffer to an RGB float32 image in [0, 1]"""
+        self._flush()
+        # The buffer stays float64 for the lazy fade; everything from here on
+        # is float32, which is plenty for an 8-bit image
+        line = gaussian_filter(self.line.astype(np.float32), self.beam_sigma)
+        # Tight glow (256px texture) and wide scatter (32px texture), each
+        # blurred by the 17-tap kernel of the blur shader (sigma ~2.3 texels).
+        # Both are combined at the glow's resolution and upsampled once
+        tight_glow = self._blur_small(line, 256, 2.3)
+        scatter = self._upsample(self._blur_small(line, 32, 2.3), len(tight_glow)) + np.float32(0.35)
+        # The screen texture (noise.jpg) averages to mid grey
+        screen = 0.5
+        glow = np.float32(1.5 * screen * screen) * tight_glow
+        glow += np.float32(0.4 * (2.0 + 1.0 * screen + 0.5 * screen)) * scatter
+        light = line + self._upsample(glow, self.size)
+        exposure = np.float32(2.0 ** (self.controls['exposureStops'] - 2.0))
+        tlight = -exposure * light
+        np.exp2(tlight, out=tlight)
+        np.subtract(np.float32(1.0), tlight, out=tlight)
+        tlight2 = tlight * tlight * tlight
+        mix = np.float32(0.3) + tlight2 * tlight2 * np.float32(0.5)
+        colour = colour_from_hue(self.controls['hue']).astype(np.float32)
+        # tlight is already in [0, 1), so the mix cannot leave that range
+        rgb = np.empty(tlight.shape + (3,), dtype=np.float32)
+        for channel in range(3):
+            np.multiply(colour[channel] + mix * (1 - colour[channel]), tlight, out=rgb[..., channel])
+        return rgb
+
+def frame_stops(frames, sample_rate, fps=10, block=BUFFER_SIZE, max_frames=None):
+    """Sample positions after which a frame is taken, one every 1/fps seconds at block boundaries"""
+    frame_interval = sample_rate / fps
+    next_frame = frame_interval
+    stops = []
+    for start in range(0, frames, block):
+        stop = min(start + block, frames)
+        if stop >= next_frame:
+            stops.append(stop)
+            next_frame += frame_interval
+            if max_frames is not None and len(stops) >= max_frames:
+                break
+    return stops
+
+def snapshots(x, y, sample_rate, fps=10, size=512, controls=None, max_frames=None):
+    """
+    Yield (frame index, time in seconds, renderer) every 1/fps seconds
+
+    Nothing is tone mapped here; call renderer.image() for the frames
+    that are actually needed.
+    """
+    renderer = PhosphorRenderer(size, controls)
+    block = renderer.buffer_size
+    stops = frame_stops(len(x), sample_rate, fps, block, max_frames)
+    start = 0
+    for index, stop in enumerate(stops):
+        for block_start in range(start, stop, block):
+            block_stop = min(block_start + block, stop)
+            renderer.process_block(x[block_start:block_stop], y[block_start:block_stop])
+        start = stop
+        yield index, stop / sample_rate, renderer
+
+def render_frames(x, y, sample_rate, fps=10, size=512, controls=None, max_frames=None):
+    """
+    Yield (time in seconds, RGB image) snapshots of the phosphor every 1/fps seconds
+    """
+    for _, seconds, renderer in snapshots(x, y, sample_rate, fps, size, controls, max_frames):
+        yield seconds, renderer.image()
+
+def write_png(path, image, compression=6):
+    """Write an RGB image (float in [0, 1], or 8-bit pixels) as an 8-bit PNG with a zlib compression level"""
+    pixels = image if image.dtype == np.uint8 else to_pixels(image)
+    height, width, _ = pixels.shape
+    rows = np.hstack((np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, -1)))
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data
+                + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), compression)))
+        f.write(chunk(b'IEND', b''))
+
+def to_pixels(image):
+    """RGB float image in [0, 1] to 8-bit pixels"""
+    return (np.clip(image, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+
+def contact_sheet(images, columns=6):
+    """Tile equally sized images into one image, row by row"""
+    height, width, _ = images[0].shape
+    rows = -(-len(images) // columns)
+    sheet = np.zeros((rows * height, columns * width, 3), dtype=images[0].dtype)
+    for i, image in enumerate(images):
+        r, c = divmod(i, columns)
+        sheet[r * height:(r + 1) * height, c * width:(c + 1) * width] = image
+    return sheet
+
+def render_wav(path, frames_dir=None, contact_sheet_path=None, fps=10, size=512, controls=None,
+               columns=6, max_frames=None, sheet_frames=36):
+    """
+    Render a WAV to PNG frames and/or a contact sheet
+
+    The contact sheet shows sheet_frames frames spread evenly over the
+    file, so its size (and the memory held for it) does not grow with the
+    file's length. Frames that are neither written nor on the sheet are
+    accumulated but never tone mapped.
+
+    Returns a dict with the frame count, audio seconds, wall seconds and
+    realtime factor.
+    """
+    x, y, sample_rate = load_xy_samples(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    if frames_dir:
+        os.makedirs(frames_dir, exist_ok=True)
+
+    start_time = time.perf_counter()
+    total = len(frame_stops(len(x), sample_rate, fps, BUFFER_SIZE, max_frames))
+    on_sheet = set()
+    if contact_sheet_path and total:
+        on_sheet = set(np.linspace(0, total - 1, min(sheet_frames, total)).round().astype(int).tolist())
+    tiles = []
+    frames = 0
+    for index, _, renderer in snapshots(x, y, sample_rate, fps, size, controls, max_frames):
+        frames += 1
+        if not frames_dir and index not in on_sheet:
+            continue
+        pixels = to_pixels(renderer.image())
+        if frames_dir:
+            write_png(os.path.join(frames_dir, f"{name}_{index:05d}.png"), pixels, FRAME_COMPRESSION)
+        if index in on_sheet:
+            tiles.append(pixels)
+    if tiles:
+        write_png(contact_sheet_path, contact_sheet(tiles, columns))
+    seconds = time.perf_counter() - start_time
+
+    audio_seconds = len(x) / sample_rate
+    if max_frames is not None:
+        audio_seconds = min(audio_seconds, max_frames / fps)
+    return {
+        'file': path,
+        'frames': frames,
+        'audio_seconds': audio_seconds,
+        'seconds': seconds,
+        'realtime_factor': audio_seconds / seconds if seconds > 0 else float('inf'),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Render XY WAV files to phosphor PNG previews")
+    parser.add_argument("inputs", nargs='+', help="WAV files or directories of WAV files")
+    parser.add_argument("--frames-dir", default=None, help="Write one PNG per frame here")
+    parser.add_argument("--contact-sheet-dir", default=None, help="Write one contact sheet PNG per file here")
+    parser.add_argument("--fps", type=float, default=10, help="Frames per second of audio")
+    parser.add_argument("--size", type=int, default=512, help="Frame width/height in pixels")
+    parser.add_argument("--columns", type=int, default=6, help="Contact sheet columns")
+    parser.add_argument("--sheet-frames", type=int, default=36, help="Frames on each contact sheet, spread over the file")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop each file after this many frames")
+    parser.add_argument("--hue", type=float, default=DEFAULT_CONTROLS['hue'])
+    parser.add_argument("--exposure-stops", type=float, default=DEFAULT_CONTROLS['exposureStops'])
+    parser.add_argument("--persistence", type=float, default=DEFAULT_CONTROLS['persistence'])
+    parser.add_argument("--main-gain", type=float, default=DEFAULT_CONTROLS['mainGain'])
+    parser.add_argument("--swap-xy", action="store_true")
+    parser.add_argument("--invert-xy", action="store_true")
+    args = parser.parse_args()
+
+    if not args.frames_dir and not args.contact_sheet_dir:
+        parser.error("nothing to do: pass --frames-dir and/or --contact-sheet-dir")
+
+    controls = {
+        'hue': args.hue,
+        'exposureStops': args.exposure_stops,
+        'persistence': args.persistence,
+        'mainGain': args.main_gain,
+        'swapXY': args.swap_xy,
+        'invertXY': args.invert_xy,
+    }
+    wav_files = []
+    for item in args.inputs:
+        if os.path.isdir(item):
+            wav_files.extend(sorted(glob.glob(os.path.join(item, "*.wav"))))
+        else:
+            wav_files.append(item)
+
+    if args.contact_sheet_dir:
+        os.makedirs(args.contact_sheet_dir, exist_ok=True)
+    for wav_file in wav_files:
+        name = os.path.splitext(os.path.basename(wav_file))[0]
+        sheet = os.path.join(args.contact_sheet_dir, f"{name}.png") if args.contact_sheet_dir else None
+        try:
+            stats = render_wav(wav_file, args.frames_dir, sheet, args.fps, args.size, controls,
+                               args.columns, args.max_frames, args.sheet_frames)
+        except Exception as e:
+            print(f"{wav_file}: FAILED ({e})")
+            continue
+        print(f"{wav_file}: {stats['frames']} frames in {stats['seconds']:.2f}s "
+              f"({stats['realtime_factor']:.0f}x realtime)")
+
+if __name__ == "__main__":
+    main()
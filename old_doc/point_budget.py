@@ -0,0 +1,151 @@
+"""
+Refresh-rate driven point budgets: fit a drawing into a fixed number of points per frame
+"""
+import numpy as np
+
+def frame_budget(target_fps, sample_rate):
+    """Points available per frame when every sample draws one point"""
+    return int(sample_rate // target_fps)
+
+def polyline_length(points):
+    """Total length of a polyline"""
+    return float(np.hypot(*np.diff(points, axis=0).T).sum())
+
+def turning_angle(points):
+    """Total absolute turning angle of a polyline in radians"""
+    steps = np.diff(points, axis=0)
+    steps = steps[np.hypot(*steps.T) > 0]
+    if len(steps) < 2:
+        return 0.0
+    heading = np.arctan2(steps[:, 1], steps[:, 0])
+    turn = np.diff(heading)
+    turn = (turn + np.pi) % (2 * np.pi) - np.pi
+    return float(np.abs(turn).sum())
+
+def rdp_simplify(points, epsilon):
+    """
+    Ramer-Douglas-Peucker simplification
+
+    Returns the subset of vertices needed to stay within epsilon of the
+    original polyline. The first and last points are always kept.
+    """
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start = points[first]
+        chord = points[last] - start
+        chord_length = np.hypot(*chord)
+        offsets = points[first + 1:last] - start
+        if chord_length > 0:
+            distance = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / chord_length
+        else:
+            distance = np.hypot(*offsets.T)
+        worst = int(np.argmax(distance))
+        if distance[worst] > epsilon:
+            index = first + 1 + worst
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return points[keep]
+
+def fill_polyline(vertices, count):
+    """
+    Spread count points along a polyline, keeping every vertex
+
+    Extra points are inserted into edges in proportion to their length, so
+    corners are preserved and spacing is as even as the vertices allow.
+    """
+    edges = len(vertices) - 1
+    if count <= len(vertices):
+        return vertices
+    if edges < 1:
+        return np.repeat(vertices, count, axis=0)
+    lengths = np.hypot(*np.diff(vertices, axis=0).T)
+    extra = count - len(vertices)
+    if lengths.sum() > 0:
+        share = extra * lengths / lengths.sum()
+    else:
+        share = np.full(edges, extra / edges)
+    inserted = np.floor(share).astype(np.int64)
+    # Hand out the rounding remainder to the edges with the largest fractions
+    remainder = extra - inserted.sum()
+    if remainder:
+        inserted[np.argsort(share - inserted)[::-1][:remainder]] += 1
+
+    per_edge = inserted + 1
+    edge_index = np.repeat(np.arange(edges), per_edge)
+    within = np.arange(per_edge.sum()) - np.repeat(np.cumsum(per_edge) - per_edge, per_edge)
+    fraction = (within / per_edge[edge_index])[:, None]
+    points = vertices[edge_index] + (vertices[edge_index + 1] - vertices[edge_index]) * fraction
+    return np.vstack((points, vertices[-1:]))
+
+def allocate_point_budget(path_points, budget, curvature_weight=0.3, tolerance=0.002, reserve=0):
+    """
+    Fit a list of paths into budget points in total
+
+    Parameters:
+    path_points -- List of densely sampled (N, 2) point arrays
+    budget -- Total points per frame, e.g. frame_budget(60, 48000) == 800
+    curvature_weight -- Share of the spare budget handed out by turning angle
+                        rather than length (0 = length only, 1 = curvature only)
+    tolerance -- Initial simplification tolerance as a fraction of the
+                 drawing's bounding box diagonal
+    reserve -- Points to hold back, e.g. for jump settle points
+
+    Each path is first reduced to the Ramer-Douglas-Peucker vertices it needs
+    at the tolerance. If those alone exceed the budget the tolerance is
+    relaxed, and as a last resort the shortest paths are dropped, with a
+    warning either way. The spare budget is then spread by length and
+    curvature.
+
+    Returns (list of point arrays, stats dict).
+    """
+    available = budget - reserve
+    all_points = np.concatenate(path_points)
+    diagonal = np.hypot(*(all_points.max(axis=0) - all_points.min(axis=0))) or 1.0
+    lengths = np.array([polyline_length(p) for p in path_points])
+    turning = np.array([turning_angle(p) for p in path_points])
+    kept = list(range(len(path_points)))
+
+    # Paths need at least two points each; drop the shortest if even that won't fit
+    if 2 * len(kept) > available:
+        kept = sorted(np.argsort(lengths)[::-1][:max(1, available // 2)])
+        print(f"Warning: {len(path_points)} paths cannot fit in {budget} points per frame; "
+              f"dropping the {len(path_points) - len(kept)} shortest")
+
+    epsilon = tolerance * diagonal
+    while True:
+        vertices = [rdp_simplify(path_points[i], epsilon) for i in kept]
+        demand = sum(len(v) for v in vertices)
+        if demand <= available or all(len(v) <= 2 for v in vertices):
+            break
+        epsilon *= 1.5
+    if epsilon > tolerance * diagonal:
+        print(f"Warning: drawing does not fit in {budget} points per frame; "
+              f"simplified to a tolerance of {epsilon / diagonal:.2%} of its size")
+
+    # Spread the spare points by a mix of length and curvature
+    spare = max(0, available - demand)
+    kept_lengths = lengths[kept]
+    kept_turning = turning[kept]
+    weight = (1 - curvature_weight) * kept_lengths / max(kept_lengths.sum(), 1e-12)
+    if kept_turning.sum() > 0:
+        weight = weight + curvature_weight * kept_turning / kept_turning.sum()
+    share = spare * weight / max(weight.sum(), 1e-12)
+    extra = np.floor(share).astype(np.int64)
+    extra[np.argsort(share - extra)[::-1][:spare - extra.sum()]] += 1
+
+    allocated = [fill_polyline(v, len(v) + int(e)) for v, e in zip(vertices, extra)]
+    stats = {
+        'budget': budget,
+        'points': sum(len(p) for p in allocated),
+        'paths_dropped': len(path_points) - len(kept),
+        'tolerance': epsilon / diagonal,
+    }
+    return allocated, stats
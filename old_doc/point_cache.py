@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of normalized SVG point arrays, keyed by SVG content and sampling parameters
+
+Each entry is a <key>.npy array with a <key>.json sidecar, so parallel
+batch workers can add entries without sharing an index file.
+
+Usage:
+  python point_cache.py list
+  python point_cache.py evict [--older-than DAYS] [--max-size MB]
+  python point_cache.py clear
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.point_cache')
+
+# Bump when the sampling pipeline changes in a way that alters its output
+CACHE_VERSION = 1
+
+def cache_key(svg_file, params):
+    """Hash of the SVG file contents plus the parameters that shape the point array"""
+    digest = hashlib.sha256()
+    with open(svg_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(json.dumps({'version': CACHE_VERSION, 'params': params}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def content_key(content, params):
+    """cache_key for SVG markup held in memory, e.g. one layer of an animation"""
+    digest = hashlib.sha256(content)
+    digest.update(json.dumps({'version': CACHE_VERSION, 'params': params}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+class PointCache:
+    """Directory of cached point arrays"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.npy', base + '.json'
+
+    def get(self, key):
+        """Return (points, info) for a cached key, or None on a miss"""
+        array_path, info_path = self._paths(key)
+        try:
+            with open(info_path, 'r') as f:
+                info = json.load(f)
+            points = np.load(array_path)
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so eviction can go by last use
+        os.utime(info_path)
+        return points, info
+
+    def put(self, key, points, info):
+        """Store a point array and its metadata"""
+        array_path, info_path = self._paths(key)
+        info = dict(info, points=len(points), created=time.time())
+        # Write to temporary names and rename, so readers never see half a file
+        tmp_array = f"{array_path}.{os.getpid()}.tmp"
+        with open(tmp_array, 'wb') as f:
+            np.save(f, np.asarray(points, dtype=np.float32))
+        os.replace(tmp_array, array_path)
+        tmp_info = f"{info_path}.{os.getpid()}.tmp"
+        with open(tmp_info, 'w') as f:
+            json.dump(info, f, indent=2)
+        os.replace(tmp_info, info_path)
+
+    def entries(self):
+        """List cache entries as dicts, most recently used first"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            array_path, info_path = self._paths(key)
+            try:
+                with open(info_path, 'r') as f:
+                    info = json.load(f)
+                info['key'] = key
+                info['bytes'] = os.path.getsize(array_path) + os.path.getsize(info_path)
+                info['last_used'] = os.path.getmtime(info_path)
+            except (OSError, ValueError):
+                continue
+            entries.append(info)
+        entries.sort(key=lambda e: e['last_used'], reverse=True)
+        return entries
+
+    def remove(self, key):
+        """Delete one entry"""
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def evict(self, older_than=None, max_bytes=None):
+        """
+        Remove entries not used for older_than seconds, then the least recently
+        used ones until the cache fits in max_bytes. Returns the number removed.
+        """
+        removed = 0
+        now = time.time()
+        kept_bytes = 0
+        for entry in self.entries():
+            too_old = older_than is not None and now - entry['last_used'] > older_than
+            too_big = max_bytes is not None and kept_bytes + entry['bytes'] > max_bytes
+            if too_old or too_big:
+                self.remove(entry['key'])
+                removed += 1
+            else:
+                kept_bytes += entry['bytes']
+        return removed
+
+    def clear(self):
+        """Remove every entry"""
+        entries = self.entries()
+        for entry in entries:
+            self.remove(entry['key'])
+        return len(entries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and evict the SVG point cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Cache directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List cached entries")
+    evict = commands.add_parser("evict", help="Remove old or excess entries")
+    evict.add_argument("--older-than", type=float, default=None, help="Remove entries unused for this many days")
+    evict.add_argument("--max-size", type=float, default=None, help="Shrink the cache to this many MB")
+    commands.add_parser("clear", help="Remove every entry")
+    args = parser.parse_args()
+
+    cache = PointCache(args.cache_dir)
+    if args.command == 'list':
+        entries = cache.entries()
+        if not entries:
+            print("Cache is empty")
+            return
+        total = 0
+        for entry in entries:
+            total += entry['bytes']
+            last_used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))
+            print(f"{entry['key'][:12]}  {entry['points']:>8} points  {entry['bytes'] / 1024:>8.1f} KB  "
+                  f"{last_used}  {os.path.basename(entry.get('svg', '?'))}  {entry.get('params')}")
+        print(f"{len(entries)} entries, {total / (1024 * 1024):.1f} MB")
+    elif args.command == 'evict':
+        older_than = args.older_than * 86400 if args.older_than is not None else None
+        max_bytes = args.max_size * 1024 * 1024 if args.max_size is not None else None
+        print(f"Evicted {cache.evict(older_than=older_than, max_bytes=max_bytes)} entries")
+    elif args.command == 'clear':
+        print(f"Removed {cache.clear()} entries")
+
+if __name__ == "__main__":
+    main()
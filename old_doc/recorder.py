@@ -0,0 +1,214 @@
+"""
+Record what the scope displayed, as sent by the page
+
+While the recording control is on, the page copies the X/Y samples its
+audio callback draws into large preallocated chunks and sends each full
+chunk (base64 float32, with the key press/release markers that fell inside
+it) outside the callback. XYRecorder only queues a chunk in the eel
+handler; a background thread decodes it and appends it to a float WAV
+(wav_stream.WavStreamWriter) or a raw memory-mapped file
+(wav_stream.RawStreamWriter). The queue is bounded: when the disk falls
+behind, chunks are dropped and counted rather than buffered without limit,
+and the gap is written as silence so later samples and markers keep their
+place in time.
+
+Markers go to <path>.markers.json next to the recording, with frame
+positions in the recording's own samples.
+"""
+import os
+import json
+import time
+import queue
+import base64
+import threading
+import numpy as np
+from wav_stream import WavStreamWriter, RawStreamWriter
+
+DEFAULT_MAX_QUEUE = 8
+
+# Seconds stop() waits for the page's last chunk before closing anyway
+STOP_TIMEOUT = 3.0
+
+def decode_chunk(chunk):
+    """(count, 2) float32 frames from a chunk's base64 x and y channels"""
+    x = np.frombuffer(base64.b64decode(chunk['x']), dtype='<f4')
+    y = np.frombuffer(base64.b64decode(chunk['y']), dtype='<f4')
+    return np.column_stack((x, y))
+
+class XYRecorder:
+    """
+    Appends chunks of displayed X/Y samples to a file from a writer thread
+
+    Parameters:
+    max_queue -- Chunks that may wait for the writer before new ones are dropped
+    """
+
+    def __init__(self, max_queue=DEFAULT_MAX_QUEUE):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._finished = threading.Event()
+        self._take = 0
+        self._info = {}
+
+    @property
+    def take(self):
+        """Id the page tags chunks of the current recording with (0 when idle)"""
+        with self._lock:
+            return self._take if self._queue is not None else 0
+
+    def start(self, path, file_format=None):
+        """
+        Open a new recording; chunks tagged with the returned take id are written to path
+
+        file_format -- 'wav' or 'raw'; by default taken from the extension
+        """
+        if file_format is None:
+            file_format = 'wav' if path.lower().endswith('.wav') else 'raw'
+        if file_format not in ('wav', 'raw'):
+            raise ValueError(f"unknown recording format: {file_format}")
+        with self._lock:
+            if self._queue is not None:
+                raise RuntimeError(f"already recording to {self._info['path']}")
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._take += 1
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._finished.clear()
+            self._info = {
+                'path': path,
+                'format': file_format,
+                'take': self._take,
+                'sample_rate': None,
+                'frames': 0,
+                'chunks': 0,
+                'dropped_chunks': 0,
+                'gap_frames': 0,
+                'markers': 0,
+                'started': time.time(),
+                'write_seconds': 0.0,
+            }
+            self._thread = threading.Thread(target=self._run, args=(self._queue, dict(self._info)), daemon=True)
+            self._thread.start()
+            return self._take
+
+    def add_chunk(self, chunk):
+        """
+        Queue a chunk from the page without waiting
+
+        chunk -- {'take', 'start', 'sample_rate', 'x', 'y', 'markers', 'last'}
+                 with start the chunk's first frame within the take and
+                 markers a list of {'frame', 'type', 'key'}
+
+        Returns False if the chunk belongs to no current take or was dropped.
+        """
+        with self._lock:
+            if self._queue is None or chunk.get('take') != self._take:
+                return False
+            chunks = self._queue
+            try:
+                chunks.put_nowait(chunk)
+                return True
+            except queue.Full:
+                self._info['dropped_chunks'] += 1
+        if chunk.get('last') and not self._finished.is_set():
+            # The end of a take must reach the writer, markers and all; the
+            # timeout covers a writer that failed and no longer drains the queue
+            try:
+                chunks.put(dict(chunk, x='', y=''), timeout=STOP_TIMEOUT)
+            except queue.Full:
+                pass
+        return False
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Finish the recording once the page's last chunk is written
+
+        Call after the page was told to stop; if its last chunk does not
+        come within timeout seconds the file is closed with what arrived.
+        Returns the recording's info dict, or None when not recording.
+        """
+        with self._lock:
+            if self._queue is None:
+                return None
+            pending = self._queue
+        if not self._finished.wait(timeout):
+            try:
+                pending.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+        self._thread.join()
+        with self._lock:
+            self._queue = None
+            self._thread = None
+            return dict(self._info)
+
+    def status(self):
+        with self._lock:
+            info = dict(self._info)
+            info['active'] = self._queue is not None
+            info['queued'] = self._queue.qsize() if self._queue is not None else 0
+            elapsed = max(time.time() - info['started'], 1e-9) if info.get('started') else None
+            if elapsed and info['sample_rate']:
+                info['seconds'] = info['frames'] / info['sample_rate']
+                info['write_load'] = info['write_seconds'] / elapsed
+            return info
+
+    def _update(self, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                self._info[name] = value
+
+    def _run(self, chunks, info):
+        writer = None
+        markers = []
+        frames_written = 0
+        gap_frames = 0
+        write_seconds = 0.0
+        count = 0
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                start_time = time.perf_counter()
+                frames = decode_chunk(chunk)
+                if writer is None:
+                    info['sample_rate'] = int(chunk['sample_rate'])
+                    if info['format'] == 'wav':
+                        writer = WavStreamWriter(info['path'], info['sample_rate'], channels=2)
+                    else:
+                        writer = RawStreamWriter(info['path'], info['sample_rate'], channels=2)
+                start = int(chunk['start'])
+                if start > frames_written:
+                    # Chunks dropped in between become silence
+                    gap = start - frames_written
+                    silence = np.zeros((min(gap, 1 << 16), 2), dtype=np.float32)
+                    for offset in range(0, gap, len(silence)):
+                        writer.write(silence[:min(len(silence), gap - offset)])
+                    gap_frames += gap
+                    frames_written = start
+                # A chunk overlapping what was already written keeps only its new part
+                frames = frames[frames_written - start:]
+                if len(frames):
+                    writer.write(frames)
+                    frames_written += len(frames)
+                markers.extend(chunk.get('markers') or [])
+                count += 1
+                write_seconds += time.perf_counter() - start_time
+                self._update(sample_rate=info['sample_rate'], frames=frames_written, chunks=count,
+                             gap_frames=gap_frames, markers=len(markers), write_seconds=write_seconds)
+                if chunk.get('last'):
+                    break
+        except Exception as e:
+            print(f"Recording failed: {e}")
+            self._update(error=str(e))
+        finally:
+            if writer is not None:
+                writer.close()
+            if writer is not None or markers:
+                with open(info['path'] + '.markers.json', 'w') as f:
+                    json.dump({'sample_rate': info['sample_rate'], 'frames': frames_written,
+                               'markers': sorted(markers, key=lambda m: m['frame'])}, f, indent=2)
+            self._finished.set()
@@ -0,0 +1,92 @@
+"""
+Single-stroke vector font for the scope, in the spirit of the Hershey simplex set
+
+Every glyph is a list of strokes separated by spaces. A stroke is a run of
+two-digit points "xy" on a small grid: x from 0 to 6, y from 0 to 9 with the
+baseline at y=1 and the cap height at y=9. A stroke of a single point is a
+dot. Lowercase letters are drawn as capitals.
+"""
+
+BASELINE = 1
+CAP_HEIGHT = 8
+
+# Advance of a space and the default gap between glyphs, in grid units
+SPACE_WIDTH = 4
+LETTER_SPACING = 1.5
+LINE_HEIGHT = 12
+
+GLYPHS = {
+    'A': "013961 1454",
+    'B': "0545565849090151626445",
+    'C': "6859190802115162",
+    'D': "01094967634101",
+    'E': "69090161 0545",
+    'F': "690901 0545",
+    'G': "68591908021151626535",
+    'H': "0109 6169 0565",
+    'I': "0929 1911 0121",
+    'J': "696251110203",
+    'K': "0109 6903 2561",
+    'L': "090161",
+    'M': "0109356961",
+    'N': "01096169",
+    'O': "190802115162685919",
+    'P': "01095968665505",
+    'Q': "190802115162685919 4360",
+    'R': "01095968665505 3561",
+    'S': "685919080615556462511102",
+    'T': "0969 3931",
+    'U': "090211516269",
+    'V': "093169",
+    'W': "0911355169",
+    'X': "0169 0961",
+    'Y': "093569 3531",
+    'Z': "09696101",
+    '0': "190802113142483919 0248",
+    '1': "182921 1131",
+    '2': "08193948460141",
+    '3': "08193948463515 354442311102",
+    '4': "31390343",
+    '5': "490905354442311102",
+    '6': "4839190802113142443505",
+    '7': "094911",
+    '8': "15060819394846351504021131424435",
+    '9': "4515060819394842311102",
+    '.': "01",
+    ',': "1200",
+    ':': "02 06",
+    ';': "06 1200",
+    '!': "0903 01",
+    '?': "08193948462423 21",
+    '-': "0545",
+    '+': "0545 2327",
+    '=': "0444 0646",
+    '/': "0149",
+    '\\': "0941",
+    "'": "0907",
+    '"': "0907 2927",
+    '(': "29070321",
+    ')': "09272301",
+    '[': "29090121",
+    ']': "09292101",
+    '<': "480542",
+    '>': "084502",
+    '_': "0040",
+    '*': "2327 0446 0644",
+    '#': "1218 3238 0444 0646",
+    '%': "0169 0919180809 5262615152",
+}
+
+# Extra space between pairs whose shapes leave a gap, in grid units
+KERNING = {
+    'AV': -1.5, 'VA': -1.5, 'AW': -1, 'WA': -1, 'AY': -1.5, 'YA': -1.5,
+    'AT': -1.5, 'TA': -1.5, 'LT': -2, 'LV': -2, 'LY': -2, 'LW': -1.5,
+    'FA': -1.5, 'PA': -1.5, 'TO': -0.5, 'OT': -0.5, 'VO': -0.5, 'OV': -0.5,
+    'T.': -1.5, 'T,': -1.5, 'V.': -1.5, 'V,': -1.5, 'Y.': -1.5, 'Y,': -1.5,
+    'F.': -1.5, 'F,': -1.5, 'P.': -1.5, 'P,': -1.5, 'L\'': -2,
+}
+
+def parse_glyph(code):
+    """Strokes of a glyph as lists of (x, y) tuples"""
+    return [[(int(stroke[i]), int(stroke[i + 1])) for i in range(0, len(stroke), 2)]
+            for stroke in code.split()]
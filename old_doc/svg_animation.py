@@ -0,0 +1,298 @@
+"""
+Compile a sequence of SVG frames into one continuous XY animation
+
+Frames come from a directory of SVGs, a numbered or glob pattern
+(frame_%04d.svg, frames/*.svg) or the layers of a single SVG. Each frame is
+sampled and fitted into its own point budget (see point_budget.py), then
+held on screen for 1/fps seconds and redrawn refresh_fps times per second.
+
+Compilation runs in two passes. The first prepares every distinct frame
+(frames with identical markup share one entry) into the point cache and
+records its bounds; the second normalizes all frames to the common bounds
+and streams the samples to a WAV, so only the current and next frame are
+ever held in memory.
+"""
+import os
+import re
+import io
+import glob
+import time
+import argparse
+import contextlib
+import shutil
+import tempfile
+import concurrent.futures
+import xml.etree.ElementTree as ET
+import numpy as np
+import svgpathtools as svgpath
+from point_cache import PointCache, cache_key, content_key
+from svg_sampling import sample_paths, extract_svg_points
+from svg_to_oscilloscope import layout_points, normalize_points, synthesize_xy, finish_audio_block
+from wav_stream import WavStreamWriter
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+INKSCAPE_NS = 'http://www.inkscape.org/namespaces/inkscape'
+
+# Keep the default namespace unprefixed so svgpathtools finds <path> elements
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('inkscape', INKSCAPE_NS)
+
+def _natural_key(path):
+    """Sort frame_2 before frame_10"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', os.path.basename(path))]
+
+def numbered_frames(pattern):
+    """Files matching a printf pattern such as frame_%04d.svg, from 0 or 1 up to the first gap"""
+    start = 0 if os.path.exists(pattern % 0) else 1
+    files = []
+    while os.path.exists(pattern % (start + len(files))):
+        files.append(pattern % (start + len(files)))
+    return files
+
+def split_layers(svg_file):
+    """
+    Serialize each layer of an SVG as a standalone document
+
+    Layers are the top-level groups marked inkscape:groupmode="layer", or
+    every top-level group if none are marked. Other top-level elements
+    (defs, styles) are copied into each layer's document.
+    """
+    root = ET.parse(svg_file).getroot()
+    groups = [child for child in root if child.tag == f'{{{SVG_NS}}}g']
+    layers = [g for g in groups if g.get(f'{{{INKSCAPE_NS}}}groupmode') == 'layer'] or groups
+    shared = [child for child in root if child.tag != f'{{{SVG_NS}}}g']
+    documents = []
+    for layer in layers:
+        document = ET.Element(root.tag, root.attrib)
+        document.extend(shared)
+        document.append(layer)
+        documents.append(ET.tostring(document))
+    return documents
+
+def find_frames(source):
+    """
+    List the frames of an animation as (label, svg path or layer markup)
+
+    source -- Directory, printf pattern, glob pattern or a single layered SVG
+    """
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, '*.svg')), key=_natural_key)
+    elif '%' in source:
+        files = numbered_frames(source)
+    elif glob.has_magic(source):
+        files = sorted(glob.glob(source), key=_natural_key)
+    else:
+        layers = split_layers(source)
+        return [(f"{os.path.basename(source)}#{i}", layer) for i, layer in enumerate(layers)]
+    return [(os.path.basename(f), f) for f in files]
+
+def frame_key(frame, params):
+    """Cache key of a frame: its markup plus the sampling parameters"""
+    if isinstance(frame, bytes):
+        return content_key(frame, params)
+    return cache_key(frame, params)
+
+def _prepare_frame(job):
+    """Worker for compile_animation: sample one frame into the cache unless it is there already"""
+    label, frame, key, cache_dir, params = job
+    cache = PointCache(cache_dir)
+    cached = cache.get(key)
+    if cached is not None:
+        points = cached[0]
+        hit = True
+    else:
+        density = 1.0 if params['refresh_fps'] is not None else 0.2
+        if isinstance(frame, bytes):
+            paths, _ = svgpath.svgstr2paths(frame.decode('utf-8'))
+            path_points = sample_paths(paths, density=density, uniform=params['uniform_speed'])
+        else:
+            path_points = extract_svg_points(frame, density=density, uniform=params['uniform_speed'])
+        if path_points:
+            # Keep per-frame chatter out of the progress output
+            with contextlib.redirect_stdout(io.StringIO()):
+                points, _, _ = layout_points(path_points, params['sample_rate'], params['optimize_paths'],
+                                             params['refresh_fps'])
+        else:
+            # A blank frame; drawn as a dot in the middle
+            points = np.empty((0, 2))
+        cache.put(key, points, {'svg': label, 'params': params})
+        hit = False
+    if len(points):
+        bounds = (points.min(axis=0).tolist(), points.max(axis=0).tolist())
+    else:
+        bounds = None
+    return key, len(points), bounds, hit
+
+def trace_frame(points, start, stop):
+    """Samples start..stop of a frame, one point per sample, looping over the point list"""
+    if len(points) == 0:
+        return np.zeros(stop - start), np.zeros(stop - start)
+    return synthesize_xy(points, len(points), speed_factor=1.0, repetitions=1, start=start, stop=stop)
+
+def resample_points(points, count):
+    """Spread a point list over count points by linear interpolation along its index"""
+    if len(points) == 0:
+        return np.zeros((count, 2))
+    position = np.linspace(0, len(points) - 1, count)
+    index = np.arange(len(points))
+    return np.column_stack((np.interp(position, index, points[:, 0]), np.interp(position, index, points[:, 1])))
+
+def morph_frames(points, next_points, start, stop, morph_start, morph_stop):
+    """
+    Samples start..stop of a frame that blends into the next one from morph_start on
+
+    Both point lists are resampled to the same length so that each sample
+    position maps to the same fraction of either drawing; the blend weight
+    rises smoothly from 0 at morph_start to 1 at morph_stop.
+    """
+    count = max(len(points), len(next_points), 1)
+    a = resample_points(points, count)
+    b = resample_points(next_points, count)
+    index = np.arange(start, stop) % count
+    weight = np.clip((np.arange(start, stop) - morph_start) / max(morph_stop - morph_start, 1), 0.0, 1.0)
+    weight = (weight * weight * (3 - 2 * weight))[:, None]
+    blended = (1 - weight) * a[index] + weight * b[index]
+    return blended[:, 0], blended[:, 1]
+
+def compile_animation(source, output_wav, fps=30.0, refresh_fps=60.0, sample_rate=44100, loops=1, morph=0.0,
+                      uniform_speed=False, optimize_paths=True, cache_dir=None, workers=None, chunk_size=65536):
+    """
+    Render an SVG frame sequence to an XY WAV
+
+    Parameters:
+    source -- Directory, printf or glob pattern of SVG frames, or one SVG
+              whose layers are the frames (see find_frames)
+    output_wav -- Path to save the audio file
+    fps -- Animation frames per second
+    refresh_fps -- Times each frame is redrawn per second; every frame is
+                   fitted into sample_rate / refresh_fps points. None keeps
+                   the sampled point count of each frame.
+    sample_rate -- Audio sample rate in Hz
+    loops -- Times the whole sequence is played
+    morph -- Fraction (0 to 1) of each frame spent blending into the next;
+             0 cuts straight from frame to frame
+    uniform_speed, optimize_paths -- As for generate_oscilloscope_audio
+    cache_dir -- Point cache directory; defaults to a temporary one that is
+                 removed afterwards
+    workers -- Processes used to sample frames (defaults to the CPU count)
+    chunk_size -- Largest block of samples synthesized at once
+
+    Returns a dict with the frame counts, cache hits, sample count and timings.
+    """
+    frames = find_frames(source)
+    if not frames:
+        raise ValueError(f"No SVG frames found in {source}")
+    params = {
+        'animation_frame': True,
+        'uniform_speed': uniform_speed,
+        'optimize_paths': optimize_paths,
+        'refresh_fps': refresh_fps,
+        'sample_rate': sample_rate if refresh_fps is not None else None,
+    }
+    temporary_cache = cache_dir is None
+    if temporary_cache:
+        cache_dir = tempfile.mkdtemp(prefix='svg_animation_')
+    cache = PointCache(cache_dir)
+    try:
+        # Pass 1: sample each distinct frame once
+        prepare_start = time.perf_counter()
+        keys = [frame_key(frame, params) for _, frame in frames]
+        jobs = {}
+        for (label, frame), key in zip(frames, keys):
+            label = os.path.abspath(frame) if isinstance(frame, str) else label
+            jobs.setdefault(key, (label, frame, key, cache_dir, params))
+        print(f"{len(frames)} frames, {len(jobs)} distinct")
+        info = {}
+        workers = workers or os.cpu_count() or 1
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            for key, count, bounds, hit in pool.map(_prepare_frame, jobs.values()):
+                info[key] = {'points': count, 'bounds': bounds, 'hit': hit}
+        prepare_seconds = time.perf_counter() - prepare_start
+
+        # Common bounds, so the drawing does not rescale from frame to frame
+        bounds = [b['bounds'] for b in info.values() if b['bounds'] is not None]
+        if not bounds:
+            raise ValueError(f"No paths found in any frame of {source}")
+        xy_min = np.min([b[0] for b in bounds], axis=0)
+        xy_max = np.max([b[1] for b in bounds], axis=0)
+        xy_max = np.where(xy_max > xy_min, xy_max, xy_min + 1)
+
+        loaded = {}
+        def load(key):
+            # Holds at most the current and the next frame
+            if key not in loaded:
+                points = cache.get(key)[0].astype(np.float64)
+                loaded[key] = normalize_points(points, xy_min, xy_max) if len(points) else points
+            return loaded[key]
+
+        # Pass 2: stream the frames in order
+        synthesis_start = time.perf_counter()
+        frame_samples = sample_rate / fps
+        total_frames = len(frames) * loops
+        with WavStreamWriter(output_wav, sample_rate, channels=2) as writer:
+            for n in range(total_frames):
+                key = keys[n % len(frames)]
+                next_key = keys[(n + 1) % len(frames)] if n + 1 < total_frames else key
+                for stale in [k for k in loaded if k not in (key, next_key)]:
+                    del loaded[stale]
+                length = int(round((n + 1) * frame_samples)) - int(round(n * frame_samples))
+                morph_start = int(length * (1 - morph)) if morph > 0 and next_key != key else length
+                for block_start in range(0, length, chunk_size):
+                    block_stop = min(block_start + chunk_size, length)
+                    if block_stop <= morph_start:
+                        x, y = trace_frame(load(key), block_start, block_stop)
+                    else:
+                        x, y = morph_frames(load(key), load(next_key), block_start, block_stop, morph_start, length)
+                    writer.write(finish_audio_block(x, y))
+            samples = writer.frames_written
+        synthesis_seconds = time.perf_counter() - synthesis_start
+    finally:
+        if temporary_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    hits = sum(1 for b in info.values() if b['hit'])
+    print(f"Sampled {len(info) - hits} frames ({hits} from cache) in {prepare_seconds:.2f}s")
+    print(f"Streamed {samples} samples ({samples / sample_rate:.1f}s at {fps} fps) in {synthesis_seconds:.2f}s")
+    print(f"Audio saved to {output_wav}")
+    return {
+        'frames': len(frames),
+        'distinct_frames': len(info),
+        'cache_hits': hits,
+        'points_max': max(b['points'] for b in info.values()),
+        'samples': samples,
+        'prepare_seconds': prepare_seconds,
+        'synthesis_seconds': synthesis_seconds,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile SVG frames into an XY oscilloscope animation")
+    parser.add_argument("source", help="Frame directory, pattern (frame_%%04d.svg or 'frames/*.svg') or a layered SVG")
+    parser.add_argument("output", help="Output WAV")
+    parser.add_argument("--fps", type=float, default=30.0, help="Animation frames per second")
+    parser.add_argument("--refresh-fps", type=float, default=60.0, help="Redraws per second; sets each frame's point budget")
+    parser.add_argument("--no-budget", action="store_true", help="Keep every sampled point instead of a per-frame budget")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="Output sample rate in Hz")
+    parser.add_argument("--loops", type=int, default=1, help="Times the sequence is played")
+    parser.add_argument("--morph", type=float, default=0.0, help="Fraction of each frame spent morphing into the next")
+    parser.add_argument("--uniform-speed", action="store_true", help="Sample paths evenly by arc length")
+    parser.add_argument("--no-optimize-paths", action="store_true", help="Keep the SVG's path order")
+    parser.add_argument("--cache-dir", default=None, help="Point cache directory (default: a temporary one)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    compile_animation(
+        args.source,
+        args.output,
+        fps=args.fps,
+        refresh_fps=None if args.no_budget else args.refresh_fps,
+        sample_rate=args.sample_rate,
+        loops=args.loops,
+        morph=args.morph,
+        uniform_speed=args.uniform_speed,
+        optimize_paths=not args.no_optimize_paths,
+        cache_dir=args.cache_dir,
+        workers=args.workers,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Vectorized sampling of svgpathtools paths into NumPy point arrays
+"""
+import numpy as np
+import svgpathtools as svgpath
+
+# Composite Gauss-Legendre nodes/weights on [0, 1] used to integrate segment
+# lengths; panels keep the error small near cusps of sharply bent curves
+LENGTH_PANELS = 16
+_gl_nodes, _gl_weights = np.polynomial.legendre.leggauss(8)
+_panel_starts = np.arange(LENGTH_PANELS)[:, None] / LENGTH_PANELS
+_GL_NODES = (_panel_starts + (_gl_nodes + 1) / (2 * LENGTH_PANELS)).ravel()
+_GL_WEIGHTS = np.tile(_gl_weights / (2 * LENGTH_PANELS), LENGTH_PANELS)
+
+# Points per segment used to build the arc-length table for uniform sampling
+ARC_TABLE_STEPS = 64
+
+def segment_points(segment, t):
+    """Evaluate an svgpathtools segment at an array of t values, returning complex points"""
+    t = np.asarray(t, dtype=np.float64)
+    if isinstance(segment, svgpath.Line):
+        return segment.start + (segment.end - segment.start) * t
+    if isinstance(segment, svgpath.QuadraticBezier):
+        mt = 1 - t
+        return mt * mt * segment.start + 2 * mt * t * segment.control + t * t * segment.end
+    if isinstance(segment, svgpath.CubicBezier):
+        mt = 1 - t
+        return (mt * mt * mt * segment.start + 3 * mt * mt * t * segment.control1
+                + 3 * mt * t * t * segment.control2 + t * t * t * segment.end)
+    if isinstance(segment, svgpath.Arc):
+        angle = np.radians(segment.theta + t * segment.delta)
+        cosphi = segment.rot_matrix.real
+        sinphi = segment.rot_matrix.imag
+        rx = segment.radius.real
+        ry = segment.radius.imag
+        x = rx * cosphi * np.cos(angle) - ry * sinphi * np.sin(angle) + segment.center.real
+        y = rx * sinphi * np.cos(angle) + ry * cosphi * np.sin(angle) + segment.center.imag
+        return x + 1j * y
+    # Unknown segment type: fall back to the scalar evaluator
+    return np.array([segment.point(v) for v in t], dtype=np.complex128)
+
+def segment_derivative(segment, t):
+    """Evaluate d(point)/dt of an svgpathtools segment at an array of t values"""
+    t = np.asarray(t, dtype=np.float64)
+    if isinstance(segment, svgpath.Line):
+        return np.full(t.shape, segment.end - segment.start, dtype=np.complex128)
+    if isinstance(segment, svgpath.QuadraticBezier):
+        return 2 * (1 - t) * (segment.control - segment.start) + 2 * t * (segment.end - segment.control)
+    if isinstance(segment, svgpath.CubicBezier):
+        mt = 1 - t
+        return (3 * mt * mt * (segment.control1 - segment.start)
+                + 6 * mt * t * (segment.control2 - segment.control1)
+                + 3 * t * t * (segment.end - segment.control2))
+    if isinstance(segment, svgpath.Arc):
+        angle = np.radians(segment.theta + t * segment.delta)
+        rate = np.radians(segment.delta)
+        cosphi = segment.rot_matrix.real
+        sinphi = segment.rot_matrix.imag
+        rx = segment.radius.real
+        ry = segment.radius.imag
+        dx = (-rx * cosphi * np.sin(angle) - ry * sinphi * np.cos(angle)) * rate
+        dy = (-rx * sinphi * np.sin(angle) + ry * cosphi * np.cos(angle)) * rate
+        return dx + 1j * dy
+    return np.array([segment.derivative(v) for v in t], dtype=np.complex128)
+
+def segment_lengths(path):
+    """Return the length of every segment in a path as a float array"""
+    lengths = np.empty(len(path))
+    for i, segment in enumerate(path):
+        if isinstance(segment, svgpath.Line):
+            lengths[i] = abs(segment.end - segment.start)
+        else:
+            lengths[i] = np.dot(_GL_WEIGHTS, np.abs(segment_derivative(segment, _GL_NODES)))
+    return lengths
+
+def sample_path(path, num_samples, uniform=False, lengths=None):
+    """
+    Sample a path at num_samples positions and return them as a complex array
+
+    Parameters:
+    path -- svgpathtools Path
+    num_samples -- Number of points to return
+    uniform -- If False, match Path.point(T) for T in linspace(0, 1): segments are
+               picked by length but each is sampled in its own t parameter.
+               If True, space the points evenly by arc length so the beam moves
+               at a constant speed.
+    lengths -- Precomputed segment_lengths(path), if available
+    """
+    if lengths is None:
+        lengths = segment_lengths(path)
+    total = lengths.sum()
+
+    if uniform:
+        # Dense arc-length table over the whole path, then invert it
+        table_t = np.linspace(0, 1, ARC_TABLE_STEPS + 1)
+        table = np.concatenate([segment_points(segment, table_t) for segment in path])
+        arc = np.concatenate(([0.0], np.cumsum(np.abs(np.diff(table)))))
+        targets = np.linspace(0, arc[-1], num_samples)
+        return np.interp(targets, arc, table.real) + 1j * np.interp(targets, arc, table.imag)
+
+    positions = np.linspace(0, 1, num_samples)
+    if total == 0:
+        return np.full(num_samples, path[0].start, dtype=np.complex128)
+
+    # Map each global position to (segment index, local t) as Path.point does
+    ends = np.cumsum(lengths / total)
+    starts = ends - lengths / total
+    seg_index = np.minimum(np.searchsorted(ends, positions, side='left'), len(path) - 1)
+    span = ends[seg_index] - starts[seg_index]
+    local_t = np.divide(positions - starts[seg_index], span,
+                        out=np.zeros_like(positions), where=span > 0)
+    local_t = np.clip(local_t, 0, 1)
+
+    points = np.empty(num_samples, dtype=np.complex128)
+    for i in np.unique(seg_index):
+        mask = seg_index == i
+        points[mask] = segment_points(path[i], local_t[mask])
+    # The endpoints are taken from the first/last segment, like Path.point(0)/(1)
+    points[0] = path[0].start
+    points[-1] = path[-1].end
+    return points
+
+def sample_paths(paths, density=0.2, min_samples=100, uniform=False):
+    """
+    Sample every non-empty path, with max(min_samples, int(length * density)) points each
+
+    Returns a list of float arrays of shape (N, 2), one per path.
+    """
+    path_points = []
+    for path in paths:
+        if len(path) == 0:
+            continue
+        lengths = segment_lengths(path)
+        num_samples = max(min_samples, int(lengths.sum() * density))
+        points = sample_path(path, num_samples, uniform=uniform, lengths=lengths)
+        path_points.append(np.column_stack((points.real, points.imag)))
+    return path_points
+
+def extract_svg_points(svg_file, density=0.2, min_samples=100, uniform=False):
+    """Parse an SVG file and return the sampled points of each of its paths"""
+    paths, _ = svgpath.svg2paths(svg_file)
+    return sample_paths(paths, density=density, min_samples=min_samples, uniform=uniform)
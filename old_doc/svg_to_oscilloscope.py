@@ -1,10 +1,143 @@
 import numpy as np
 from scipy.io import wavfile
-import svgpathtools as svgpath
 import os
 import glob
+import io
+import json
+import time
+import argparse
+import contextlib
+import concurrent.futures
+from path_schedule import schedule_paths, travel_length, join_paths
+from point_cache import PointCache, cache_key, DEFAULT_CACHE_DIR
+from point_budget import allocate_point_budget, frame_budget
+from svg_sampling import extract_svg_points
+from wav_stream import WavStreamWriter
 
-def generate_oscilloscope_audio(svg_file, output_wav, sample_rate=44100, duration=10.0, speed_factor=5.0, repetitions=10):
+def synthesize_xy(points, num_samples, speed_factor=5.0, repetitions=10, start=0, stop=None):
+    """
+    Trace a closed point list into X/Y channels in one vectorized pass
+    
+    Parameters:
+    points -- Array of shape (N, 2) holding normalized (x, y) points
+    num_samples -- Total number of samples in the render
+    speed_factor -- Number of times the point list is traced per repetition
+    repetitions -- Number of times to draw the complete image
+    start, stop -- Sample range to produce (defaults to the whole render)
+    
+    Returns (x_channel, y_channel) as float64 arrays.
+    """
+    if stop is None:
+        stop = num_samples
+    total_points = len(points)
+    rep_samples = num_samples / repetitions
+    
+    # Position within the current repetition (0 to 1) for every sample
+    sample_index = np.arange(start, stop, dtype=np.float64)
+    pos_in_rep = np.mod(sample_index, rep_samples) / rep_samples
+    
+    # Apply speed factor (faster = cover more points in the same time)
+    point_position = np.mod(pos_in_rep * speed_factor * total_points, total_points)
+    
+    # Which two points each sample lies between, and how far along
+    whole = np.floor(point_position)
+    idx1 = whole.astype(np.int64) % total_points
+    idx2 = (idx1 + 1) % total_points
+    alpha = point_position - whole
+    
+    x_channel = (1 - alpha) * points[idx1, 0] + alpha * points[idx2, 0]
+    y_channel = (1 - alpha) * points[idx1, 1] + alpha * points[idx2, 1]
+    return x_channel, y_channel
+
+def finish_audio_block(x_channel, y_channel):
+    """Add anti-aliasing noise, clip to [-1, 1] and return float32 stereo frames"""
+    # Create stereo audio (left = X, right = Y)
+    audio_data = np.column_stack((x_channel, y_channel))
+    
+    # Optional: Add a small amount of noise to reduce aliasing artifacts
+    noise = np.random.normal(0, 0.001, audio_data.shape)
+    audio_data = audio_data + noise
+    
+    # Ensure audio stays within [-1, 1] range
+    audio_data = np.clip(audio_data, -1.0, 1.0)
+    return audio_data.astype(np.float32)
+
+def layout_points(path_points, sample_rate=44100, optimize_paths=False, target_fps=None):
+    """
+    Order, budget and join sampled paths into one point list in SVG units
+    
+    See generate_oscilloscope_audio for the parameters. Returns
+    (points, schedule stats or None, budget stats or None).
+    """
+    schedule = None
+    if optimize_paths:
+        # Reorder paths to cut beam travel
+        points_before = sum(len(p) for p in path_points)
+        travel_before = travel_length(path_points)
+        path_points = schedule_paths(path_points)
+        travel_after = travel_length(path_points)
+    
+    budget = None
+    if target_fps is not None:
+        # Fit the drawing into one frame's worth of samples, keeping room
+        # for the settle point after each jump
+        reserve = len(path_points) if optimize_paths else 0
+        path_points, budget = allocate_point_budget(path_points, frame_budget(target_fps, sample_rate),
+                                                    reserve=reserve)
+        print(f"Point budget: {budget['points']}/{budget['budget']} points per frame at {target_fps} fps")
+    
+    if optimize_paths:
+        # Join paths that already touch, jump between the rest
+        all_points, jumps = join_paths(path_points)
+        schedule = {
+            'travel_before': travel_before,
+            'travel_after': travel_after,
+            'points_before': points_before,
+            'points_after': len(all_points),
+            'jumps': jumps,
+        }
+        print(f"Path travel: {travel_before:.1f} -> {travel_after:.1f} units ({jumps} jumps)")
+        print(f"Points per frame: {points_before} -> {len(all_points)}")
+    else:
+        all_points = np.concatenate(path_points)
+    
+    return all_points, schedule, budget
+
+def normalize_points(all_points, xy_min=None, xy_max=None):
+    """Scale points to [-1, 1] (over their own bounds unless given) and flip Y to audio orientation"""
+    if xy_min is None:
+        xy_min = all_points.min(axis=0)
+    if xy_max is None:
+        xy_max = all_points.max(axis=0)
+    points = 2 * (all_points - xy_min) / (xy_max - xy_min) - 1
+    # Invert Y axis to match SVG coordinate system
+    points[:, 1] = -points[:, 1]
+    return points
+
+def prepare_points(svg_file, sample_rate=44100, uniform_speed=False, optimize_paths=False, target_fps=None):
+    """
+    Parse an SVG and turn it into the normalized point array that gets traced
+    
+    See generate_oscilloscope_audio for the parameters. Returns
+    (points, schedule stats or None, budget stats or None).
+    """
+    print(f"Parsing SVG file: {svg_file}")
+    
+    # Parse the SVG file and sample points from all paths
+    if target_fps is None:
+        path_points = extract_svg_points(svg_file, uniform=uniform_speed)
+    else:
+        # Sample densely; the budget allocator decides how many points survive
+        path_points = extract_svg_points(svg_file, density=1.0, uniform=uniform_speed)
+    
+    all_points, schedule, budget = layout_points(path_points, sample_rate, optimize_paths, target_fps)
+    
+    print(f"Extracted {len(all_points)} points from SVG")
+    
+    # Normalize points to [-1, 1] range for audio
+    return normalize_points(all_points), schedule, budget
+
+def generate_oscilloscope_audio(svg_file, output_wav, sample_rate=44100, duration=10.0, speed_factor=5.0, repetitions=10, chunk_size=None, uniform_speed=False, optimize_paths=False, target_fps=None, cache_dir=None):
     """
     Generate audio that will draw the SVG on an XY oscilloscope
     
@@ -15,126 +148,224 @@ def generate_oscilloscope_audio(svg_file, output_wav, sample_rate=44100, duratio
     duration -- Length of the audio in seconds
     speed_factor -- Higher values make drawing faster
     repetitions -- Number of times to draw the complete image
+    chunk_size -- If set, generate and stream the WAV in blocks of this many
+                  samples so peak memory does not grow with duration
+    uniform_speed -- Space points evenly by arc length so the beam moves
+                     at a constant speed
+    optimize_paths -- Reorder and reverse paths to minimize beam travel
+                      between them (see path_schedule.py)
+    target_fps -- If set, fit the drawing into sample_rate / target_fps points
+                  per frame (see point_budget.py) and derive speed_factor so
+                  that every frame is redrawn at least that often
+    cache_dir -- If set, reuse point arrays cached there (see point_cache.py)
+                 when the SVG and the sampling options are unchanged
+    
+    Returns a dict with the point count, sample count, synthesis time,
+    realtime factor (seconds of audio synthesized per second of wall time)
+    and, with optimize_paths, the before/after travel and points per frame,
+    and with target_fps, the point budget.
     """
-    print(f"Parsing SVG file: {svg_file}")
+    if cache_dir is None:
+        points, schedule, budget = prepare_points(svg_file, sample_rate, uniform_speed, optimize_paths, target_fps)
+    else:
+        # Only these options change the point array; timing options do not
+        params = {
+            'uniform_speed': uniform_speed,
+            'optimize_paths': optimize_paths,
+            'target_fps': target_fps,
+            'sample_rate': sample_rate if target_fps is not None else None,
+        }
+        cache = PointCache(cache_dir)
+        key = cache_key(svg_file, params)
+        cached = cache.get(key)
+        if cached is not None:
+            points, info = cached
+            schedule, budget = info['schedule'], info['budget']
+            print(f"Loaded {len(points)} cached points for {svg_file}")
+        else:
+            points, schedule, budget = prepare_points(svg_file, sample_rate, uniform_speed, optimize_paths, target_fps)
+            cache.put(key, points, {'svg': os.path.abspath(svg_file), 'params': params,
+                                    'schedule': schedule, 'budget': budget})
+    # The cache stores float32; round every path to it, so the output is the
+    # same whether the points were cached, freshly cached or not cached at all
+    points = points.astype(np.float32).astype(np.float64)
     
-    # Parse the SVG file
-    paths, _ = svgpath.svg2paths(svg_file)
+    # Generate audio samples with interpolation for smoothness
+    num_samples = int(sample_rate * duration)
     
-    # Sample points from all paths
-    all_points = []
-    for path in paths:
-        # Determine number of points based on path length
-        num_samples = max(100, int(path.length() * 0.2))
-        
-        for t in np.linspace(0, 1, num_samples):
-            point = path.point(t)
-            all_points.append((point.real, point.imag))
+    if target_fps is not None:
+        # One point per sample: each frame takes len(points) samples
+        speed_factor = sample_rate * duration / (len(points) * repetitions)
+        print(f"Refresh rate: {sample_rate / len(points):.1f} fps (speed factor {speed_factor:.2f})")
     
-    print(f"Extracted {len(all_points)} points from SVG")
+    if chunk_size is None:
+        start_time = time.perf_counter()
+        x_channel, y_channel = synthesize_xy(points, num_samples, speed_factor, repetitions)
+        synthesis_seconds = time.perf_counter() - start_time
+        
+        # Save as WAV file
+        wavfile.write(output_wav, sample_rate, finish_audio_block(x_channel, y_channel))
+    else:
+        # Stream fixed-size blocks straight to disk
+        synthesis_seconds = 0.0
+        with WavStreamWriter(output_wav, sample_rate, channels=2) as writer:
+            for block_start in range(0, num_samples, chunk_size):
+                block_stop = min(block_start + chunk_size, num_samples)
+                start_time = time.perf_counter()
+                x_channel, y_channel = synthesize_xy(points, num_samples, speed_factor, repetitions,
+                                                     block_start, block_stop)
+                synthesis_seconds += time.perf_counter() - start_time
+                writer.write(finish_audio_block(x_channel, y_channel))
     
-    # Normalize points to [-1, 1] range for audio
-    x_values = [p[0] for p in all_points]
-    y_values = [p[1] for p in all_points]
+    realtime_factor = duration / synthesis_seconds if synthesis_seconds > 0 else float('inf')
     
-    x_min, x_max = min(x_values), max(x_values)
-    y_min, y_max = min(y_values), max(y_values)
+    print(f"Audio saved to {output_wav}")
+    print(f"Drawing speed: {speed_factor}x, Repetitions: {repetitions}")
+    print(f"Synthesized {num_samples} samples in {synthesis_seconds:.3f}s ({realtime_factor:.0f}x realtime)")
     
-    normalized_points = []
-    for x, y in all_points:
-        # Normalize to [-1, 1] range
-        x_norm = 2 * (x - x_min) / (x_max - x_min) - 1
-        y_norm = 2 * (y - y_min) / (y_max - y_min) - 1
-        # Invert Y axis to match SVG coordinate system
-        normalized_points.append((x_norm, -y_norm))
+    return {
+        'points': len(points),
+        'samples': num_samples,
+        'synthesis_seconds': synthesis_seconds,
+        'realtime_factor': realtime_factor,
+        'schedule': schedule,
+        'budget': budget,
+    }
+
+def _convert_svg_file(job):
+    """Worker for convert_svg_directory: render one SVG and time it"""
+    svg_file, output_wav, render_options = job
+    result = {
+        'file': os.path.basename(svg_file),
+        'output': output_wav,
+        'status': 'ok',
+        'error': None,
+        'points': 0,
+        'samples': 0,
+        'seconds': 0.0,
+    }
+    start_time = time.perf_counter()
+    try:
+        # Keep per-file chatter out of the batch progress output
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = generate_oscilloscope_audio(svg_file, output_wav, **render_options)
+        result['points'] = stats['points']
+        result['samples'] = stats['samples']
+        result['schedule'] = stats['schedule']
+        result['budget'] = stats['budget']
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+def convert_svg_directory(svg_dir, audio_dir, workers=None, report_path=None, **render_options):
+    """
+    Convert every SVG in a directory to oscilloscope audio using a process pool
     
-    # Generate audio samples with interpolation for smoothness
-    num_samples = int(sample_rate * duration)
-    x_channel = np.zeros(num_samples)
-    y_channel = np.zeros(num_samples)
+    Parameters:
+    svg_dir -- Directory containing the SVG files
+    audio_dir -- Directory to write the WAV files to
+    workers -- Number of worker processes (defaults to the CPU count)
+    report_path -- Where to write the JSON summary report
+                   (defaults to conversion_report.json in audio_dir)
+    render_options -- Keyword arguments passed to generate_oscilloscope_audio
     
-    total_points = len(normalized_points)
+    A failing SVG is recorded in the report and does not abort the batch.
+    Returns the list of per-file results.
+    """
+    svg_files = sorted(glob.glob(os.path.join(svg_dir, "*.svg")))
+    if not svg_files:
+        print(f"No SVG files found in {svg_dir}")
+        return []
     
-    # Add smooth transitions between repetitions
-    transition_points = int(total_points * 0.05)  # 5% of points for transition
+    os.makedirs(audio_dir, exist_ok=True)
+    if report_path is None:
+        report_path = os.path.join(audio_dir, "conversion_report.json")
+    workers = workers or os.cpu_count() or 1
     
-    for i in range(num_samples):
-        # Calculate which repetition we're in
-        rep_duration = duration / repetitions
-        rep_samples = num_samples / repetitions
-        current_rep = int(i / rep_samples)
-        
-        # Calculate position within current repetition (0 to 1)
-        pos_in_rep = (i % rep_samples) / rep_samples
-        
-        # Apply speed factor (faster = cover more points in the same time)
-        point_position = (pos_in_rep * speed_factor * total_points) % total_points
-        
-        # Calculate which two points we should be between
-        idx1 = int(point_position) % total_points
-        idx2 = (idx1 + 1) % total_points
-        
-        # Interpolation factor
-        alpha = point_position - int(point_position)
-        
-        # Interpolate between the two points for smoothness
-        x_channel[i] = (1 - alpha) * normalized_points[idx1][0] + alpha * normalized_points[idx2][0]
-        y_channel[i] = (1 - alpha) * normalized_points[idx1][1] + alpha * normalized_points[idx2][1]
+    jobs = []
+    for svg_file in svg_files:
+        name_without_ext = os.path.splitext(os.path.basename(svg_file))[0]
+        output_wav = os.path.join(audio_dir, f"{name_without_ext}.wav")
+        jobs.append((svg_file, output_wav, render_options))
     
-    # Create stereo audio (left = X, right = Y)
-    audio_data = np.column_stack((x_channel, y_channel))
+    print(f"Found {len(svg_files)} SVG files to process with {workers} worker(s)")
     
-    # Optional: Add a small amount of noise to reduce aliasing artifacts
-    noise = np.random.normal(0, 0.001, audio_data.shape)
-    audio_data = audio_data + noise
+    results = []
+    batch_start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_convert_svg_file, job) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'ok':
+                print(f"[{len(results)}/{len(jobs)}] {result['file']}: {result['points']} points, "
+                      f"{result['samples']} samples in {result['seconds']:.2f}s")
+            else:
+                print(f"[{len(results)}/{len(jobs)}] {result['file']}: FAILED ({result['error']})")
+    batch_seconds = time.perf_counter() - batch_start
     
-    # Ensure audio stays within [-1, 1] range
-    audio_data = np.clip(audio_data, -1.0, 1.0)
+    results.sort(key=lambda r: r['file'])
+    failed = [r for r in results if r['status'] != 'ok']
+    report = {
+        'svg_dir': svg_dir,
+        'audio_dir': audio_dir,
+        'workers': workers,
+        'render_options': render_options,
+        'total_seconds': batch_seconds,
+        'converted': len(results) - len(failed),
+        'failed': len(failed),
+        'files': results,
+    }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
     
-    # Save as WAV file
-    wavfile.write(output_wav, sample_rate, audio_data.astype(np.float32))
-    print(f"Audio saved to {output_wav}")
-    print(f"Drawing speed: {speed_factor}x, Repetitions: {repetitions}")
+    print(f"\nConverted {report['converted']}/{len(results)} files in {batch_seconds:.2f}s "
+          f"({len(failed)} failed)")
+    print(f"Report written to {report_path}")
+    return results
 
 if __name__ == "__main__":
     # Get the directory of this script
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Define input and output directories
-    svg_dir = os.path.join(script_dir, "svg")
-    audio_dir = os.path.join(script_dir, "audio")
+    parser = argparse.ArgumentParser(description="Convert SVG files to XY oscilloscope audio")
+    parser.add_argument("--svg-dir", default=os.path.join(script_dir, "svg"), help="Input SVG directory")
+    parser.add_argument("--audio-dir", default=os.path.join(script_dir, "audio"), help="Output WAV directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--report", default=None, help="Summary report path (default: <audio-dir>/conversion_report.json)")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of audio per SVG")
+    parser.add_argument("--speed-factor", type=float, default=3.0, help="Drawing speed multiplier")
+    parser.add_argument("--repetitions", type=int, default=10, help="Times the image is drawn")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="Output sample rate in Hz")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Stream the WAV in blocks of this many samples")
+    parser.add_argument("--uniform-speed", action="store_true", help="Sample paths evenly by arc length")
+    parser.add_argument("--optimize-paths", action="store_true", help="Reorder paths to minimize beam travel")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Point cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-parse SVGs instead of using the point cache")
+    parser.add_argument("--target-fps", type=float, default=None, help="Fit each drawing into sample_rate/fps points per frame")
+    args = parser.parse_args()
     
     # Create directories if they don't exist
-    os.makedirs(svg_dir, exist_ok=True)
-    os.makedirs(audio_dir, exist_ok=True)
+    os.makedirs(args.svg_dir, exist_ok=True)
+    os.makedirs(args.audio_dir, exist_ok=True)
     
-    # Get all SVG files
-    svg_files = glob.glob(os.path.join(svg_dir, "*.svg"))
-    
-    if not svg_files:
-        print(f"No SVG files found in {svg_dir}")
-    else:
-        print(f"Found {len(svg_files)} SVG files to process")
-        
-        # Process each SVG file
-        for svg_file in svg_files:
-            # Get the filename without the directory and extension
-            base_name = os.path.basename(svg_file)
-            name_without_ext = os.path.splitext(base_name)[0]
-            
-            # Output WAV file path
-            output_wav = os.path.join(audio_dir, f"{name_without_ext}.wav")
-            
-            print(f"\nProcessing: {base_name}")
-            
-            # Generate audio for this SVG
-            generate_oscilloscope_audio(
-                svg_file, 
-                output_wav, 
-                duration=15.0,       # 15 seconds of audio
-                speed_factor=3.0,    # Draw 3x faster than original
-                repetitions=10       # Draw the image 10 times
-            )
+    convert_svg_directory(
+        args.svg_dir,
+        args.audio_dir,
+        workers=args.workers,
+        report_path=args.report,
+        sample_rate=args.sample_rate,
+        duration=args.duration,
+        speed_factor=args.speed_factor,
+        repetitions=args.repetitions,
+        chunk_size=args.chunk_size,
+        uniform_speed=args.uniform_speed,
+        optimize_paths=args.optimize_paths,
+        target_fps=args.target_fps,
+        cache_dir=None if args.no_cache else args.cache_dir,
+    )
     
     print("\nAll SVG files processed!")
     print("Instructions:")
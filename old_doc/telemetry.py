@@ -0,0 +1,293 @@
+"""
+Collector for render-loop and audio-callback telemetry sent by the page
+
+The page batches its measurements (frame times, audio callback and filter
+durations, active note counts) and sends them once a second. Each metric
+is kept in a fixed-size ring buffer, so percentiles always describe the
+most recent window and memory use does not grow over a long session.
+
+Key latency traces (keydown to note start, first audible block and first
+drawn frame) are kept the same way by LatencyTracker, per stage and per
+key, and unusually slow presses are flagged as they arrive.
+"""
+import os
+import csv
+import json
+import time
+import threading
+from collections import deque
+import numpy as np
+
+# Values kept per metric; at 60 frames a second this is about 9 minutes
+DEFAULT_CAPACITY = 32768
+
+# Units of the metrics the page sends, for display and export
+METRIC_UNITS = {
+    'frame_ms': 'ms',
+    'render_ms': 'ms',
+    'audio_callback_ms': 'ms',
+    'filter_ms': 'ms',
+    'active_notes': 'notes',
+    'system_load': 'load',
+}
+
+class RingBuffer:
+    """Fixed-size buffer of (time, value) pairs that overwrites the oldest entries"""
+
+    def __init__(self, capacity):
+        self.times = np.zeros(capacity)
+        self.values = np.zeros(capacity)
+        self.capacity = capacity
+        self.position = 0
+        self.count = 0
+
+    def extend(self, times, values):
+        values = np.asarray(values, dtype=np.float64)
+        # times is one value or one per value; keep the same newest entries of both
+        times = np.broadcast_to(np.asarray(times, dtype=np.float64), values.shape)[-self.capacity:]
+        values = values[-self.capacity:]
+        n = len(values)
+        first = min(n, self.capacity - self.position)
+        self.values[self.position:self.position + first] = values[:first]
+        self.times[self.position:self.position + first] = times[:first]
+        self.values[:n - first] = values[first:]
+        self.times[:n - first] = times[first:]
+        self.position = (self.position + n) % self.capacity
+        self.count = min(self.capacity, self.count + n)
+
+    def contents(self):
+        """(times, values) in the order they were added"""
+        if self.count < self.capacity:
+            return self.times[:self.count].copy(), self.values[:self.count].copy()
+        order = np.roll(np.arange(self.capacity), -self.position)
+        return self.times[order], self.values[order]
+
+class TelemetryCollector:
+    """
+    Rolling telemetry store
+
+    Parameters:
+    capacity -- Values kept per metric
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+            self._counters = {}
+            self._batches = 0
+            self._started = time.time()
+
+    def add_batch(self, batch):
+        """
+        Record one batch from the page
+
+        A batch is {'samples': {metric: [values]}, 'counters': {name: count}};
+        samples go into the ring buffers and counters (e.g. underruns) are
+        summed. The host's load average is recorded alongside each batch.
+        """
+        now = time.time()
+        samples = dict(batch.get('samples', {}))
+        if hasattr(os, 'getloadavg'):
+            samples['system_load'] = [os.getloadavg()[0]]
+        with self._lock:
+            for name, values in samples.items():
+                if not values:
+                    continue
+                if name not in self._metrics:
+                    self._metrics[name] = RingBuffer(self.capacity)
+                self._metrics[name].extend(now, values)
+            for name, count in batch.get('counters', {}).items():
+                self._counters[name] = self._counters.get(name, 0) + count
+            self._batches += 1
+
+    def summary(self):
+        """Percentiles of every metric over its window, plus the counters"""
+        with self._lock:
+            metrics = {}
+            for name, ring in self._metrics.items():
+                _, values = ring.contents()
+                if not len(values):
+                    continue
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                metrics[name] = {
+                    'count': len(values),
+                    'mean': float(values.mean()),
+                    'p50': float(p50),
+                    'p95': float(p95),
+                    'p99': float(p99),
+                    'max': float(values.max()),
+                    'unit': METRIC_UNITS.get(name, ''),
+                }
+            return {
+                'since': self._started,
+                'batches': self._batches,
+                'metrics': metrics,
+                'counters': dict(self._counters),
+            }
+
+    def format_summary(self):
+        """Summary as lines of text for the console"""
+        summary = self.summary()
+        if not summary['metrics']:
+            return ["No telemetry received yet"]
+        minutes = (time.time() - summary['since']) / 60
+        lines = [f"Telemetry from {summary['batches']} batches over {minutes:.1f} min"]
+        lines.append(f"  {'metric':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'count':>8}")
+        for name, m in sorted(summary['metrics'].items()):
+            lines.append(f"  {name:<20} {m['p50']:>9.2f} {m['p95']:>9.2f} {m['p99']:>9.2f} "
+                         f"{m['max']:>9.2f} {m['count']:>8}  {m['unit']}")
+        for name, count in sorted(summary['counters'].items()):
+            lines.append(f"  {name:<20} {count:>9}")
+        return lines
+
+    def export(self, path):
+        """
+        Write the current window to a file
+
+        A .csv path gets one row per value (metric, unix time, value); any
+        other path gets JSON with the summary and the raw values.
+        """
+        with self._lock:
+            series = {name: ring.contents() for name, ring in self._metrics.items()}
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['metric', 'time', 'value'])
+                for name, (times, values) in sorted(series.items()):
+                    for t, v in zip(times, values):
+                        writer.writerow([name, f"{t:.3f}", f"{v:.4f}"])
+        else:
+            data = self.summary()
+            data['series'] = {name: {'time': times.tolist(), 'value': values.tolist()}
+                              for name, (times, values) in series.items()}
+            with open(path, 'w') as f:
+                json.dump(data, f)
+        return sum(len(values) for _, values in series.values())
+
+# Stages of a key latency trace, in the order they happen; each is the
+# time in ms since the keydown event
+LATENCY_STAGES = ('note_start_ms', 'first_audio_ms', 'first_frame_ms')
+
+class LatencyTracker:
+    """
+    Key-to-sound latency distribution with outlier flagging
+
+    A press is an outlier when its first_frame_ms is above the median by
+    more than outlier_mads median absolute deviations (and by at least
+    min_excess_ms, so a very tight distribution does not flag jitter).
+
+    Parameters:
+    capacity -- Traces kept per stage
+    per_key -- Traces kept per key
+    outlier_mads -- Deviations above the median that count as an outlier
+    min_excess_ms -- Smallest excess over the median that counts
+    """
+
+    def __init__(self, capacity=4096, per_key=256, outlier_mads=5.0, min_excess_ms=10.0):
+        self.capacity = capacity
+        self.per_key = per_key
+        self.outlier_mads = outlier_mads
+        self.min_excess_ms = min_excess_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {stage: RingBuffer(self.capacity) for stage in LATENCY_STAGES}
+            self._keys = {}
+            self._outliers = deque(maxlen=100)
+            self._context = {}
+
+    def add_trace(self, trace):
+        """
+        Record one key press
+
+        trace holds 'key', the stage times and optionally 'output_latency_ms',
+        'buffer_size' and 'sample_rate'. Returns True if the press was flagged
+        as an outlier.
+        """
+        now = time.time()
+        total = trace.get('first_frame_ms')
+        with self._lock:
+            for stage in LATENCY_STAGES:
+                if trace.get(stage) is not None:
+                    self._stages[stage].extend(now, [trace[stage]])
+            if total is None:
+                return False
+            key = str(trace.get('key'))
+            if key not in self._keys:
+                self._keys[key] = deque(maxlen=self.per_key)
+            self._keys[key].append(total)
+            for name in ('output_latency_ms', 'buffer_size', 'sample_rate'):
+                if trace.get(name) is not None:
+                    self._context[name] = trace[name]
+            outlier = self._is_outlier(total)
+            if outlier:
+                self._outliers.append(dict(trace, time=now))
+        return outlier
+
+    def _is_outlier(self, total):
+        _, values = self._stages['first_frame_ms'].contents()
+        # Too few presses to know what normal looks like
+        if len(values) < 20:
+            return False
+        median = np.median(values)
+        mad = np.median(np.abs(values - median))
+        return total - median > max(self.outlier_mads * 1.4826 * mad, self.min_excess_ms)
+
+    def summary(self):
+        """Percentiles per stage, per-key medians, recent outliers and audio settings"""
+        with self._lock:
+            stages = {}
+            for stage, ring in self._stages.items():
+                _, values = ring.contents()
+                if len(values):
+                    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                    stages[stage] = {'count': len(values), 'p50': float(p50), 'p95': float(p95),
+                                     'p99': float(p99), 'max': float(values.max())}
+            keys = {key: {'count': len(values), 'p50': float(np.median(values)), 'max': float(max(values))}
+                    for key, values in self._keys.items() if values}
+            return {'stages': stages, 'keys': keys, 'outliers': list(self._outliers),
+                    'context': dict(self._context)}
+
+    def format_summary(self):
+        """Summary as lines of text for the console"""
+        summary = self.summary()
+        if not summary['stages']:
+            return ["No key latency traces received yet (set latencyTrace true)"]
+        lines = [f"  {'stage':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'count':>8}"]
+        for stage in LATENCY_STAGES:
+            m = summary['stages'].get(stage)
+            if m:
+                lines.append(f"  {stage:<20} {m['p50']:>9.2f} {m['p95']:>9.2f} {m['p99']:>9.2f} "
+                             f"{m['max']:>9.2f} {m['count']:>8}")
+        context = summary['context']
+        if context:
+            lines.append("  " + ", ".join(f"{name} {value}" for name, value in sorted(context.items())))
+        slowest = sorted(summary['keys'].items(), key=lambda item: -item[1]['p50'])[:10]
+        if slowest:
+            lines.append("  Slowest keys (median ms to first frame):")
+            for key, m in slowest:
+                lines.append(f"    {key:<10} {m['p50']:>8.2f}  max {m['max']:>8.2f}  ({m['count']} presses)")
+        if summary['outliers']:
+            lines.append(f"  {len(summary['outliers'])} outliers, most recent:")
+            for trace in summary['outliers'][-5:]:
+                lines.append(f"    {time.strftime('%H:%M:%S', time.localtime(trace['time']))} "
+                             f"{trace.get('key')}: {trace['first_frame_ms']:.2f} ms")
+        return lines
+
+    def export(self, path):
+        """Write the summary and per-stage values as JSON; returns the number of traces"""
+        with self._lock:
+            series = {stage: ring.contents() for stage, ring in self._stages.items()}
+        data = self.summary()
+        data['series'] = {stage: {'time': times.tolist(), 'value': values.tolist()}
+                          for stage, (times, values) in series.items()}
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        return len(series['first_frame_ms'][1])
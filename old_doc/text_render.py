@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Text on the scope from the single-stroke font in stroke_font.py
+
+GlyphCache samples every glyph once into one shared float32 array; a
+string is then laid out by offsetting slices of that array, with kerning
+and line breaks, and concatenated into the point list the beam traces.
+Each glyph is stored with its strokes already ordered for short travel,
+and while laying out a string every glyph is traced forwards or backwards,
+whichever starts nearer to where the previous one ended. Lines alternate
+direction for the same reason.
+
+Usage:
+  python text_render.py "HELLO WORLD" hello.wav
+  python text_render.py "NEWS TICKER +++ " ticker.wav --scroll 20 --window 40 --duration 10
+"""
+import argparse
+import numpy as np
+from scipy.io import wavfile
+from path_schedule import schedule_paths
+import stroke_font
+from svg_to_oscilloscope import finish_audio_block
+
+# Points per grid unit of stroke length when glyphs are sampled
+DEFAULT_DENSITY = 2.0
+
+# Samples a single-point stroke (a dot) holds the beam for
+DOT_POINTS = 4
+
+class GlyphCache:
+    """
+    Pre-sampled glyphs of a stroke font
+
+    Parameters:
+    glyphs -- Mapping of character to stroke code (see stroke_font.py)
+    density -- Points per grid unit of stroke length
+    settle_points -- Samples the beam holds on either side of a jump
+                     between strokes; symmetric, so a glyph can be traced
+                     backwards as well
+    """
+
+    def __init__(self, glyphs=stroke_font.GLYPHS, density=DEFAULT_DENSITY, settle_points=1):
+        self.density = density
+        pieces = []
+        self.index = {}
+        offset = 0
+        for char, code in glyphs.items():
+            strokes = [self._sample_stroke(np.array(s, dtype=np.float64)) for s in stroke_font.parse_glyph(code)]
+            # Shift so every glyph starts at x=0
+            left = min(s[:, 0].min() for s in strokes)
+            strokes = [s - (left, 0) for s in strokes]
+            strokes = schedule_paths(strokes) if len(strokes) > 2 else self._order_pair(strokes)
+            joined = []
+            for i, stroke in enumerate(strokes):
+                if i:
+                    joined.append(np.repeat(strokes[i - 1][-1:], settle_points, axis=0))
+                    joined.append(np.repeat(stroke[:1], settle_points, axis=0))
+                joined.append(stroke)
+            points = np.concatenate(joined)
+            width = float(points[:, 0].max())
+            self.index[char] = (offset, offset + len(points), width)
+            pieces.append(points)
+            offset += len(points)
+        self.points = np.concatenate(pieces).astype(np.float32)
+
+    def _sample_stroke(self, vertices):
+        """Points along a polyline, about density per unit, keeping every vertex"""
+        if len(vertices) == 1:
+            return np.repeat(vertices, DOT_POINTS, axis=0)
+        pieces = []
+        for start, end in zip(vertices[:-1], vertices[1:]):
+            steps = max(1, int(np.ceil(np.hypot(*(end - start)) * self.density)))
+            t = np.arange(steps)[:, None] / steps
+            pieces.append(start + (end - start) * t)
+        pieces.append(vertices[-1:])
+        return np.concatenate(pieces)
+
+    @staticmethod
+    def _order_pair(strokes):
+        """Orient the second of two strokes so it starts nearer the first one's end"""
+        if len(strokes) == 2:
+            first, second = strokes
+            if np.hypot(*(second[-1] - first[-1])) < np.hypot(*(second[0] - first[-1])):
+                strokes = [first, second[::-1]]
+        return strokes
+
+    def glyph(self, char):
+        """(points view, advance width) of a character; unknown ones become '?'"""
+        entry = self.index.get(char) or self.index.get(char.upper()) or self.index['?']
+        start, stop, width = entry
+        return self.points[start:stop], width
+
+    def layout(self, text, letter_spacing=stroke_font.LETTER_SPACING, line_height=stroke_font.LINE_HEIGHT):
+        """
+        Position every glyph of a (possibly multi-line) string
+
+        Returns a list of lines, each a list of (char, x offset, y offset);
+        lines are centred on x=0.
+        """
+        lines = []
+        for row, line in enumerate(text.split('\n')):
+            placed = []
+            x = 0.0
+            previous = None
+            for char in line:
+                if previous is not None:
+                    x += stroke_font.KERNING.get((previous + char).upper(), 0.0)
+                if char == ' ':
+                    x += stroke_font.SPACE_WIDTH
+                    previous = None
+                    continue
+                _, width = self.glyph(char)
+                placed.append((char, x, -row * line_height))
+                x += width + letter_spacing
+                previous = char
+            width = x - letter_spacing if placed else 0.0
+            lines.append([(char, gx - width / 2, gy) for char, gx, gy in placed])
+        return lines
+
+    def text_width(self, text, **layout_options):
+        """Width in grid units of the widest line"""
+        widths = [line[-1][1] - line[0][1] + self.glyph(line[-1][0])[1]
+                  for line in self.layout(text, **layout_options) if line]
+        return max(widths, default=0.0)
+
+    def render(self, text, window=None, scroll=0.0, **layout_options):
+        """
+        Concatenate the glyphs of a string into one point list in grid units
+
+        window -- If set, only this many grid units around x=0 are drawn;
+                  scroll shifts the text left by that many units, so
+                  increasing it over time gives a marquee
+        """
+        pieces = []
+        position = None
+        for row, line in enumerate(self.layout(text, **layout_options)):
+            # Alternate line direction so the beam does not fly back each line
+            if row % 2:
+                line = line[::-1]
+            for char, x, y in line:
+                points, width = self.glyph(char)
+                x -= scroll
+                if window is not None and (x + width < -window / 2 or x > window / 2):
+                    continue
+                placed = points + np.array([x, y], dtype=np.float32)
+                if position is not None and np.hypot(*(placed[-1] - position)) < np.hypot(*(placed[0] - position)):
+                    placed = placed[::-1]
+                pieces.append(placed)
+                position = placed[-1]
+        if not pieces:
+            return np.zeros((1, 2), dtype=np.float32)
+        points = np.concatenate(pieces)
+        if window is not None:
+            # Drop the parts of glyphs scrolled past the edges
+            inside = np.abs(points[:, 0]) <= window / 2
+            points = points[inside] if inside.any() else np.zeros((1, 2), dtype=np.float32)
+        return points
+
+def fit_points(points, scale=None, margin=0.9):
+    """
+    Map grid units to [-1, 1] with the same scale on both axes
+
+    scale -- Grid units per unit of output; by default the text block is
+             fitted to the screen, which makes its size depend on the string
+    """
+    if scale is None:
+        centre = (points.max(axis=0) + points.min(axis=0)) / 2
+        scale = max(float(np.ptp(points, axis=0).max()) / 2, 1e-9) / margin
+        return (points - centre) / scale
+    # With a fixed scale the first line's capitals stay centred, so the
+    # text does not move as glyphs come and go
+    return (points - (0, stroke_font.BASELINE + stroke_font.CAP_HEIGHT / 2)) / scale
+
+class TextSource:
+    """
+    Text as an xy_stream source, tracing one point per sample
+
+    Parameters:
+    text -- A string, or a callable returning one (e.g. a live value)
+            that is read again for every block
+    scroll_speed -- Grid units per second the text moves left; needs window
+    window -- Visible width in grid units; the text enters at the right
+              edge, leaves at the left and starts over
+    cache -- GlyphCache to draw from
+    """
+
+    # Times per second a scrolling text is laid out again
+    SCROLL_UPDATE_RATE = 60
+
+    def __init__(self, text, scroll_speed=0.0, window=None, cache=None):
+        self.text = text
+        self.scroll_speed = scroll_speed
+        self.window = window
+        self.cache = cache or GlyphCache()
+        self._phase = 0
+        self._static = (None, None)
+
+    def _points(self, text, time_offset):
+        if self.window is None:
+            # A fixed string is laid out once
+            if self._static[0] != text:
+                self._static = (text, fit_points(self.cache.render(text)))
+            return self._static[1]
+        width = self.cache.text_width(text)
+        travel = width + self.window
+        scroll = (self.scroll_speed * time_offset) % travel - travel / 2
+        points = self.cache.render(text, window=self.window, scroll=scroll)
+        return fit_points(points, scale=self.window / 2 / 0.9)
+
+    def render(self, start, count, sample_rate):
+        text = self.text() if callable(self.text) else self.text
+        step = count if self.window is None else max(1, sample_rate // self.SCROLL_UPDATE_RATE)
+        frames = []
+        for offset in range(0, count, step):
+            points = self._points(text, (start + offset) / sample_rate)
+            index = (self._phase + np.arange(min(step, count - offset))) % len(points)
+            self._phase = int(index[-1]) + 1
+            frames.append(points[index])
+        points = np.concatenate(frames).astype(np.float64)
+        return finish_audio_block(points[:, 0], points[:, 1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Render text to XY oscilloscope audio")
+    parser.add_argument("text", help="Text to draw; \\n starts a new line")
+    parser.add_argument("output", help="Output WAV")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of audio")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="Output sample rate in Hz")
+    parser.add_argument("--density", type=float, default=DEFAULT_DENSITY, help="Points per font grid unit")
+    parser.add_argument("--scroll", type=float, default=0.0, help="Marquee speed in grid units per second")
+    parser.add_argument("--window", type=float, default=40.0, help="Visible width in grid units when scrolling")
+    args = parser.parse_args()
+
+    text = args.text.replace('\\n', '\n')
+    cache = GlyphCache(density=args.density)
+    source = TextSource(text, scroll_speed=args.scroll, window=args.window if args.scroll else None, cache=cache)
+    num_samples = int(args.sample_rate * args.duration)
+    block = 2048
+    frames = [source.render(start, min(block, num_samples - start), args.sample_rate)
+              for start in range(0, num_samples, block)]
+    wavfile.write(args.output, args.sample_rate, np.concatenate(frames))
+    points = cache.render(text)
+    print(f"{len(points)} points per drawing ({args.sample_rate / len(points):.0f} drawings per second)")
+    print(f"Audio saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Generate the tones/ bank as seamless, period-aligned loops
+
+Every tone is trimmed to the shortest whole number of periods that fits a
+whole number of samples, with the frequency nudged (by at most
+--max-detune cents) so the loop closes exactly. The browser loops these
+buffers with source.loop = true, so an exact period means no click at the
+seam and a buffer of a few hundred samples instead of a second of audio.
+
+As in the existing bank, NNNHz.wav and sound_NNNHz.wav are pure sines and
+only the xy_ tones use the harmonics; --sound-harmonics gives the sound_
+tones a harmonic mix instead.
+
+Usage:
+  python tone_bank.py
+  python tone_bank.py --octaves 2 --harmonics 1,0.5,0.33 --y-ratio 1.5 --y-phase 90
+"""
+import os
+import json
+import argparse
+from fractions import Fraction
+import numpy as np
+from scipy.io import wavfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TONES_DIR = os.path.join(SCRIPT_DIR, '..', 'tones')
+DEFAULT_CONFIG = os.path.join(SCRIPT_DIR, '..', 'web', 'tone-config.json')
+
+# Same peak level as the existing tones (9830 / 32767)
+DEFAULT_AMPLITUDE = 0.3
+
+# Keys handed out to tones, in the order used by tone-config.json
+TONE_KEYS = 'asdfghjklqwertyuiopzxcvbnm1234567890'
+
+DEFAULT_SETTINGS = {
+    'fadeInTime': 0.01,
+    'fadeOutTime': 0.05,
+    'defaultVolume': 0.6,
+}
+
+def chromatic_frequencies(base_midi=60, notes=12):
+    """Equal-tempered frequencies starting at a MIDI note (60 = middle C)"""
+    midi = base_midi + np.arange(notes)
+    return 440.0 * 2.0 ** ((midi - 69) / 12.0)
+
+def loop_length(frequency, sample_rate, max_detune_cents=1.0, max_periods=1000):
+    """
+    Find the shortest loop that holds a whole number of periods
+
+    Parameters:
+    frequency -- Desired frequency in Hz
+    sample_rate -- Sample rate in Hz
+    max_detune_cents -- Largest pitch change allowed to make the loop close
+    max_periods -- Give up on the tolerance after this many periods
+
+    Returns (periods, samples, exact frequency).
+    """
+    best = None
+    for periods in range(1, max_periods + 1):
+        samples = max(1, int(round(periods * sample_rate / frequency)))
+        exact = periods * sample_rate / samples
+        detune = abs(1200 * np.log2(exact / frequency))
+        if best is None or detune < best[3]:
+            best = (periods, samples, exact, detune)
+        if detune <= max_detune_cents:
+            break
+    return best[:3]
+
+def synthesize_bank(frequencies, lengths, harmonics, sample_rate, phase=0.0, ratio=1.0):
+    """
+    Synthesize a batch of loops in one NumPy pass
+
+    Parameters:
+    frequencies -- Exact loop frequencies in Hz, one per tone
+    lengths -- Loop length in samples, one per tone
+    harmonics -- Amplitudes of harmonics 1, 2, 3, ...
+    sample_rate -- Sample rate in Hz
+    phase -- Phase offset in radians added to every harmonic
+    ratio -- Frequency multiplier, e.g. for the Y channel of a Lissajous figure
+
+    Returns a (tones, max length) float array, peak-normalized per tone to 1
+    and zero beyond each tone's length.
+    """
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    lengths = np.asarray(lengths)
+    harmonics = np.asarray(harmonics, dtype=np.float64)
+    t = np.arange(lengths.max()) / sample_rate
+    orders = np.arange(1, len(harmonics) + 1)
+
+    # (tones, harmonics, samples): every partial of every tone at once
+    angle = 2 * np.pi * (frequencies[:, None, None] * ratio * orders[None, :, None]) * t + phase
+    waves = np.einsum('h,nhs->ns', harmonics, np.sin(angle))
+    waves[np.arange(lengths.max()) >= lengths[:, None]] = 0.0
+    peak = np.abs(waves).max(axis=1, keepdims=True)
+    return waves / np.where(peak > 0, peak, 1.0)
+
+def tone_name(kind, frequency, harmonics):
+    """File name in the style of the existing bank, e.g. xy_440Hz_3harm.wav"""
+    # The bank was named from the usual two-decimal note table truncated to
+    # whole Hz (C4 261.63 -> 261, G4 392.00 -> 392), so round to that first
+    hz = int(round(frequency, 2))
+    if kind == 'sine':
+        return f"{hz}Hz.wav"
+    if kind == 'sound':
+        return f"sound_{hz}Hz.wav"
+    return f"xy_{hz}Hz_{len(harmonics)}harm.wav"
+
+def to_int16(samples, amplitude):
+    return np.round(samples * amplitude * 32767).astype(np.int16)
+
+def build_tone_bank(tones_dir=DEFAULT_TONES_DIR, sample_rate=44100, base_midi=60, notes=12,
+                    harmonics=(1.0, 0.5, 0.33), y_ratio=1.0, y_phase=90.0,
+                    amplitude=DEFAULT_AMPLITUDE, max_detune_cents=1.0, min_samples=0,
+                    kinds=('sine', 'sound', 'xy'), sound_harmonics=(1.0,)):
+    """
+    Write a chromatic bank of looping tones
+
+    Parameters:
+    tones_dir -- Output directory
+    sample_rate -- Sample rate in Hz
+    base_midi, notes -- First MIDI note and number of semitones
+    harmonics -- Harmonic amplitudes for the xy_ tones
+    y_ratio -- Y frequency relative to X for the xy_ tones (1 = same pitch)
+    y_phase -- Phase of Y relative to X in degrees for the xy_ tones
+    amplitude -- Peak level, 0 to 1
+    max_detune_cents -- Largest pitch change allowed to make a loop close
+    min_samples -- Repeat short loops until they are at least this long
+    kinds -- Which variants to write: 'sine' (NNNHz.wav), 'sound'
+             (sound_NNNHz.wav, mono) and 'xy' (xy_NNNHz_Nharm.wav, stereo
+             Lissajous)
+    sound_harmonics -- Harmonic amplitudes for the sound_ tones; the
+                       default single partial keeps them pure sines,
+                       like the existing files
+
+    Returns a list of dicts describing each written file.
+    """
+    os.makedirs(tones_dir, exist_ok=True)
+    nominal = chromatic_frequencies(base_midi, notes)
+
+    # A Y ratio of p/q repeats only after q periods of X, so the loop is
+    # built on f/q and the harmonics are scaled to match
+    fraction = Fraction(y_ratio).limit_denominator(16)
+    cycle = fraction.denominator if 'xy' in kinds else 1
+    loops = [loop_length(f / cycle, sample_rate, max_detune_cents) for f in nominal]
+    lengths = np.array([samples for _, samples, _ in loops])
+    if min_samples:
+        lengths = lengths * np.maximum(1, -(-min_samples // lengths))
+    exact = np.array([frequency * cycle for _, _, frequency in loops])
+
+    bank = {}
+    if 'sine' in kinds:
+        bank['sine'] = synthesize_bank(exact, lengths, [1.0], sample_rate)
+    if 'sound' in kinds:
+        bank['sound'] = synthesize_bank(exact, lengths, sound_harmonics, sample_rate)
+    if 'xy' in kinds:
+        x = synthesize_bank(exact, lengths, harmonics, sample_rate)
+        y = synthesize_bank(exact, lengths, harmonics, sample_rate,
+                            phase=np.radians(y_phase), ratio=float(fraction))
+        bank['xy'] = np.stack((x, y), axis=-1)
+
+    written = []
+    for kind in kinds:
+        for i, frequency in enumerate(nominal):
+            name = tone_name(kind, frequency, harmonics)
+            samples = to_int16(bank[kind][i, :lengths[i]], amplitude)
+            wavfile.write(os.path.join(tones_dir, name), sample_rate, samples)
+            written.append({
+                'file': name,
+                'kind': kind,
+                'frequency': float(exact[i]),
+                'nominal_frequency': float(nominal[i]),
+                'samples': int(lengths[i]),
+            })
+    print(f"Wrote {len(written)} tones to {tones_dir} "
+          f"({lengths.min()}-{lengths.max()} samples per loop)")
+    return written
+
+def write_tone_config(written, config_path=DEFAULT_CONFIG, tones_url='../tones'):
+    """
+    Map the written tones to keys in tone-config.json
+
+    Existing settings (fade times, volume) are kept.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, 'r') as f:
+                settings.update(json.load(f).get('settings', {}))
+        except (OSError, ValueError) as e:
+            print(f"Error reading {config_path}: {e}")
+
+    mappings = {}
+    for key, tone in zip(TONE_KEYS, written):
+        mappings[key] = f"{tones_url}/{tone['file']}"
+    if len(written) > len(TONE_KEYS):
+        print(f"Warning: only the first {len(TONE_KEYS)} of {len(written)} tones were mapped to keys")
+
+    with open(config_path, 'w') as f:
+        json.dump({'mappings': mappings, 'settings': settings}, f, indent=2)
+    print(f"Wrote {len(mappings)} mappings to {config_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seamless looping tones and tone-config.json")
+    parser.add_argument("--tones-dir", default=DEFAULT_TONES_DIR, help="Output directory for WAV files")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="tone-config.json to write")
+    parser.add_argument("--no-config", action="store_true", help="Do not write tone-config.json")
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--base-midi", type=int, default=60, help="First note (60 = middle C)")
+    parser.add_argument("--octaves", type=float, default=1, help="Number of octaves in the bank")
+    parser.add_argument("--harmonics", default="1,0.5,0.33", help="Comma-separated harmonic amplitudes of the xy_ tones")
+    parser.add_argument("--sound-harmonics", default="1", help="Harmonic amplitudes of the sound_ tones (default: pure sine)")
+    parser.add_argument("--y-ratio", type=float, default=1.0, help="Y/X frequency ratio of the xy_ tones")
+    parser.add_argument("--y-phase", type=float, default=90.0, help="Y phase in degrees for the xy_ tones")
+    parser.add_argument("--amplitude", type=float, default=DEFAULT_AMPLITUDE, help="Peak level (0-1)")
+    parser.add_argument("--max-detune", type=float, default=1.0, help="Allowed pitch change in cents")
+    parser.add_argument("--min-samples", type=int, default=0, help="Minimum loop length in samples")
+    parser.add_argument("--kinds", default="sine,sound,xy", help="Variants to write: sine, sound, xy")
+    args = parser.parse_args()
+
+    harmonics = [float(h) for h in args.harmonics.split(',')]
+    sound_harmonics = [float(h) for h in args.sound_harmonics.split(',')]
+    kinds = [k.strip() for k in args.kinds.split(',') if k.strip()]
+    unknown = set(kinds) - {'sine', 'sound', 'xy'}
+    if unknown:
+        parser.error(f"unknown kinds: {', '.join(sorted(unknown))}")
+
+    written = build_tone_bank(args.tones_dir, args.sample_rate, args.base_midi, int(round(args.octaves * 12)),
+                              harmonics, args.y_ratio, args.y_phase, args.amplitude, args.max_detune,
+                              args.min_samples, kinds, sound_harmonics)
+    for tone in written:
+        detune = 1200 * np.log2(tone['frequency'] / tone['nominal_frequency'])
+        print(f"  {tone['file']:<24} {tone['samples']:>6} samples  {tone['frequency']:.3f} Hz ({detune:+.2f} cents)")
+    if not args.no_config:
+        write_tone_config(written, args.config)
+
+if __name__ == "__main__":
+    main()
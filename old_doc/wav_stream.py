@@ -0,0 +1,175 @@
+"""
+Incremental WAV and raw writers for renders that are too long to hold in memory
+"""
+import os
+import json
+import struct
+import numpy as np
+
+# WAVE format tags
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+
+# RIFF sizes are 32 bit, so the data chunk (plus the 36 header bytes the
+# RIFF size counts and a pad byte) must stay below 4 GiB
+MAX_DATA_BYTES = 0xFFFFFFFF - 37
+
+class WavStreamWriter:
+    """
+    Write a WAV file block by block, fixing up the header sizes on close
+
+    Frames are appended with write(); nothing but the current block is kept
+    in memory, so peak usage is independent of the total length. A write
+    that would take the file past the 4 GiB WAV limit raises ValueError
+    before anything is written; use RawStreamWriter for longer renders.
+
+    Parameters:
+    path -- Path of the WAV file to create
+    sample_rate -- Sample rate in Hz
+    channels -- Number of interleaved channels
+    dtype -- np.float32 (IEEE float) or np.int16 (PCM)
+    """
+
+    def __init__(self, path, sample_rate, channels=2, dtype=np.float32):
+        self.path = path
+        self.sample_rate = int(sample_rate)
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        if self.dtype == np.float32:
+            self.format_tag = WAVE_FORMAT_IEEE_FLOAT
+        elif self.dtype == np.int16:
+            self.format_tag = WAVE_FORMAT_PCM
+        else:
+            raise ValueError(f"Unsupported WAV sample type: {self.dtype}")
+        self.frames_written = 0
+        self._file = open(path, 'wb')
+        self._write_header(0)
+
+    def _write_header(self, data_bytes):
+        """Write the RIFF/fmt/data headers for a data chunk of the given size"""
+        sample_bytes = self.dtype.itemsize
+        block_align = self.channels * sample_bytes
+        self._file.write(b'RIFF')
+        self._file.write(struct.pack('<I', 36 + data_bytes + data_bytes % 2))
+        self._file.write(b'WAVE')
+        self._file.write(b'fmt ')
+        self._file.write(struct.pack('<IHHIIHH', 16, self.format_tag, self.channels,
+                                     self.sample_rate, self.sample_rate * block_align,
+                                     block_align, sample_bytes * 8))
+        self._file.write(b'data')
+        self._file.write(struct.pack('<I', data_bytes))
+
+    def write(self, frames):
+        """Append an array of shape (n, channels) to the data chunk"""
+        frames = np.asarray(frames)
+        if frames.ndim == 1:
+            frames = frames.reshape(-1, 1)
+        if frames.shape[1] != self.channels:
+            raise ValueError(f"Expected {self.channels} channels, got {frames.shape[1]}")
+        frame_bytes = self.channels * self.dtype.itemsize
+        if (self.frames_written + len(frames)) * frame_bytes > MAX_DATA_BYTES:
+            limit = MAX_DATA_BYTES // frame_bytes / self.sample_rate
+            raise ValueError(f"{self.path} would exceed the 4 GiB WAV size limit "
+                             f"({limit / 60:.0f} minutes at this rate and format); write a raw file instead")
+        self._file.write(np.ascontiguousarray(frames, dtype='<' + self.dtype.str[1:]).tobytes())
+        self.frames_written += len(frames)
+
+    def close(self):
+        """Patch the RIFF and data sizes and close the file"""
+        if self._file is None:
+            return
+        data_bytes = self.frames_written * self.channels * self.dtype.itemsize
+        if data_bytes % 2:
+            # RIFF chunks are word aligned
+            self._file.write(b'\x00')
+        self._file.seek(0)
+        self._write_header(data_bytes)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class RawStreamWriter:
+    """
+    Append frames to a headerless, memory-mapped file
+
+    The file grows in steps of grow_frames and is mapped with np.memmap,
+    so a write is a copy into the page cache with no format conversion.
+    On close it is truncated to the frames written and a <path>.json
+    sidecar records the sample rate, channel count and sample type.
+    Read it back with open_raw().
+
+    Parameters:
+    path -- Path of the raw file to create
+    sample_rate -- Sample rate in Hz
+    channels -- Number of interleaved channels
+    dtype -- Sample type, e.g. np.float32
+    grow_frames -- Frames added to the file each time it fills up
+    """
+
+    def __init__(self, path, sample_rate, channels=2, dtype=np.float32, grow_frames=1 << 20):
+        self.path = path
+        self.sample_rate = int(sample_rate)
+        self.channels = channels
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.grow_frames = grow_frames
+        self.frames_written = 0
+        self._capacity = 0
+        self._map = None
+        self._file = open(path, 'w+b')
+
+    def _grow(self, needed):
+        """Extend the file and remap it so that needed frames fit"""
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        while self._capacity < needed:
+            self._capacity += self.grow_frames
+        self._file.truncate(self._capacity * self.channels * self.dtype.itemsize)
+        self._map = np.memmap(self._file, dtype=self.dtype, mode='r+', shape=(self._capacity, self.channels))
+
+    def write(self, frames):
+        """Append an array of shape (n, channels)"""
+        frames = np.asarray(frames)
+        if frames.ndim == 1:
+            frames = frames.reshape(-1, 1)
+        if frames.shape[1] != self.channels:
+            raise ValueError(f"Expected {self.channels} channels, got {frames.shape[1]}")
+        end = self.frames_written + len(frames)
+        if end > self._capacity:
+            self._grow(end)
+        self._map[self.frames_written:end] = frames
+        self.frames_written = end
+
+    def close(self):
+        """Drop the unused tail, close the file and write the sidecar"""
+        if self._file is None:
+            return
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        self._file.truncate(self.frames_written * self.channels * self.dtype.itemsize)
+        self._file.close()
+        self._file = None
+        with open(self.path + '.json', 'w') as f:
+            json.dump({'sample_rate': self.sample_rate, 'channels': self.channels, 'dtype': self.dtype.str,
+                       'frames': self.frames_written}, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def open_raw(path):
+    """Map a file written by RawStreamWriter; returns (sample rate, read-only (frames, channels) array)"""
+    with open(path + '.json', 'r') as f:
+        header = json.load(f)
+    if header['frames'] == 0 or os.path.getsize(path) == 0:
+        return header['sample_rate'], np.zeros((0, header['channels']), dtype=header['dtype'])
+    data = np.memmap(path, dtype=header['dtype'], mode='r', shape=(header['frames'], header['channels']))
+    return header['sample_rate'], data
@@ -0,0 +1,220 @@
+"""
+Live X/Y streaming from the controller to the page
+
+A source renders any range of samples on demand: an SVG or a point array
+traced a number of times per second, or an X/Y expression pair. XYStream
+renders blocks from a background thread and hands them to a send callback
+(eel in the controller) tagged with a stream id and a sequence number.
+
+Flow control is credit based: the page acknowledges each block as its
+audio callback consumes it, and at most window blocks are ever in flight,
+so rendering runs at the page's playback rate and a stalled page stops
+the producer instead of growing a queue. The page keeps a small jitter
+buffer of received blocks and only starts playing once it holds a few.
+"""
+import base64
+import time
+import threading
+import numpy as np
+from svg_to_oscilloscope import synthesize_xy, finish_audio_block, prepare_points
+from expression_engine import compile_expression
+
+DEFAULT_BLOCK_SIZE = 2048
+DEFAULT_WINDOW = 8
+
+# Seconds without an ack, with the window full, before the blocks in
+# flight are written off (e.g. the page reloaded) and sending resumes
+STALL_TIMEOUT = 2.0
+
+class PointSource:
+    """
+    Traces a closed point list over and over
+
+    Parameters:
+    points -- Array of shape (N, 2) in [-1, 1]
+    drawing_rate -- Times the whole list is traced per second
+    """
+
+    def __init__(self, points, drawing_rate=50.0):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.drawing_rate = drawing_rate
+
+    def render(self, start, count, sample_rate):
+        samples_per_drawing = sample_rate / self.drawing_rate
+        x, y = synthesize_xy(self.points, samples_per_drawing, speed_factor=1.0, repetitions=1,
+                             start=start, stop=start + count)
+        return finish_audio_block(x, y)
+
+class ExpressionSource:
+    """Evaluates an X/Y expression pair (the signal generator's syntax) at each sample time"""
+
+    def __init__(self, x_expression, y_expression, a=1.0, b=1.0):
+        self.functions = (compile_expression(x_expression), compile_expression(y_expression))
+        self.a = a
+        self.b = b
+
+    def render(self, start, count, sample_rate):
+        t = np.arange(start, start + count) / sample_rate
+        channels = []
+        for function in self.functions:
+            with np.errstate(all='ignore'):
+                values = np.broadcast_to(function(t, self.a, self.b), t.shape)
+            channels.append(np.clip(np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0), -1.0, 1.0))
+        return np.column_stack(channels).astype(np.float32)
+
+def svg_source(svg_file, sample_rate=44100, drawing_rate=50.0, optimize_paths=True):
+    """PointSource for an SVG, sampled the same way svg_to_oscilloscope.py does"""
+    points, _, _ = prepare_points(svg_file, sample_rate, optimize_paths=optimize_paths)
+    return PointSource(points, drawing_rate)
+
+def load_points(path):
+    """
+    Read an (N, 2) point array from .npy or a text file (two columns) and
+    scale each axis to [-1, 1]
+    """
+    if path.lower().endswith('.npy'):
+        points = np.load(path)
+    else:
+        points = np.loadtxt(path, delimiter=',' if path.lower().endswith('.csv') else None)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    low = points.min(axis=0)
+    span = np.ptp(points, axis=0)
+    span = np.where(span > 0, span, 1.0)
+    return 2 * (points - low) / span - 1
+
+def encode_block(frames):
+    """Base64 float32 X and Y channels of a (count, 2) block for JSON transport"""
+    return {
+        'x': base64.b64encode(np.ascontiguousarray(frames[:, 0], dtype='<f4').tobytes()).decode('ascii'),
+        'y': base64.b64encode(np.ascontiguousarray(frames[:, 1], dtype='<f4').tobytes()).decode('ascii'),
+    }
+
+class XYStream:
+    """
+    Renders blocks from a source and sends them with credit-based flow control
+
+    Parameters:
+    send -- Called with each block dict ({'stream', 'seq', 'x', 'y'}, or
+            {'stream', 'end': True} when a stream stops)
+    block_size -- Frames per block
+    window -- Blocks that may be sent but not yet acknowledged
+    """
+
+    def __init__(self, send, block_size=DEFAULT_BLOCK_SIZE, window=DEFAULT_WINDOW):
+        self.send = send
+        self.block_size = block_size
+        self.window = window
+        self.sample_rate = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stream_id = 0
+        self._source = None
+        self._thread = None
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self._sent = 0
+        self._acked = 0
+        self._last_ack = time.monotonic()
+        self._stalls = 0
+        self._page = {}
+        self._started = time.monotonic()
+        self._render_seconds = 0.0
+
+    def set_sample_rate(self, sample_rate):
+        """Sample rate of the page's audio context; set before starting a stream"""
+        with self._lock:
+            self.sample_rate = int(sample_rate)
+
+    def start(self, source):
+        """Replace the current stream with a new source; returns the new stream id"""
+        with self._lock:
+            if self.sample_rate is None:
+                raise RuntimeError("the page has not connected yet")
+            previous = self._stream_id if self._source is not None else None
+            self._stream_id += 1
+            self._source = source
+            self._reset_counters()
+            self._wake.notify_all()
+            stream_id = self._stream_id
+        if previous is not None:
+            self.send({'stream': previous, 'end': True})
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return stream_id
+
+    def stop(self):
+        """Stop sending; the page plays out what it has buffered"""
+        with self._lock:
+            if self._source is None:
+                return False
+            self._source = None
+            stream_id = self._stream_id
+        self.send({'stream': stream_id, 'end': True})
+        return True
+
+    def ack(self, stream_id, seq, page_stats=None):
+        """
+        Record that the page consumed block seq of a stream
+
+        page_stats is whatever the page reports alongside (buffered blocks,
+        underruns); acks for an old stream are ignored.
+        """
+        with self._lock:
+            if stream_id != self._stream_id:
+                return
+            self._acked = max(self._acked, seq + 1)
+            self._last_ack = time.monotonic()
+            if page_stats:
+                self._page = dict(page_stats)
+            self._wake.notify_all()
+
+    def status(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            return {
+                'active': self._source is not None,
+                'stream': self._stream_id,
+                'sample_rate': self.sample_rate,
+                'sent': self._sent,
+                'acked': self._acked,
+                'in_flight': self._sent - self._acked,
+                'stalls': self._stalls,
+                'blocks_per_second': self._sent / elapsed,
+                'render_load': self._render_seconds / elapsed,
+                'page': dict(self._page),
+            }
+
+    def _run(self):
+        while True:
+            with self._lock:
+                ready = lambda: self._source is not None and self._sent - self._acked < self.window
+                if not self._wake.wait_for(ready, timeout=STALL_TIMEOUT / 4):
+                    if self._source is not None and time.monotonic() - self._last_ack > STALL_TIMEOUT:
+                        self._acked = self._sent
+                        self._last_ack = time.monotonic()
+                        self._stalls += 1
+                    continue
+                source = self._source
+                stream_id = self._stream_id
+                seq = self._sent
+                sample_rate = self.sample_rate
+            start_time = time.perf_counter()
+            try:
+                frames = source.render(seq * self.block_size, self.block_size, sample_rate)
+            except Exception as e:
+                print(f"Stream source failed: {e}")
+                self.stop()
+                continue
+            block = dict(encode_block(frames), stream=stream_id, seq=seq)
+            with self._lock:
+                # Dropped if the stream was replaced while rendering
+                if stream_id != self._stream_id or self._source is None:
+                    continue
+                self._sent += 1
+                self._render_seconds += time.perf_counter() - start_time
+            try:
+                self.send(block)
+            except Exception as e:
+                print(f"Error sending stream block: {e}")
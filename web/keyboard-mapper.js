@@ -11,6 +11,8 @@ class KeyboardAudioManager {
         this.outputNode = null;
         this.pressedKeys = new Set();
         this.originalAudioVolume = undefined;
+        this.loopPoints = {};
+        this.oversampledStreams = {};
     }
 
     async init() {
@@ -18,13 +20,17 @@ class KeyboardAudioManager {
             // Load configurations
             this.config = await this.loadConfig();
             this.toneConfig = await this.loadToneConfig();
+            this.loadConfigLoops();
             
             // Wait for AudioSystem to be initialized
             this.audioContext = AudioSystem.audioContext;
             this.scopeNode = AudioSystem.scopeNode;
             this.outputNode = AudioSystem.audioVolumeNode;
             
-            // Preload all audio files
+            // Load everything in the audio pack with one request, then
+            // fetch whatever the pack does not cover one file at a time
+            await this.loadAudioPack();
+            await this.loadOversampledPack();
             await this.preloadAudioFiles();
             await this.preloadToneFiles();
             
@@ -51,10 +57,105 @@ class KeyboardAudioManager {
         return await response.json();
     }
 
+    // Loop points written by old_doc/loop_analysis.py; the audio pack
+    // carries the same values and overrides these when it loads
+    loadConfigLoops() {
+        for (const [configFile, config] of [['audio-config.json', this.config], ['tone-config.json', this.toneConfig]]) {
+            for (const [key, loop] of Object.entries(config.loops || {})) {
+                this.loopPoints[configFile + ':' + key] = loop;
+            }
+        }
+    }
+
+    async loadAudioPack() {
+        try {
+            const response = await fetch('audio-pack.json');
+            if (!response.ok) return;
+            const manifest = await response.json();
+            const packResponse = await fetch(manifest.pack);
+            if (!packResponse.ok) return;
+            const pack = await packResponse.arrayBuffer();
+            
+            const targets = [
+                ['audio-config.json', this.config, this.audioBuffers],
+                ['tone-config.json', this.toneConfig, this.toneBuffers]
+            ];
+            let count = 0;
+            for (const [configFile, config, buffers] of targets) {
+                const entries = manifest.configs[configFile] || {};
+                for (const [key, filepath] of Object.entries(config.mappings)) {
+                    const entry = entries[key];
+                    // Skip entries from a pack built for a different mapping
+                    if (!entry || entry.file !== filepath) continue;
+                    const buffer = this.audioContext.createBuffer(entry.channels, entry.length, manifest.sampleRate);
+                    for (let channel = 0; channel < entry.channels; channel++) {
+                        // A view into the pack, no intermediate copy or decode
+                        const start = (entry.offset + channel * entry.length) * 4;
+                        buffer.copyToChannel(new Float32Array(pack, start, entry.length), channel);
+                    }
+                    buffers[key] = buffer;
+                    if (entry.loopStart !== null && entry.loopEnd !== null) {
+                        this.loopPoints[configFile + ':' + key] = [entry.loopStart, entry.loopEnd];
+                    }
+                    count++;
+                }
+            }
+            console.log(`Loaded ${count} sounds from ${manifest.pack}`);
+        } catch (error) {
+            console.warn("Audio pack not available, loading files individually:", error);
+        }
+    }
+
+    async loadOversampledPack() {
+        try {
+            const response = await fetch('audio-pack-oversampled.json');
+            if (!response.ok) return;
+            const manifest = await response.json();
+            // The streams only line up with what the scope sees at the rate they were built for
+            if (manifest.sampleRate !== this.audioContext.sampleRate) {
+                console.log(`Oversampled pack is ${manifest.sampleRate} Hz, page runs at ${this.audioContext.sampleRate} Hz; filtering in the page`);
+                return;
+            }
+            const packResponse = await fetch(manifest.pack);
+            if (!packResponse.ok) return;
+            const pack = await packResponse.arrayBuffer();
+            
+            for (const [key, filepath] of Object.entries(this.config.mappings)) {
+                const entry = manifest.entries[key];
+                if (!entry || entry.file !== filepath || !this.audioBuffers[key]) continue;
+                const size = entry.length * manifest.steps;
+                const channels = [];
+                for (let channel = 0; channel < entry.channels; channel++) {
+                    channels.push(new Float32Array(pack, (entry.offset + channel * size) * 4, size));
+                }
+                const loop = this.loopPoints[manifest.config + ':' + key];
+                this.oversampledStreams[key] = {
+                    channels: channels,
+                    steps: manifest.steps,
+                    a: manifest.a,
+                    loopStart: loop ? Math.round(loop[0] * manifest.sampleRate) : 0,
+                    loopEnd: loop ? Math.round(loop[1] * manifest.sampleRate) : entry.length
+                };
+            }
+            console.log(`Loaded ${Object.keys(this.oversampledStreams).length} oversampled streams`);
+        } catch (error) {
+            console.warn("Oversampled pack not available:", error);
+        }
+    }
+
+    applyLoopPoints(source, configFile, key) {
+        const loop = this.loopPoints[configFile + ':' + key];
+        if (loop) {
+            source.loopStart = loop[0];
+            source.loopEnd = loop[1];
+        }
+    }
+
     async preloadAudioFiles() {
         const loadPromises = [];
         
         for (const [key, filepath] of Object.entries(this.config.mappings)) {
+            if (this.audioBuffers[key]) continue;
             const loadPromise = this.loadAudioFile(key, filepath);
             loadPromises.push(loadPromise);
         }
@@ -67,6 +168,7 @@ class KeyboardAudioManager {
         const loadPromises = [];
         
         for (const [key, filepath] of Object.entries(this.toneConfig.mappings)) {
+            if (this.toneBuffers[key]) continue;
             const loadPromise = this.loadToneFile(key, filepath);
             loadPromises.push(loadPromise);
         }
@@ -126,6 +228,9 @@ class KeyboardAudioManager {
         
         const key = event.key.toLowerCase();
         if (this.audioBuffers[key] && !this.activeNotes[key]) {
+            LatencyTrace.begin(key, event.timeStamp);
+            Recorder.marker('press', key);
+
             // Stop all currently playing notes before starting a new one
             this.stopAllNotes();
             
@@ -141,6 +246,7 @@ class KeyboardAudioManager {
         
         const key = event.key.toLowerCase();
         if (this.activeNotes[key]) {
+            Recorder.marker('release', key);
             this.stopNote(key);
             this.stopTone(key);
             this.updateVisualFeedback();
@@ -156,6 +262,7 @@ class KeyboardAudioManager {
             const source = this.audioContext.createBufferSource();
             source.buffer = buffer;
             source.loop = true;
+            this.applyLoopPoints(source, 'audio-config.json', key);
             
             // Create gain node with normal gain for oscilloscope display
             const gainNode = this.audioContext.createGain();
@@ -177,6 +284,8 @@ class KeyboardAudioManager {
             
             // Start playback
             source.start();
+            LatencyTrace.noteStarted();
+            if (this.oversampledStreams[key]) Oversampled.play(this.oversampledStreams[key], this.config.settings.fadeInTime);
             
             // Store references
             this.activeNotes[key] = {
@@ -206,6 +315,7 @@ class KeyboardAudioManager {
             
             // Remove reference after stop
             setTimeout(() => {
+                Oversampled.stop(this.oversampledStreams[key]);
                 delete this.activeNotes[key];
                 
                 // If no more audio notes are playing, restore original audio volume
@@ -232,6 +342,7 @@ class KeyboardAudioManager {
             const source = this.audioContext.createBufferSource();
             source.buffer = buffer;
             source.loop = true;
+            this.applyLoopPoints(source, 'tone-config.json', key);
             
             // Create gain node for fade in/out
             const gainNode = this.audioContext.createGain();
@@ -86,6 +86,61 @@ var SignalGenerator =
 	oldA : 1.0,
 	oldB : 1.0,
 	timeInSamples : 0,
+	xSource : null,
+	ySource : null,
+	xFunc : null,
+	yFunc : null,
+	table : null,
+	tablePhase : 0,
+	requestedTable : null,
+
+	// Expressions are compiled once per change instead of once per callback
+	compile : function()
+	{
+		if (controls.xExpression === this.xSource && controls.yExpression === this.ySource) return;
+		var prelude = "var PI = Math.PI, sin = Math.sin, cos = Math.cos; return ";
+		this.xFunc = new Function("t", "a", "b", prelude + controls.xExpression + ";");
+		this.yFunc = new Function("t", "a", "b", prelude + controls.yExpression + ";");
+		this.xSource = controls.xExpression;
+		this.ySource = controls.yExpression;
+	},
+
+	tableKey : function(a, b)
+	{
+		return [controls.xExpression, controls.yExpression, a, b, AudioSystem.sampleRate].join("|");
+	},
+
+	decodeChannel : function(text)
+	{
+		var bytes = Uint8Array.from(atob(text), function(c) { return c.charCodeAt(0); });
+		return new Float32Array(bytes.buffer);
+	},
+
+	// Ask the Python side for one period of the output; until it arrives
+	// (or when eel is not available) the expressions are evaluated here
+	requestTable : function(a, b)
+	{
+		if (typeof eel === "undefined" || !eel.get_wavetable) return;
+		var key = this.tableKey(a, b);
+		if (key === this.requestedTable) return;
+		this.requestedTable = key;
+		eel.get_wavetable(controls.xExpression, controls.yExpression, a, b, AudioSystem.sampleRate)(function(result)
+		{
+			if (!result || result.error || !result.exact) return;
+			var sampleRate = AudioSystem.sampleRate;
+			var length = result.length;
+			var table = {
+				key : key,
+				x : SignalGenerator.decodeChannel(result.x),
+				y : SignalGenerator.decodeChannel(result.y),
+				length : length,
+				period : result.period,
+				step : length / (result.period * sampleRate),
+				synced : false
+			};
+			SignalGenerator.table = table;
+		});
+	},
 
 	generate : function(event)
 	{
@@ -95,11 +150,6 @@ var SignalGenerator =
 		var newB = controls.bValue * Math.pow(10.0, controls.bExponent);
 		var oldA = SignalGenerator.oldA;
 		var oldB = SignalGenerator.oldB;
-		var PI = Math.PI;
-		var cos = Math.cos;
-		var sin = Math.sin;
-		var xFunc = eval("(function xFunc(){return "+controls.xExpression+";})");
-		var yFunc = eval("(function yFunc(){return "+controls.yExpression+";})");
 		var bufferSize = AudioSystem.bufferSize;
 		var timeInSamples = SignalGenerator.timeInSamples;
 		var sampleRate = AudioSystem.sampleRate;
@@ -112,17 +162,54 @@ var SignalGenerator =
 				xOut[i] = 0;
 				yOut[i] = 0;
 			}
+			SignalGenerator.timeInSamples += AudioSystem.bufferSize;
+			SignalGenerator.oldA = newA;
+			SignalGenerator.oldB = newB;
+			return;
+		}
+
+		SignalGenerator.compile();
+		var xFunc = SignalGenerator.xFunc;
+		var yFunc = SignalGenerator.yFunc;
+		var table = SignalGenerator.table;
+		if ((newA == oldA) && (newB == oldB))
+		{
+			SignalGenerator.requestTable(newA, newB);
+		}
+
+		if ((newA == oldA) && (newB == oldB) && table && table.key === SignalGenerator.tableKey(newA, newB))
+		{
+			// Loop the cached period with linear interpolation, picking up
+			// where the per-sample path left off so the switch is seamless
+			if (!table.synced)
+			{
+				var t0 = timeInSamples / sampleRate;
+				SignalGenerator.tablePhase = (t0 % table.period) / table.period * table.length;
+				table.synced = true;
+			}
+			var phase = SignalGenerator.tablePhase;
+			var length = table.length;
+			for (var i=0; i<bufferSize; i++)
+			{
+				var index = Math.floor(phase);
+				var fraction = phase - index;
+				var next = index + 1 < length ? index + 1 : 0;
+				xOut[i] = table.x[index] + (table.x[next] - table.x[index]) * fraction;
+				yOut[i] = table.y[index] + (table.y[next] - table.y[index]) * fraction;
+				phase += table.step;
+				if (phase >= length) phase -= length;
+			}
+			SignalGenerator.tablePhase = phase;
 		}
 		else if ((newA == oldA) && (newB == oldB))
 		{
+			if (table) table.synced = false;
 			var n = timeInSamples;
 			for (var i=0; i<bufferSize; i++)
 			{
 				var t = n/sampleRate;
-				var a = newA;
-				var b = newB;
-				x = xFunc();
-				y = yFunc();
+				x = xFunc(t, newA, newB);
+				y = yFunc(t, newA, newB);
 				xOut[i] = x;
 				yOut[i] = y;
 				n += 1;
@@ -130,19 +217,15 @@ var SignalGenerator =
 		}
 		else
 		{
+			if (table) table.synced = false;
 			var n = timeInSamples;
 			for (var i=0; i<bufferSize; i++)
 			{
 				var t = n/sampleRate;
-
-				var a = oldA;
-				var b = oldB;
-				var oldX = xFunc();
-				var oldY = yFunc();
-				a = newA;
-				b = newB;
-				var newX = xFunc();
-				var newY = yFunc();
+				var oldX = xFunc(t, oldA, oldB);
+				var oldY = yFunc(t, oldA, oldB);
+				var newX = xFunc(t, newA, newB);
+				var newY = yFunc(t, newA, newB);
 				var alpha_z = i/bufferSize;
 				x = oldX*(1.0-alpha_z)+newX*alpha_z;
 				y = oldY*(1.0-alpha_z)+newY*alpha_z;
@@ -252,6 +335,166 @@ var Filter =
     }
 }
 
+// Draws the playing note from a stream oversampled offline with the same
+// Lanczos filter (old_doc/oversample.py), so blocks need no convolution.
+// The block's place in the note is found by comparing its samples with
+// the stream's phase-0 points, which are the original samples; anything
+// that does not match (the generator, a gain ramp, a different note)
+// falls back to Filter.
+var Oversampled =
+{
+	stream : null,
+	frame : 0,
+	played : 0,
+	probes : 16,
+	tolerance : 1e-3,
+	searchBlocks : 2,
+	retryBlocks : 8,
+	retryIn : 0,
+
+	// fadeIn is the note's gain ramp in seconds; blocks inside it cannot
+	// match at a constant gain, so they are left to the filter
+	play : function(stream, fadeIn)
+	{
+		this.stream = stream;
+		this.frame = 0;
+		this.played = 0;
+		this.retryIn = 0;
+		this.startTime = AudioSystem.audioContext.currentTime;
+		this.settleTime = this.startTime + (fadeIn || 0);
+	},
+
+	stop : function(stream)
+	{
+		if (this.stream === stream) this.stream = null;
+	},
+
+	wrap : function(frame)
+	{
+		var stream = this.stream;
+		if (frame >= stream.loopEnd) frame = stream.loopStart + (frame - stream.loopStart) % (stream.loopEnd - stream.loopStart);
+		return frame;
+	},
+
+	// Gain that maps the stream at frame onto the block, or null if it does not match
+	matchGain : function(frame, samples)
+	{
+		var points = this.stream.channels[0];
+		var steps = this.stream.steps;
+		var length = samples.length;
+		var cross = 0, refEnergy = 0, energy = 0;
+		for (var p=0; p<this.probes; p++)
+		{
+			var k = Math.floor(p*length/this.probes);
+			var ref = points[this.wrap(frame+k)*steps];
+			cross += samples[k]*ref;
+			refEnergy += ref*ref;
+			energy += samples[k]*samples[k];
+		}
+		if (refEnergy < 1e-12 || energy < 1e-12) return null;
+		var gain = cross/refEnergy;
+		var residual = 0;
+		for (var p=0; p<this.probes; p++)
+		{
+			var k = Math.floor(p*length/this.probes);
+			var error = samples[k] - gain*points[this.wrap(frame+k)*steps];
+			residual += error*error;
+		}
+		return residual <= this.tolerance*energy ? gain : null;
+	},
+
+	silent : function(samples)
+	{
+		var length = samples.length, energy = 0;
+		for (var p=0; p<this.probes; p++)
+		{
+			var sample = samples[Math.floor(p*length/this.probes)];
+			energy += sample*sample;
+		}
+		return energy < 1e-12;
+	},
+
+	locate : function(samples)
+	{
+		// Still fading in, or not sounding yet: not a miss, just not yet
+		if (AudioSystem.audioContext.currentTime < this.settleTime || this.silent(samples)) return null;
+		var gain = this.matchGain(this.frame, samples);
+		if (gain !== null) return gain;
+		// After a miss, search again only every retryBlocks blocks
+		if (this.retryIn > 0)
+		{
+			this.retryIn--;
+			return null;
+		}
+		// Notes start on block boundaries, so only whole blocks around
+		// where the note should be by now are worth trying
+		var length = samples.length;
+		var elapsed = Math.round((AudioSystem.audioContext.currentTime - this.startTime) * AudioSystem.sampleRate);
+		elapsed = Math.round(elapsed / length) * length;
+		for (var block = -this.searchBlocks; block <= this.searchBlocks; block++)
+		{
+			var frame = elapsed + block*length;
+			if (frame < 0) continue;
+			gain = this.matchGain(this.wrap(frame), samples);
+			if (gain !== null)
+			{
+				this.frame = this.wrap(frame);
+				this.played = frame;
+				return gain;
+			}
+		}
+		// Lost the note (e.g. the voice changed); leave it to the filter
+		// for a while rather than searching every block
+		this.retryIn = this.retryBlocks;
+		return null;
+	},
+
+	// Fills the smoothed arrays like Filter.generateSmoothedSamples would; returns false if it cannot
+	fill : function(xSamples, smoothedXSamples, smoothedYSamples)
+	{
+		var stream = this.stream;
+		if (!stream || stream.steps !== Filter.steps || stream.a !== Filter.a) return false;
+		var gain = this.locate(xSamples);
+		if (gain === null) return false;
+
+		var xPoints = stream.channels[0];
+		var yPoints = stream.channels[stream.channels.length-1];
+		var steps = stream.steps;
+		var length = xSamples.length;
+		// Filter output lags its input by 2a samples, which after a loop
+		// restart come from the end of the loop; before the note started
+		// the filter saw silence
+		var start = this.frame - 2*stream.a;
+		var silence = this.played < 2*stream.a ? 2*stream.a - this.played : 0;
+		if (!silence && start < stream.loopStart && this.played >= stream.loopEnd) start += stream.loopEnd - stream.loopStart;
+		var i = 0;
+		for (var j=0; j<=length; j++)
+		{
+			var count = j < length ? steps : 1;
+			if (j < silence)
+			{
+				for (var r=0; r<count; r++)
+				{
+					smoothedXSamples[i] = 0;
+					smoothedYSamples[i] = 0;
+					i += 1;
+				}
+				continue;
+			}
+			var source = this.wrap(start+j)*steps;
+			for (var r=0; r<count; r++)
+			{
+				smoothedXSamples[i] = gain*xPoints[source+r];
+				smoothedYSamples[i] = gain*yPoints[source+r];
+				i += 1;
+			}
+		}
+		this.frame = this.wrap(this.frame + length);
+		this.played += length;
+		return true;
+	}
+}
+
 var UI =
 {
 	sidebarWidth : 360,
@@ -265,6 +508,11 @@ var UI =
 		}
 		this.xInput = document.getElementById("xInput");
 		this.yInput = document.getElementById("yInput");
+		this.showExpressions();
+	},
+
+	showExpressions : function()
+	{
 		if (this.xInput && this.yInput) {
 			this.xInput.value = controls.xExpression;
 			this.yInput.value = controls.yExpression;
@@ -273,9 +521,10 @@ var UI =
 
 	compile : function() //doesn't compile anything anymore
 	{
+		// Only edits go to Python, so the page defaults never overwrite its controls
 		if (this.xInput && this.yInput) {
-			controls.xExpression = this.xInput.value;
-			controls.yExpression = this.yInput.value;
+			if (this.xInput.value !== controls.xExpression) ControlSync.set("xExpression", this.xInput.value);
+			if (this.yInput.value !== controls.yExpression) ControlSync.set("yExpression", this.yInput.value);
 		}
 	}
 }
@@ -881,11 +1130,356 @@ var Render =
 	}
 }
 
+// Plays the idle trace from tables rendered by old_doc/idle_noise.py.
+// A base table runs block after block and crossfades into another seed
+// when it ends; on about 10% of blocks the current interference pattern
+// is added from one of its tables. Until the tables load, or if they were
+// rendered for another block size, doScriptProcessor synthesizes the
+// noise itself.
+var IdleNoise =
+{
+	tables : null,
+	current : null,
+	fading : null,
+	block : 0,
+
+	load : function()
+	{
+		fetch("idle-noise.json").then(function(response)
+		{
+			if (!response.ok) throw new Error(response.status);
+			return response.json();
+		}).then(function(manifest)
+		{
+			if (manifest.blockSize !== AudioSystem.bufferSize) throw new Error("tables are for blocks of " + manifest.blockSize);
+			return fetch(manifest.pack).then(function(response) { return response.arrayBuffer(); }).then(function(pack)
+			{
+				var data = new Int16Array(pack);
+				var tables = {};
+				for (var kind in manifest.tables)
+				{
+					tables[kind] = manifest.tables[kind].map(function(entry)
+					{
+						// Decode once, so playback is a plain copy
+						var size = entry.blocks*manifest.blockSize;
+						var values = new Float32Array(2*size);
+						for (var i=0; i<2*size; i++) values[i] = data[entry.offset+i]*entry.scale;
+						return {x : values.subarray(0, size), y : values.subarray(size), blocks : entry.blocks};
+					});
+				}
+				IdleNoise.tables = tables;
+				IdleNoise.current = IdleNoise.pick(tables.base, null);
+				IdleNoise.block = 0;
+			});
+		}).catch(function(error)
+		{
+			console.log("Idle noise tables not available, synthesizing idle noise:", error.message);
+		});
+	},
+
+	pick : function(tables, except)
+	{
+		var choices = tables.filter(function(table) { return table !== except; });
+		if (!choices.length) choices = tables;
+		return choices[Math.floor(Math.random()*choices.length)];
+	},
+
+	// Writes one idle block; returns false if the tables are not loaded
+	fill : function(xSamples, ySamples, length, currentTime)
+	{
+		if (!this.tables) return false;
+		if (this.block >= this.current.blocks)
+		{
+			this.fading = {table : this.current, start : (this.current.blocks-1)*length};
+			this.current = this.pick(this.tables.base, this.current);
+			this.block = 0;
+		}
+		var start = this.block*length;
+		var x = this.current.x, y = this.current.y;
+		for (var i=0; i<length; i++)
+		{
+			xSamples[i] = -1.0 + 2.0*i/length + x[start+i];
+			ySamples[i] = y[start+i];
+		}
+		// Crossfade out of the table that just ended, replaying its last block
+		if (this.fading)
+		{
+			var fadeX = this.fading.table.x, fadeY = this.fading.table.y, fadeStart = this.fading.start;
+			for (var i=0; i<length; i++)
+			{
+				var w = i/length;
+				xSamples[i] = (1-w)*(-1.0 + 2.0*i/length + fadeX[fadeStart+i]) + w*xSamples[i];
+				ySamples[i] = (1-w)*fadeY[fadeStart+i] + w*ySamples[i];
+			}
+			this.fading = null;
+		}
+		this.block += 1;
+
+		// Analog patterns: the pattern changes every 10 seconds and shows on 10% of blocks
+		if (Math.random() < 0.1)
+		{
+			var patterns = this.tables["pattern" + (Math.floor(currentTime * 0.1) % 10)];
+			if (patterns)
+			{
+				var pattern = this.pick(patterns, null);
+				var patternStart = Math.floor(Math.random()*pattern.blocks)*length;
+				for (var i=0; i<length; i++)
+				{
+					xSamples[i] += pattern.x[patternStart+i];
+					ySamples[i] += pattern.y[patternStart+i];
+				}
+			}
+		}
+		return true;
+	}
+}
+
+// Plays X/Y blocks streamed by old_doc/xy_stream.py. Blocks arrive in
+// order tagged with a stream id and sequence number and wait in a jitter
+// buffer; playback starts once prebuffer blocks are held, and an empty
+// buffer while playing counts as an underrun and refills before resuming.
+// Each consumed block is acknowledged, which lets Python send the next
+// one, so the buffer never holds more than the Python send window.
+var LiveStream =
+{
+	prebuffer : 3,
+	stream : null,
+	queue : [],
+	expectedSeq : 0,
+	offset : 0,
+	playing : false,
+	ended : false,
+	underruns : 0,
+	dropped : 0,
+	x : null,
+	y : null,
+
+	available : function()
+	{
+		return typeof eel !== "undefined" && !!eel.stream_ready;
+	},
+
+	init : function()
+	{
+		if (!this.available()) return;
+		this.x = new Float32Array(AudioSystem.bufferSize);
+		this.y = new Float32Array(AudioSystem.bufferSize);
+		eel.expose(receive_stream_block, "receive_stream_block");
+		eel.stream_ready(AudioSystem.sampleRate);
+	},
+
+	reset : function(stream, seq)
+	{
+		this.stream = stream;
+		this.queue = [];
+		this.expectedSeq = seq || 0;
+		this.offset = 0;
+		this.playing = false;
+		this.ended = false;
+	},
+
+	receive : function(block)
+	{
+		if (block.end)
+		{
+			if (block.stream === this.stream) this.ended = true;
+			return;
+		}
+		// A new stream, or one already running when the page loaded
+		if (block.stream !== this.stream) this.reset(block.stream, block.seq);
+		if (block.seq !== this.expectedSeq)
+		{
+			// Out of sequence: skip it, but free its credit
+			this.dropped++;
+			this.ack(block.seq);
+			return;
+		}
+		this.expectedSeq = block.seq + 1;
+		this.queue.push({
+			seq : block.seq,
+			x : SignalGenerator.decodeChannel(block.x),
+			y : SignalGenerator.decodeChannel(block.y)
+		});
+	},
+
+	ack : function(seq)
+	{
+		eel.stream_ack(this.stream, seq, {buffered : this.queue.length, underruns : this.underruns, dropped : this.dropped});
+	},
+
+	// Adds the next length stream samples to the scope input and returns
+	// the mixed channels, or null when nothing is playing
+	mix : function(xInput, yInput, length)
+	{
+		if (this.stream === null) return null;
+		if (!this.playing)
+		{
+			if (this.queue.length < this.prebuffer && !(this.ended && this.queue.length)) return null;
+			this.playing = true;
+		}
+		var x = this.x, y = this.y;
+		for (var i=0; i<length; i++)
+		{
+			var block = this.queue[0];
+			if (!block)
+			{
+				// Ran dry: fill the rest with the input and rebuffer
+				for (; i<length; i++) { x[i] = xInput[i]; y[i] = yInput[i]; }
+				this.playing = false;
+				if (this.ended) this.reset(null);
+				else this.underruns++;
+				break;
+			}
+			x[i] = xInput[i] + block.x[this.offset];
+			y[i] = yInput[i] + block.y[this.offset];
+			if (++this.offset === block.x.length)
+			{
+				this.queue.shift();
+				this.offset = 0;
+				this.ack(block.seq);
+			}
+		}
+		return x;
+	}
+}
+
+function receive_stream_block(block)
+{
+	LiveStream.receive(block);
+}
+
+// Records what the scope displays while controls.recording is on. The
+// audio callback only copies each block into a preallocated chunk; a full
+// chunk is swapped for a free one and encoded and sent to Python from a
+// timer, never from the callback. Chunks return to the pool once Python
+// has taken them, so a slow writer costs dropped blocks (counted, and
+// filled with silence by Python so time stays aligned) rather than
+// allocations or a growing backlog. Key markers are stamped with the
+// number of frames captured so far.
+var Recorder =
+{
+	chunkFrames : 65536,  // A multiple of the audio block size
+	poolSize : 4,
+	enabled : false,
+	pool : [],
+	chunk : null,
+	take : 0,
+	frame : 0,
+	markers : [],
+	droppedBlocks : 0,
+
+	available : function()
+	{
+		return typeof eel !== "undefined" && !!eel.record_chunk;
+	},
+
+	init : function()
+	{
+		if (!this.available()) return;
+		this.enabled = true;
+		for (var i=0; i<this.poolSize; i++)
+			this.pool.push({x : new Float32Array(this.chunkFrames), y : new Float32Array(this.chunkFrames), length : 0, start : 0});
+	},
+
+	marker : function(type, key)
+	{
+		if (this.take) this.markers.push({frame : this.frame, type : type, key : key});
+	},
+
+	// Called from doScriptProcessor with the samples about to be drawn
+	capture : function(x, y, length)
+	{
+		if (!this.enabled) return;
+		var recording = controls.recording && controls.recordTake;
+		if (this.take && this.take !== recording)
+		{
+			// Stopped, or a new take replaced this one
+			this.send(true);
+			this.take = 0;
+		}
+		if (!recording) return;
+		if (!this.take)
+		{
+			this.take = recording;
+			this.frame = 0;
+			this.markers = [];
+			this.droppedBlocks = 0;
+		}
+		if (!this.chunk)
+		{
+			this.chunk = this.pool.pop() || null;
+			if (!this.chunk)
+			{
+				// Every chunk is still on its way to Python
+				this.droppedBlocks++;
+				this.frame += length;
+				return;
+			}
+			this.chunk.start = this.frame;
+			this.chunk.length = 0;
+		}
+		var chunk = this.chunk;
+		chunk.x.set(length === x.length ? x : x.subarray(0, length), chunk.length);
+		chunk.y.set(length === y.length ? y : y.subarray(0, length), chunk.length);
+		chunk.length += length;
+		this.frame += length;
+		if (chunk.length + length > this.chunkFrames) this.send(false);
+	},
+
+	send : function(last)
+	{
+		var chunk = this.chunk;
+		var take = this.take;
+		var markers = this.markers;
+		this.chunk = null;
+		this.markers = [];
+		if (!chunk && !last) return;
+		var start = chunk ? chunk.start : this.frame;
+		// The chunk goes back to the pool whether the call succeeds or fails
+		var release = function() { if (chunk) Recorder.pool.push(chunk); };
+		setTimeout(function()
+		{
+			try
+			{
+				var message = {
+					take : take,
+					start : start,
+					sample_rate : AudioSystem.sampleRate,
+					x : chunk ? Recorder.encodeChannel(chunk.x.subarray(0, chunk.length)) : "",
+					y : chunk ? Recorder.encodeChannel(chunk.y.subarray(0, chunk.length)) : "",
+					markers : markers,
+					last : last
+				};
+				eel.record_chunk(message)().then(release, function(error)
+				{
+					console.error("Recording chunk failed:", error);
+					release();
+				});
+			}
+			catch (error)
+			{
+				console.error("Recording chunk failed:", error);
+				release();
+			}
+		}, 0);
+	},
+
+	encodeChannel : function(samples)
+	{
+		var bytes = new Uint8Array(samples.buffer, samples.byteOffset, samples.byteLength);
+		var text = "";
+		for (var i=0; i<bytes.length; i+=0x8000)
+			text += String.fromCharCode.apply(null, bytes.subarray(i, i+0x8000));
+		return btoa(text);
+	}
+}
+
 var sweepPosition = -1;
 var belowTrigger = false;
 
 function doScriptProcessor(event)
 {
+	var callbackStart = performance.now();
 	var xSamplesRaw = event.inputBuffer.getChannelData(0);
 	var ySamplesRaw = event.inputBuffer.getChannelData(1);
 	var xOut = event.outputBuffer.getChannelData(0);
@@ -893,6 +1487,13 @@ function doScriptProcessor(event)
 
 	var length = xSamplesRaw.length;
 	
+	// A live stream from Python is mixed in as if it were part of the input
+	if (LiveStream.mix(xSamplesRaw, ySamplesRaw, length))
+	{
+		xSamplesRaw = LiveStream.x;
+		ySamplesRaw = LiveStream.y;
+	}
+	
 	// Check if any audio is playing
 	var hasAudioInput = false;
 	for (var i=0; i<length; i++) {
@@ -907,7 +1508,9 @@ function doScriptProcessor(event)
 	if (typeof keyboardAudioManager !== 'undefined' && keyboardAudioManager) {
 		var status = keyboardAudioManager.getStatus();
 		isKeyboardActive = status.activeSamples > 0;
+		Telemetry.record("active_notes", status.activeSamples + status.activeTones);
 	}
+	LatencyTrace.audioBlock(hasAudioInput);
 	
 	// Variables for noise generation
 	var currentTime = Date.now() / 1000.0;
@@ -920,7 +1523,10 @@ function doScriptProcessor(event)
 	var showAnalogNoise = Math.random() < 0.1; // 10% chance of analog patterns
 	var interferencePhase = currentTime * 15.7; // Non-harmonic frequency for beating
 	
-	for (var i=0; i<length; i++)
+	var idleFromTables = !hasAudioInput && !isKeyboardActive && IdleNoise.fill(xSamples, ySamples, length, currentTime);
+	
+	// Skipped when the idle block came from the tables
+	for (var i=0; i<length && !idleFromTables; i++)
 	{
 		if (!hasAudioInput && !isKeyboardActive) {
 			// Generate horizontal line with realistic oscilloscope noise
@@ -1041,12 +1647,21 @@ function doScriptProcessor(event)
         }
     }
 
+	Recorder.capture(xSamples, ySamples, length);
+
 	if (!controls.freezeImage)
 	{
 		if (!controls.disableFilter)
 		{
-			Filter.generateSmoothedSamples(AudioSystem.oldXSamples, xSamples, AudioSystem.smoothedXSamples);
-			Filter.generateSmoothedSamples(AudioSystem.oldYSamples, ySamples, AudioSystem.smoothedYSamples);
+			var filterStart = performance.now();
+			var preOversampled = controls.preOversampled && isKeyboardActive && !controls.sweepOn && !controls.signalGeneratorOn
+				&& Oversampled.fill(xSamples, AudioSystem.smoothedXSamples, AudioSystem.smoothedYSamples);
+			if (!preOversampled)
+			{
+				Filter.generateSmoothedSamples(AudioSystem.oldXSamples, xSamples, AudioSystem.smoothedXSamples);
+				Filter.generateSmoothedSamples(AudioSystem.oldYSamples, ySamples, AudioSystem.smoothedYSamples);
+			}
+			Telemetry.record("filter_ms", performance.now() - filterStart);
 
 			if (!controls.swapXY) Render.drawLineTexture(AudioSystem.smoothedXSamples, AudioSystem.smoothedYSamples);
 			else Render.drawLineTexture(AudioSystem.smoothedYSamples, AudioSystem.smoothedXSamples);
@@ -1067,11 +1682,176 @@ function doScriptProcessor(event)
 	}
 
 	AudioSystem.audioVolumeNode.gain.value = controls.audioVolume;
+	Telemetry.audioCallback(event, performance.now() - callbackStart);
+}
+
+// Keeps the page's controls in step with the Python controls store.
+// Python pushes coalesced changes tagged with a version; local changes are
+// batched into one set_controls call per animation frame.
+var ControlSync =
+{
+	version : 0,
+	pending : null,
+
+	available : function()
+	{
+		return typeof eel !== "undefined" && !!eel.set_controls;
+	},
+
+	init : function()
+	{
+		if (!this.available()) return;
+		eel.expose(apply_control_changes, "apply_control_changes");
+		eel.get_changes_since(0)(function(changes) { ControlSync.apply(changes); });
+	},
+
+	apply : function(changes)
+	{
+		// A full snapshot is taken even at the same version, e.g. the
+		// initial one from a store that has not changed yet
+		if (!changes || (changes.version <= this.version && !changes.full)) return;
+		for (var name in changes.changes)
+		{
+			// Local edits not yet sent win over older values from Python
+			if (this.pending && name in this.pending) continue;
+			controls[name] = changes.changes[name];
+		}
+		this.version = changes.version;
+		UI.showExpressions();
+	},
+
+	set : function(name, value)
+	{
+		controls[name] = value;
+		if (!this.available()) return;
+		if (!this.pending)
+		{
+			this.pending = {};
+			requestAnimationFrame(function() { ControlSync.flush(); });
+		}
+		this.pending[name] = value;
+	},
+
+	flush : function()
+	{
+		var changes = this.pending;
+		this.pending = null;
+		if (changes) eel.set_controls(changes);
+	}
+}
+
+function apply_control_changes(changes)
+{
+	ControlSync.apply(changes);
+}
+
+// Samples render-loop and audio-callback timings and sends them to the
+// Python controller in one batch per second. Values are plain numbers in
+// arrays capped at maxSamples per metric, so a stalled connection cannot
+// grow memory without bound.
+var Telemetry =
+{
+	interval : 1000,
+	maxSamples : 4096,
+	samples : {},
+	counters : {underruns : 0},
+	lastFrame : null,
+
+	available : function()
+	{
+		return typeof eel !== "undefined" && !!eel.report_telemetry;
+	},
+
+	init : function()
+	{
+		if (!this.available()) return;
+		setInterval(function() { Telemetry.flush(); }, this.interval);
+	},
+
+	record : function(name, value)
+	{
+		var values = this.samples[name];
+		if (!values) values = this.samples[name] = [];
+		if (values.length < this.maxSamples) values.push(value);
+	},
+
+	frame : function(timeStamp, renderMs)
+	{
+		if (this.lastFrame !== null) this.record("frame_ms", timeStamp - this.lastFrame);
+		this.lastFrame = timeStamp;
+		this.record("render_ms", renderMs);
+	},
+
+	audioCallback : function(event, durationMs)
+	{
+		this.record("audio_callback_ms", durationMs);
+		// A block whose scheduled start has already passed was not ready
+		// in time, so the output glitched
+		if (event.playbackTime < AudioSystem.audioContext.currentTime) this.counters.underruns++;
+	},
+
+	flush : function()
+	{
+		var batch = {samples : this.samples, counters : this.counters};
+		this.samples = {};
+		this.counters = {underruns : 0};
+		eel.report_telemetry(batch);
+	}
+}
+
+// Traces one key press at a time while controls.latencyTrace is on: the
+// keydown event, note start, the first non-silent block reaching
+// doScriptProcessor and the first CRT frame drawn after it. Times are ms
+// since keydown; event.timeStamp and performance.now() share a clock.
+var LatencyTrace =
+{
+	timeout : 2000,
+	current : null,
+
+	begin : function(key, timeStamp)
+	{
+		// The generator would make every block non-silent
+		if (!controls.latencyTrace || controls.signalGeneratorOn) return;
+		this.current = {key : key, start : timeStamp, note_start_ms : null, first_audio_ms : null, first_frame_ms : null};
+	},
+
+	noteStarted : function()
+	{
+		var trace = this.current;
+		if (trace && trace.note_start_ms === null) trace.note_start_ms = performance.now() - trace.start;
+	},
+
+	audioBlock : function(hasAudio)
+	{
+		var trace = this.current;
+		if (!trace || trace.note_start_ms === null || trace.first_audio_ms !== null) return;
+		var elapsed = performance.now() - trace.start;
+		if (hasAudio) trace.first_audio_ms = elapsed;
+		else if (elapsed > this.timeout) this.current = null;
+	},
+
+	frameDrawn : function()
+	{
+		var trace = this.current;
+		if (!trace || trace.first_audio_ms === null) return;
+		trace.first_frame_ms = performance.now() - trace.start;
+		this.current = null;
+		var context = AudioSystem.audioContext;
+		trace.output_latency_ms = ((context.baseLatency || 0) + (context.outputLatency || 0)) * 1000;
+		trace.buffer_size = AudioSystem.bufferSize;
+		trace.sample_rate = AudioSystem.sampleRate;
+		delete trace.start;
+		if (typeof eel !== "undefined" && eel.report_key_latency) eel.report_key_latency(trace);
+		else console.log("Key latency", trace);
+	}
 }
 
 function drawCRTFrame(timeStamp)
 {
+	var renderStart = performance.now();
 	Render.drawCRT();
+	Telemetry.frame(timeStamp, performance.now() - renderStart);
+	LatencyTrace.frameDrawn();
 	requestAnimationFrame(drawCRTFrame);
 }
 
@@ -1088,6 +1868,11 @@ window.addEventListener('load', function() {
 	AudioSystem.startSound();
 	requestAnimationFrame(drawCRTFrame);
 	Controls.setupControls();
+	ControlSync.init();
+	Telemetry.init();
+	IdleNoise.load();
+	LiveStream.init();
+	Recorder.init();
 	
 	// Initialize keyboard audio manager
 	keyboardAudioManager = new KeyboardAudioManager();